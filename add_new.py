@@ -2,13 +2,18 @@
 """
 增量添加UP主：采集信息 → 算法初分类 → 输出结果供人工审核
 用法: python add_new.py <mid1> [mid2] [mid3] ...
+      python add_new.py --new     # 自动找出关注列表中还没有采集的UP主
+加 --profile 做性能分析（见 profiling.py）
 """
 
 import json
-import asyncio
 import sys
 from pathlib import Path
 
+from generate_info import summary_lines
+from profiling import run_profiled, stage
+from store import open_store
+
 BASE_PATH = Path(__file__).parent
 DATA_PATH = BASE_PATH / "data"
 
@@ -43,98 +48,57 @@ def save_md(data):
 
 def generate_info():
     """重新生成信息汇总文件"""
-    data_path = DATA_PATH / "up主详细数据.json"
-    with open(data_path, "r", encoding="utf-8") as f:
-        uploaders = json.load(f)
-
-    output_lines = []
-    output_lines.append("=" * 80)
-    output_lines.append("B站关注UP主信息汇总（供分类参考）")
-    output_lines.append(f"共 {len(uploaders)} 个UP主")
-    output_lines.append("=" * 80)
-    output_lines.append("")
-
-    for i, up in enumerate(uploaders, 1):
-        name = up.get("name", "未知")
-        mid = up.get("mid", "")
-        sign = up.get("sign", "") or "无"
-        official = up.get("official_verify", "") or "无"
-        channels = up.get("channels", [])
-        series = up.get("series", [])
-        video_titles = up.get("video_titles", [])
-        video_zones = up.get("video_zones", [])
-        tags = up.get("tags", [])
-        articles = up.get("articles", [])
-        note = up.get("note", "")
-
-        output_lines.append(f"【{i}】{name}")
-        output_lines.append(f"  UID: {mid}")
-        output_lines.append(f"  主页: https://space.bilibili.com/{mid}")
-        if note:
-            output_lines.append(f"  【备注】: {note}")
-        output_lines.append(f"  个性签名: {sign[:100]}{'...' if len(sign) > 100 else ''}")
-        output_lines.append(f"  官方认证: {official[:80]}{'...' if len(official) > 80 else ''}")
-
-        if channels:
-            display = channels[:30]
-            suffix = f"...还有{len(channels)-30}个" if len(channels) > 30 else ""
-            output_lines.append(f"  合集({len(channels)}个): {', '.join(display)}{suffix}")
-        else:
-            output_lines.append("  合集: 无")
-
-        if series:
-            display = series[:30]
-            suffix = f"...还有{len(series)-30}个" if len(series) > 30 else ""
-            output_lines.append(f"  系列({len(series)}个): {', '.join(display)}{suffix}")
-        else:
-            output_lines.append("  系列: 无")
-
-        if video_zones:
-            output_lines.append(f"  投稿分区: {', '.join(video_zones)}")
-        else:
-            output_lines.append("  投稿分区: 无")
-
-        if video_titles:
-            output_lines.append(f"  最近视频({len(video_titles)}个):")
-            for j, title in enumerate(video_titles, 1):
-                output_lines.append(f"    {j}. {title}")
-        else:
-            output_lines.append("  最近视频: 无")
-
-        if tags:
-            output_lines.append(f"  视频标签({len(tags)}个): {', '.join(tags)}")
-        else:
-            output_lines.append("  视频标签: 无")
-
-        if articles:
-            output_lines.append(f"  专栏文章({len(articles)}篇):")
-            for j, title in enumerate(articles[:30], 1):
-                output_lines.append(f"    {j}. {title}")
-        else:
-            output_lines.append("  专栏文章: 无")
-
-        output_lines.append("")
-        output_lines.append("-" * 80)
-        output_lines.append("")
+    store = open_store()
+    uploaders = store.load_models()
+    store.close()
 
+    output_lines = summary_lines(uploaders)
     output_path = DATA_PATH / "up主信息汇总.txt"
     with open(output_path, "w", encoding="utf-8") as f:
         f.write("\n".join(output_lines))
     print(f"信息汇总已更新: {output_path}")
 
 
+async def find_new_follows():
+    """对比关注列表与已有数据，返回新关注的 {mid: 关注列表条目}"""
+    from fetch import FollowingsError, get_credential, get_followings_delta, load_config
+    config = load_config()
+    credential = get_credential(config)
+    print("正在对比关注列表...")
+    try:
+        new_follows, unfollowed = await get_followings_delta(credential, config["bilibili"]["dedeuserid"])
+    except FollowingsError as e:
+        print(f"关注列表获取失败: {e}")
+        return {}
+    if unfollowed:
+        print(f"另有 {len(unfollowed)} 个已取关的UP主，可用 python fetch.py prune 删除")
+    return {up["mid"]: up for up in new_follows}
+
+
 async def main():
-    if len(sys.argv) < 2:
+    args = sys.argv[1:]
+    if not args:
         print("用法: python add_new.py <mid1> [mid2] [mid3] ...")
+        print("      python add_new.py --new")
         print("示例: python add_new.py 12345678 87654321")
         return
 
-    mids = []
-    for arg in sys.argv[1:]:
-        if arg.isdigit():
-            mids.append(int(arg))
-        else:
-            print(f"无效的mid: {arg}，跳过")
+    followings = {}
+    if "--new" in args:
+        followings = await find_new_follows()
+        mids = list(followings)
+        if not mids:
+            print("没有新关注的UP主")
+            return
+    else:
+        mids = []
+        for arg in args:
+            if arg.startswith("--"):
+                continue
+            if arg.isdigit():
+                mids.append(int(arg))
+            else:
+                print(f"无效的mid: {arg}，跳过")
 
     if not mids:
         print("没有有效的mid")
@@ -143,7 +107,8 @@ async def main():
     # 1. 采集信息
     print(f"=== 第1步：采集 {len(mids)} 个UP主信息 ===\n")
     from fetch import fetch_new
-    added = await fetch_new(mids)
+    with stage("采集"):
+        added = await fetch_new(mids, followings)
 
     if not added:
         print("没有新增UP主")
@@ -152,13 +117,19 @@ async def main():
     # 2. 算法初分类
     print(f"\n=== 第2步：算法初分类 ===\n")
 
-    # 动态导入classify模块的分类函数
-    from classify import classify_up
+    # 只加载规则，不需要读取全量UP主数据
+    from classify import Classifier
+    try:
+        classifier = Classifier.from_file()
+    except FileNotFoundError as e:
+        print(f"错误: 未找到分类规则文件 {e.filename}")
+        return
 
     classify_result = load_classify_result()
 
-    for info in added:
-        category, reason = classify_up(info)
+    with stage("分类"):
+        classified = classifier.classify_many(added)
+    for info, (category, reason) in zip(added, classified):
         entry = {"name": info["name"], "mid": info["mid"], "reason": reason}
 
         if category not in classify_result["categories"]:
@@ -172,16 +143,20 @@ async def main():
         print()
 
     # 3. 保存结果
-    save_classify_result(classify_result)
-    save_md(classify_result)
+    with stage("保存结果"):
+        save_classify_result(classify_result)
+        save_md(classify_result)
 
     # 4. 更新信息汇总
     print("=== 第3步：更新信息汇总 ===\n")
-    generate_info()
+    with stage("更新汇总"):
+        generate_info()
 
     print("\n=== 完成 ===")
     print("算法分类仅供参考，建议人工审核后在分类结果.json中调整")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import http_client
+    http_client.configure()
+    run_profiled("add_new", lambda: http_client.run(main()))
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+B站接口响应的本地缓存（SQLite）
+按 接口名 + 参数 缓存原始响应，每个接口有各自的有效期；
+离线模式下只读缓存、不发任何网络请求，可用于反复调整规则后重建数据。
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# 各接口的缓存有效期（秒），None 表示永久有效
+TTLS = {
+    "followings": 3600,
+    "user_info": 86400,
+    "channel_list": 86400,
+    "space_videos": 6 * 3600,
+    "articles": 86400,
+    "video_tags": None,  # 视频标签发布后几乎不变
+}
+
+MODES = ("on", "off", "only")
+
+
+class CacheMiss(Exception):
+    """离线模式下缓存未命中"""
+
+
+class ApiCache:
+    """mode: on=读写缓存，off=不使用缓存，only=只读缓存（离线）"""
+
+    def __init__(self, path, mode="on"):
+        self.path = Path(path)
+        self.mode = mode
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def offline(self):
+        return self.mode == "only"
+
+    def set_mode(self, mode):
+        if mode not in MODES:
+            raise ValueError(f"未知缓存模式: {mode}")
+        self.mode = mode
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY,"
+                " endpoint TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_endpoint ON responses(endpoint)")
+        return self._conn
+
+    @staticmethod
+    def make_key(endpoint, params):
+        return endpoint + ":" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+    def get(self, endpoint, params):
+        """读取缓存，过期或不存在返回 None；离线模式忽略有效期"""
+        row = self._db().execute(
+            "SELECT value, created FROM responses WHERE key = ?",
+            (self.make_key(endpoint, params),),
+        ).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        ttl = TTLS.get(endpoint, 0)
+        if not self.offline and ttl is not None and time.time() - created > ttl:
+            return None
+        return json.loads(value)
+
+    def put(self, endpoint, params, value):
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, endpoint, value, created) VALUES (?, ?, ?, ?)",
+            (self.make_key(endpoint, params), endpoint, json.dumps(value, ensure_ascii=False), time.time()),
+        )
+        db.commit()
+
+    async def fetch(self, endpoint, params, factory, fresh=False):
+        """先查缓存，未命中再调用 factory() 发请求并写回缓存
+
+        fresh=True 时跳过缓存读取、直接请求并更新缓存（离线模式下仍只读缓存）
+        """
+        if self.mode == "only" or (self.mode == "on" and not fresh):
+            cached = self.get(endpoint, params)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            if self.offline:
+                self.misses += 1
+                raise CacheMiss(f"{endpoint} {params}")
+
+        self.misses += 1
+        value = await factory()
+        if self.mode == "on" and value is not None:
+            self.put(endpoint, params, value)
+        return value
+
+    def purge_expired(self):
+        """删除已过期的缓存条目"""
+        if not self.path.exists():
+            return 0
+        db = self._db()
+        now = time.time()
+        removed = 0
+        for endpoint, ttl in TTLS.items():
+            if ttl is not None:
+                removed += db.execute(
+                    "DELETE FROM responses WHERE endpoint = ? AND created < ?",
+                    (endpoint, now - ttl),
+                ).rowcount
+        db.commit()
+        return removed
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
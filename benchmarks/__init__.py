@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试：在合成数据上测量分类、汇总和存储的耗时
+
+  python -m benchmarks.synth --uploaders 10000 --output bench_data   # 只生成合成数据
+  python -m benchmarks.run                                           # 运行基准，结果写入 JSON
+  python -m benchmarks.run --compare old.json new.json               # 对比两次结果
+  python benchmarks/bench_keywords.py                                # 关键词计分对比
+  python -m benchmarks.bench_fetch --concurrency 1,4,16              # 对模拟接口端到端采集
+  python -m benchmarks.bench_memory --uploaders 100000               # dict 与 model.Uploader 的峰值内存
+"""
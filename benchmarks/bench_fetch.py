@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+端到端采集基准：fetch_all 对进程内模拟接口（mock_api.py）运行，不联网
+用法: python -m benchmarks.bench_fetch [--uploaders 200] [--concurrency 1,4,16] [--latency 50]
+                                        [--error-rate 0.01] [--risk-every 300] [--risk-burst 20]
+                                        [--limit-scale 100] [--credentials 1] [--banned 0]
+
+--latency 为每个请求的平均延迟（毫秒）。
+--limit-scale 把限速器的各项速率放大若干倍，默认 100 倍，即主要测量并发与延迟的关系；
+设为 1 时按真实限速运行。
+--credentials N 用 N 个凭证分片采集（模拟接口按凭证分别计算风控），其中 --banned 个凭证一开始就被封禁。
+有封禁的凭证时，另用同样数量的正常凭证（不含被封的）跑一次作对照，
+含封禁凭证的一次明显更慢（超过对照的 1.5 倍）时以非零状态退出。
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fetch
+import ratelimit
+from benchmarks.run import data_dir
+from benchmarks.synth import get_option
+from http_client import use_transport
+from mock_api import MockBilibili, MockTransport
+
+
+def make_limiter(scale):
+    rate, max_rate = ratelimit.GLOBAL_BUDGET
+    return ratelimit.RateLimiter({
+        name: (rate * scale, max_rate * scale) for name, (rate, max_rate) in ratelimit.BUDGETS.items()
+    }, (rate * scale, max_rate * scale))
+
+
+def account(i):
+    return {"sessdata": f"mock{i}", "bili_jct": "mock", "buvid3": "mock", "dedeuserid": "1"}
+
+
+def run_once(api, concurrency, scale, credentials=1):
+    """在临时数据目录中跑一次全量采集，返回 (耗时, 采集到的UP主数)"""
+    fetch.limiter = make_limiter(scale)
+    fetch.tag_collector = fetch.TagCollector()
+    fetch.api_cache.set_mode("off")
+    use_transport(lambda: MockTransport(api))
+
+    with tempfile.TemporaryDirectory() as tmp, data_dir(tmp):
+        with open(Path(tmp) / "config.json", "w", encoding="utf-8") as f:
+            json.dump({"bilibili": account(0), "fetch_accounts": [account(i) for i in range(1, credentials)]}, f)
+        saved = fetch.DATA_PATH, fetch.FETCH_JOURNAL_PATH
+        fetch.DATA_PATH, fetch.FETCH_JOURNAL_PATH = Path(tmp), Path(tmp) / "采集日志.jsonl"
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                asyncio.run(fetch.fetch_all(concurrency=concurrency))
+                elapsed = time.perf_counter() - start
+            count = len(fetch.load_data())
+        finally:
+            fetch.DATA_PATH, fetch.FETCH_JOURNAL_PATH = saved
+    return elapsed, count
+
+
+def main():
+    args = sys.argv[1:]
+    uploader_count = get_option(args, "--uploaders", 200)
+    levels = [int(c) for c in get_option(args, "--concurrency", "1,4,16").split(",")]
+    latency = get_option(args, "--latency", 50) / 1000
+    error_rate = float(get_option(args, "--error-rate", "0"))
+    risk_every = get_option(args, "--risk-every", 0)
+    risk_burst = get_option(args, "--risk-burst", 0)
+    scale = get_option(args, "--limit-scale", 100)
+    credentials = get_option(args, "--credentials", 1)
+    banned = get_option(args, "--banned", 0)
+
+    print(f"{uploader_count} 个UP主，延迟 {latency * 1000:.0f}ms，错误率 {error_rate}，"
+          f"风控 每{risk_every}个请求{risk_burst}次，限速 x{scale}，凭证 {credentials}（封禁 {banned}）")
+    slow = []
+    for concurrency in levels:
+        api = MockBilibili(uploaders=uploader_count, latency=latency, error_rate=error_rate,
+                           risk_every=risk_every, risk_burst=risk_burst,
+                           banned=[f"mock{credentials - 1 - i}" for i in range(banned)])
+        elapsed, count = run_once(api, concurrency, scale, credentials)
+        stats = api.stats()
+        print(f"  并发 {concurrency:>3}: {elapsed:7.2f}s  {count / elapsed:7.1f} 个/秒  "
+              f"请求 {stats['requests']}  错误 {stats['errors']}  风控 {stats['risk_events']}  "
+              f"重试 {fetch.limiter.retries}")
+        if banned and credentials > banned:
+            api = MockBilibili(uploaders=uploader_count, latency=latency, error_rate=error_rate,
+                               risk_every=risk_every, risk_burst=risk_burst)
+            baseline, _ = run_once(api, concurrency, scale, credentials - banned)
+            print(f"        对照（{credentials - banned} 个正常凭证）: {baseline:7.2f}s")
+            if elapsed > baseline * 1.5:
+                slow.append(concurrency)
+
+    if slow:
+        sys.exit(f"并发 {slow} 时含封禁凭证的采集比对照慢 1.5 倍以上")
+
+
+if __name__ == "__main__":
+    main()
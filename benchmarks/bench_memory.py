@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+内存基准：比较按 dict 读取与按 model.Uploader 读取时的峰值内存（RSS）
+用法: python -m benchmarks.bench_memory [--uploaders 100000] [--backend json|sqlite]
+
+合成数据由子进程生成并写到临时目录，每种方式再各在一个子进程中运行
+（读取数据 → 分类 → 生成信息汇总），报告各阶段结束时的峰值 RSS。
+主进程本身不持有数据：Linux 上子进程会继承父进程的峰值 RSS。
+依赖 resource 模块，仅支持 Linux / macOS。
+"""
+
+import contextlib
+import io
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.synth import get_option, make_dataset, write_dataset
+
+MODES = ("dict", "model")
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def child(mode, path, backend):
+    """在子进程中运行，向标准输出打印一行 JSON"""
+    import classify
+    import generate_info
+    import store
+    from benchmarks.run import data_dir
+
+    result = {"baseline": peak_rss_mb()}
+    with data_dir(path, backend), contextlib.redirect_stdout(io.StringIO()):
+        if mode == "dict":
+            # 模拟改动前的读取方式
+            store.JsonStore.load_models = store.JsonStore.load_all
+            store.SqliteStore.load_models = store.SqliteStore.load_all
+        uploaders = classify.load_uploaders()
+        result["load"] = peak_rss_mb()
+        classifier = classify.Classifier.from_file(classify.rules_path)
+        classifier.classify_many(uploaders)
+        result["classify"] = peak_rss_mb()
+        del uploaders
+        generate_info.main()
+        result["generate_info"] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def write(path, count, backend):
+    """在子进程中生成合成数据"""
+    rules, uploaders = make_dataset(count)
+    write_dataset(path, rules, uploaders)
+    if backend == "sqlite":
+        import store
+        from benchmarks.run import data_dir
+
+        with data_dir(path, backend):
+            db = store.SqliteStore()
+            db.save_all(uploaders)
+            db.close()
+
+
+def run_child(*args):
+    return subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_memory", *map(str, args)],
+        cwd=Path(__file__).resolve().parent.parent, capture_output=True, text=True, check=True,
+    ).stdout
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        child(args[1], args[2], args[3])
+        return
+    if args and args[0] == "--write":
+        write(args[1], int(args[2]), args[3])
+        return
+
+    count = get_option(args, "--uploaders", 100000)
+    backend = get_option(args, "--backend", "json")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_child("--write", tmp, count, backend)
+
+        print(f"{count} 个UP主，{backend} 存储，峰值 RSS（MB）:")
+        print(f"  {'方式':<8}{'启动':>10}{'读取后':>10}{'分类后':>10}{'汇总后':>10}")
+        for mode in MODES:
+            out = run_child("--child", mode, tmp, backend)
+            r = json.loads(out.strip().splitlines()[-1])
+            print(f"  {mode:<8}{r['baseline']:>10.0f}{r['load']:>10.0f}{r['classify']:>10.0f}{r['generate_info']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
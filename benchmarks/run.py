@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试：在合成数据上计时分类、信息汇总和数据读写，结果写入 JSON
+用法:
+  python -m benchmarks.run [--sizes 1000,10000] [--keywords 400] [--repeat 3] [--output 结果.json]
+  python -m benchmarks.run --sizes 1000,10000,100000     # 包含 10 万UP主（耗时较长）
+  python -m benchmarks.run --compare 旧.json 新.json     # 对比两次结果
+
+合成数据放在临时目录，运行期间各模块的数据路径临时指向那里，不会改动 data/。
+默认输出到 local/benchmarks/<提交号>.json，便于在不同提交之间对比。
+"""
+
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import add_new
+import classify
+import fetch
+import generate_info
+import store
+from benchmarks.synth import get_option, make_dataset, write_dataset
+
+BASE_PATH = Path(__file__).resolve().parent.parent
+RESULTS_PATH = BASE_PATH / "local" / "benchmarks"
+
+
+@contextlib.contextmanager
+def data_dir(path, backend="json"):
+    """把各模块读写的数据路径临时指向 path"""
+    path = Path(path)
+    with open(path / "config.json", "w", encoding="utf-8") as f:
+        json.dump({"storage": backend}, f)
+    targets = [
+        (store, "DATA_PATH", path),
+        (store, "JSON_PATH", path / "up主详细数据.json"),
+        (store, "DB_PATH", path / "uploaders.db"),
+        (classify, "data_path", path),
+        (classify, "rules_path", path / "classify_rules.json"),
+        (add_new, "DATA_PATH", path),
+        (generate_info, "OUTPUT_PATH", path / "up主信息汇总.txt"),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in targets]
+    for module, name, value in targets:
+        setattr(module, name, value)
+    try:
+        yield path
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def measure(func, repeat):
+    """运行 repeat 次，返回每次的耗时（秒）；被测函数的输出不打印"""
+    runs = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - start)
+    return runs
+
+
+def run_classify_main(*args):
+    argv = sys.argv
+    sys.argv = ["classify.py", *args]
+    try:
+        classify.main()
+    finally:
+        sys.argv = argv
+
+
+def run_size(uploader_count, keyword_count, repeat):
+    """在一份合成数据上运行全部基准，返回 [(名称, 每次耗时), ...]"""
+    rules, uploaders = make_dataset(uploader_count, keyword_count)
+    classifier = classify.Classifier(rules)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_dataset(tmp, rules, uploaders)
+        with data_dir(tmp, "json"):
+            results.append(("calculate_category_scores", measure(
+                lambda: [classifier.calculate_category_scores(up) for up in uploaders], repeat)))
+            results.append(("classify_up", measure(
+                lambda: [classifier.classify(up) for up in uploaders], repeat)))
+            try:
+                import numpy  # noqa: F401
+                results.append(("classify_many[numpy]", measure(
+                    lambda: classifier.classify_many(uploaders, engine="numpy"), repeat)))
+            except ImportError:
+                pass
+            results.append(("classify.main", measure(lambda: run_classify_main("--no-cache"), repeat)))
+            measure(run_classify_main, 1)     # 先填满分类缓存
+            results.append(("classify.main[cached]", measure(run_classify_main, repeat)))
+            results.append(("generate_info.main", measure(generate_info.main, repeat)))
+            results.append(("add_new.generate_info", measure(add_new.generate_info, repeat)))
+            results.append(("load_data[json]", measure(fetch.load_data, repeat)))
+            results.append(("save_data[json]", measure(lambda: fetch.save_data(uploaders), repeat)))
+
+        with data_dir(tmp, "sqlite"):
+            fetch.save_data(uploaders)
+            results.append(("load_data[sqlite]", measure(fetch.load_data, repeat)))
+            results.append(("save_data[sqlite]", measure(lambda: fetch.save_data(uploaders), repeat)))
+
+    return results
+
+
+def git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_PATH, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(old_path, new_path):
+    """按 (名称, UP主数) 对比两份结果的最短耗时"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    old_best = {(r["name"], r["uploaders"]): r["best"] for r in old["results"]}
+    print(f"{old['commit']} -> {new['commit']}")
+    for r in new["results"]:
+        key = (r["name"], r["uploaders"])
+        if key in old_best:
+            ratio = r["best"] / old_best[key] if old_best[key] else float("inf")
+            print(f"  {r['name']:<28} {r['uploaders']:>7}  {old_best[key]:8.3f}s -> {r['best']:8.3f}s  x{ratio:.2f}")
+
+
+def main():
+    args = sys.argv[1:]
+    if "--compare" in args:
+        i = args.index("--compare")
+        compare(args[i + 1], args[i + 2])
+        return
+
+    sizes = [int(s) for s in get_option(args, "--sizes", "1000,10000").split(",")]
+    keyword_count = get_option(args, "--keywords", 400)
+    repeat = max(1, get_option(args, "--repeat", 3))
+    commit = git_commit()
+    output = Path(get_option(args, "--output", str(RESULTS_PATH / f"{commit}.json")))
+
+    report = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "keywords": keyword_count,
+        "repeat": repeat,
+        "results": [],
+    }
+    for size in sizes:
+        print(f"\n{size} 个UP主，{keyword_count} 个关键词:")
+        for name, runs in run_size(size, keyword_count, repeat):
+            best = min(runs)
+            report["results"].append({
+                "name": name,
+                "uploaders": size,
+                "best": best,
+                "median": statistics.median(runs),
+                "runs": runs,
+            })
+            print(f"  {name:<28} {best:8.3f}s")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果保存到: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+合成数据生成器：生成与 up主详细数据.json、classify_rules.json 结构相同的数据
+用法: python -m benchmarks.synth [--uploaders 10000] [--keywords 400] [--seed 42] [--output bench_data]
+
+标题、标签由常用汉字随机组成，并按UP主的"主分类"混入该分类的关键词；
+投稿分区取自 fetch.ZONE_MAP。同样的参数总是生成同样的数据。
+"""
+
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fetch import ZONE_MAP
+
+# 合成文本用的常见汉字
+HANZI = "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理世车"
+
+CATEGORY_NAMES = ["科技", "游戏", "音乐", "生活", "知识", "影视", "美食", "运动", "动画", "财经"]
+
+ZONE_NAMES = sorted(set(ZONE_MAP.values()))
+
+
+def random_word(rng, low=2, high=4):
+    return "".join(rng.choice(HANZI) for _ in range(rng.randint(low, high)))
+
+
+def make_keyword_rules(rng, keyword_count):
+    """生成 keyword_rules：关键词平均分到各分类，权重 1~10"""
+    rules = {cat: [] for cat in CATEGORY_NAMES}
+    for i in range(keyword_count):
+        cat = CATEGORY_NAMES[i % len(CATEGORY_NAMES)]
+        rules[cat].append([random_word(rng), rng.randint(1, 10)])
+    return rules
+
+
+def make_rules(rng, keyword_count):
+    """生成完整的分类规则，每个分类对应 3 个投稿分区"""
+    return {
+        "categories": list(CATEGORY_NAMES),
+        "default_category": CATEGORY_NAMES[3],
+        "manual": {f"手动{i}": CATEGORY_NAMES[i % len(CATEGORY_NAMES)] for i in range(20)},
+        "keyword_rules": make_keyword_rules(rng, keyword_count),
+        "zone_mapping": {cat: rng.sample(ZONE_NAMES, 3) for cat in CATEGORY_NAMES},
+    }
+
+
+def make_text(rng, vocabulary):
+    """模拟一个UP主的签名、合集、30个标题和标签拼成的文本"""
+    parts = []
+    for _ in range(rng.randint(20, 60)):
+        if rng.random() < 0.3:
+            parts.append(rng.choice(vocabulary))
+        parts.append(random_word(rng, 4, 16))
+    return " ".join(parts).lower()
+
+
+def make_phrase(rng, home_words, all_words, low=6, high=20):
+    """一条标题：随机汉字中混入主分类关键词，偶尔混入其他分类的关键词"""
+    parts = [random_word(rng, 2, 6) for _ in range(rng.randint(1, 3))]
+    if home_words and rng.random() < 0.4:
+        parts.insert(rng.randint(0, len(parts)), rng.choice(home_words))
+    if rng.random() < 0.1:
+        parts.insert(rng.randint(0, len(parts)), rng.choice(all_words))
+    text = "".join(parts)
+    return text if len(text) >= low else text + random_word(rng, low - len(text), high - len(text))
+
+
+def make_uploader(rng, mid, rules, all_words):
+    """一个UP主的记录，字段顺序与 fetch.fetch_one 的输出一致"""
+    home = rng.choice(rules["categories"])
+    home_words = [kw for kw, _ in rules["keyword_rules"].get(home, [])]
+    home_zones = rules["zone_mapping"].get(home, [])
+
+    zones = []
+    for _ in range(rng.randint(0, 4)):
+        zone = rng.choice(home_zones) if home_zones and rng.random() < 0.6 else rng.choice(ZONE_NAMES)
+        if zone not in zones:
+            zones.append(zone)
+
+    video_count = 30 if rng.random() < 0.7 else rng.randint(0, 30)
+    if not video_count:
+        zones = []
+    # 每个视频落在一个分区（部分视频的分区不在 ZONE_MAP 中，不计入）
+    zone_counts = {zone: 0 for zone in zones}
+    for _ in range(video_count if zones else 0):
+        if rng.random() < 0.9:
+            zone_counts[rng.choice(zones)] += 1
+    zone_counts = {zone: count for zone, count in zone_counts.items() if count}
+    zones = list(zone_counts)
+    tags = list(dict.fromkeys(
+        rng.choice(home_words) if home_words and rng.random() < 0.3 else random_word(rng)
+        for _ in range(rng.randint(0, 15) if video_count else 0)
+    ))
+    up = {
+        "mid": mid,
+        "name": random_word(rng, 2, 8),
+        "sign": make_phrase(rng, home_words, all_words, 0, 40) if rng.random() < 0.8 else "",
+        "official_verify": random_word(rng, 4, 12) if rng.random() < 0.1 else "",
+        "channels": [make_phrase(rng, home_words, all_words, 2, 10) for _ in range(rng.choice([0, 0, 1, 2, 4, 8]))],
+        "series": [make_phrase(rng, home_words, all_words, 2, 10) for _ in range(rng.choice([0, 0, 0, 1, 3]))],
+        "video_titles": [make_phrase(rng, home_words, all_words) for _ in range(video_count)],
+        "video_zones": zones,
+        "video_zone_counts": zone_counts,
+        "tags": tags,
+        "articles": [make_phrase(rng, home_words, all_words) for _ in range(rng.choice([0] * 8 + [3, 10]))],
+        "latest_bvid": f"BV1{mid:09d}" if video_count else "",
+        "latest_created": 1700000000 - rng.randint(0, 10 ** 7) if video_count else 0,
+    }
+    if rng.random() < 0.2:
+        # 旧数据：没有各分区视频数
+        del up["video_zone_counts"]
+    return up
+
+
+def make_dataset(uploader_count, keyword_count=400, seed=42):
+    """返回 (分类规则, UP主列表)"""
+    rng = random.Random(seed)
+    rules = make_rules(rng, keyword_count)
+    all_words = [kw for kws in rules["keyword_rules"].values() for kw, _ in kws]
+    uploaders = [make_uploader(rng, 10000000 + i, rules, all_words) for i in range(uploader_count)]
+    return rules, uploaders
+
+
+def write_dataset(path, rules, uploaders):
+    """写出 classify_rules.json 和 up主详细数据.json"""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    with open(path / "classify_rules.json", "w", encoding="utf-8") as f:
+        json.dump(rules, f, ensure_ascii=False, indent=2)
+    with open(path / "up主详细数据.json", "w", encoding="utf-8") as f:
+        json.dump(uploaders, f, ensure_ascii=False, indent=2)
+
+
+def get_option(args, name, default):
+    """读取形如 --name N 的参数，default 为整数时按整数解析"""
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            value = args[i + 1]
+            if not isinstance(default, int):
+                return value
+            if value.isdigit():
+                return int(value)
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    uploader_count = get_option(args, "--uploaders", 10000)
+    keyword_count = get_option(args, "--keywords", 400)
+    seed = get_option(args, "--seed", 42)
+    output = Path(get_option(args, "--output", "bench_data"))
+
+    rules, uploaders = make_dataset(uploader_count, keyword_count, seed)
+    write_dataset(output, rules, uploaders)
+    print(f"已生成 {uploader_count} 个UP主、{keyword_count} 个关键词到 {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,46 +5,55 @@ B站关注UP主分类脚本
 
 首次使用请先创建规则文件：
   复制 classify_rules.example.json 到 data/classify_rules.json，然后按需修改。
+
+分类结果缓存在 data/分类缓存.db，规则和UP主数据都没变时不再重新计分；--no-cache 跳过缓存。
+
+调整规则时可用 python classify.py impact：借助倒排索引（data/规则索引.db）只重算
+受改动影响的UP主，并列出分类变化及原因。
+
+作为模块使用时不会读取任何文件，需要时再构造 Classifier：
+  classifier = Classifier.from_file()
+  category, reason = classifier.classify(up_info)
 """
 
 import json
-import re
+import sys
 from pathlib import Path
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from matcher import KeywordMatcher
+from profiling import run_profiled, stage
+from result_cache import ResultCache
+from store import data_file, open_store
 
 base_path = Path(__file__).parent
 data_path = base_path / "data"
 rules_path = data_path / "classify_rules.json"
 
-# ========== 加载规则 ==========
-if not rules_path.exists():
-    print(f"错误: 未找到分类规则文件 {rules_path}")
-    print(f"请先复制 classify_rules.example.json 到 data/classify_rules.json，然后按需修改。")
-    exit(1)
+# 分区关键词加分：全部投稿都在命中的分区时加满，按所占比例折算
+ZONE_BONUS = 50
 
-with open(rules_path, "r", encoding="utf-8") as f:
-    rules = json.load(f)
-
-CATEGORIES = rules["categories"]
-DEFAULT_CATEGORY = rules.get("default_category", CATEGORIES[-1])
-MANUAL = rules.get("manual", {})
-KEYWORD_RULES = {k: [(kw, w) for kw, w in v] for k, v in rules.get("keyword_rules", {}).items()}
-ZONE_MAPPING = rules.get("zone_mapping", {})
-
-print(f"已加载规则: {len(CATEGORIES)}个分类, {len(MANUAL)}个手动指定")
-
-# ========== 加载UP主数据 ==========
-with open(data_path / "up主详细数据.json", "r", encoding="utf-8") as f:
-    uploaders = json.load(f)
+# 名称、认证等特殊规则：(字段, 关键词组, 分类, 加分)
+# 字段文本（小写）对每一组都至少包含其中一个关键词时加分；分类为 None 表示默认分类
+SPECIAL_RULES = (
+    ("name", (("机器人", "robomaster", "战队"),), "电气/电子/自动化", 80),
+    ("name", (("半导体",),), "电气/电子/自动化", 80),
+    # 大学官方号
+    ("official_verify", (("大学",), ("官方",)), "校园生活/校园日常", 100),
+    # 招聘号
+    ("name", (("招聘",),), None, 80),
+)
 
-print(f"加载 {len(uploaders)} 个UP主数据")
 
+def load_rules(path=rules_path):
+    """读取分类规则文件"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
-def calculate_category_scores(up_info):
-    """计算每个分类的得分"""
-    scores = {cat: 0 for cat in CATEGORIES}
 
-    # 收集所有文本
+def combined_text(up_info):
+    """参与关键词匹配的全部文本（小写）"""
     texts = []
     texts.append(up_info.get("sign", "") or "")
     texts.append(up_info.get("official_verify", "") or "")
@@ -53,105 +62,359 @@ def calculate_category_scores(up_info):
     texts.extend(up_info.get("video_titles", []))
     texts.extend(up_info.get("tags", []))
     texts.extend(up_info.get("articles", []))
+    return " ".join(texts).lower()
+
+
+def zone_histogram(up_info):
+    """(投稿分区(小写) -> 视频数, 是否有视频数)
+
+    旧数据只有去重后的分区列表，每个分区记 1，计分时按命中与否加满分。
+    """
+    histogram = {}
+    counts = up_info.get("video_zone_counts")
+    if counts:
+        for zone, count in counts.items():
+            zone = zone.lower()
+            histogram[zone] = histogram.get(zone, 0) + count
+        return histogram, True
+    for zone in up_info.get("video_zones", []):
+        histogram[zone.lower()] = 1
+    return histogram, False
+
+
+class Classifier:
+    """按分类规则给UP主打分、归类
+
+    rules 为规则字典（结构同 classify_rules.json），关键词匹配器在构造时编译一次。
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.categories = rules["categories"]
+        self.default_category = rules.get("default_category", self.categories[-1])
+        self.manual = rules.get("manual", {})
+        # 关键词统一小写（匹配时文本也转小写）
+        self.keyword_rules = {k: [(kw.lower(), w) for kw, w in v] for k, v in rules.get("keyword_rules", {}).items()}
+        self.zone_mapping = rules.get("zone_mapping", {})
+
+        # 全部关键词编译成一个自动机，每个UP主的文本只扫描一遍
+        self.keyword_matcher = KeywordMatcher(
+            kw for kws in self.keyword_rules.values() for kw, _ in kws
+        )
+
+        # 关键词 -> [(在规则中的顺序, 分类, 权重), ...]：计分时只看出现过的关键词，
+        # 按顺序排序后累加，与逐条遍历规则的累加顺序相同
+        self._keyword_slots = {}
+        categories = set(self.categories)
+        order = 0
+        for category, keywords in self.keyword_rules.items():
+            if category in categories:
+                for keyword, weight in keywords:
+                    self._keyword_slots.setdefault(keyword, []).append((order, category, weight))
+                    order += 1
+
+        # 分区关键词按 zone_mapping 中的顺序编号；分区名命中哪些关键词按分区名缓存
+        self.zone_terms = [
+            (category, kw) for category, kws in self.zone_mapping.items() if category in categories for kw in kws
+        ]
+        self._zone_matches = {}
+
+    @classmethod
+    def from_file(cls, path=rules_path):
+        """从规则文件构造，文件不存在时抛出 FileNotFoundError"""
+        return cls(load_rules(path))
+
+    def calculate_category_scores(self, up_info):
+        """计算每个分类的得分"""
+        keyword_counts = self.keyword_matcher.count(combined_text(up_info))
+        zone_counts, weighted = zone_histogram(up_info)
+        return self.score_counts(keyword_counts, zone_counts, weighted, up_info)
+
+    def zone_matches(self, zone):
+        """分区名（小写）包含的分区关键词的编号"""
+        matches = self._zone_matches.get(zone)
+        if matches is None:
+            matches = self._zone_matches[zone] = [i for i, (_, kw) in enumerate(self.zone_terms) if kw in zone]
+        return matches
+
+    def zone_bonuses(self, zone_counts, weighted):
+        """分区关键词加分，返回 [(分类, 分数), ...]，顺序同 zone_mapping
+
+        weighted 时按命中分区的视频占比折算；否则（旧数据）命中即加满分。
+        """
+        hits = {}
+        for zone, count in zone_counts.items():
+            for i in self.zone_matches(zone):
+                hits[i] = hits.get(i, 0) + count
+        total = sum(zone_counts.values())
+        bonuses = []
+        for i in sorted(hits):
+            category = self.zone_terms[i][0]
+            bonuses.append((category, ZONE_BONUS * hits[i] / total if weighted and total else ZONE_BONUS))
+        return bonuses
+
+    def score_counts(self, keyword_counts, zone_counts, weighted, up_info):
+        """由关键词出现次数 {关键词(小写): 次数} 和分区视频数（见 zone_histogram）计分
+
+        up_info 只用到名称和认证信息（特殊规则），rule_index 据此只凭索引重算得分。
+        """
+        scores = {cat: 0 for cat in self.categories}
+
+        # 根据分区加分
+        for category, bonus in self.zone_bonuses(zone_counts, weighted):
+            scores[category] += bonus
+
+        # 名称、认证等特殊规则
+        for category, bonus in self.special_bonuses(up_info):
+            if category in scores:
+                scores[category] += bonus
+
+        # 关键词评分（计数与逐个 re.findall 一致，累加顺序不变）
+        hits = []
+        for keyword, count in keyword_counts.items():
+            if count > 0:
+                for order, category, weight in self._keyword_slots.get(keyword, ()):
+                    hits.append((order, category, weight * min(count, 5)))
+        hits.sort()
+        for _, category, points in hits:
+            scores[category] += points
+
+        return scores
+
+    def special_bonuses(self, up_info):
+        """名称、认证特征带来的加分（SPECIAL_RULES），返回 [(分类, 分数), ...]"""
+        bonuses = []
+        for field, groups, category, bonus in SPECIAL_RULES:
+            text = (up_info.get(field, "") or "").lower()
+            if all(any(kw in text for kw in group) for group in groups):
+                bonuses.append((category or self.default_category, bonus))
+        return bonuses
+
+    def classify(self, up_info):
+        """分类单个UP主，返回 (分类, 理由)"""
+        name = up_info.get("name", "")
+
+        # 1. 手动指定优先
+        if name in self.manual:
+            return self.manual[name], "手动指定"
+
+        # 2. 计算分数
+        scores = self.calculate_category_scores(up_info)
+
+        # 3. 找最高分
+        category = self.best_category(scores)
+        if category is None:
+            return self.default_category, "无明确特征，默认归类"
+
+        return category, self.reason(up_info)
+
+    @staticmethod
+    def best_category(scores):
+        """得分最高的分类（同分取靠前的），最高分为 0 时返回 None"""
+        if max(scores.values()) == 0:
+            return None
+        return max(scores, key=scores.get)
+
+    @staticmethod
+    def reason(up_info):
+        """分类理由：签名、合集和标签摘要（与得分无关）"""
+        reason_parts = []
+        sign = up_info.get("sign", "") or ""
+        if sign:
+            reason_parts.append(f"签名含'{sign[:30]}..'" if len(sign) > 30 else f"签名'{sign}'")
+
+        channels = up_info.get("channels", [])
+        if channels:
+            reason_parts.append(f"合集有{channels[:3]}")
+
+        tags = up_info.get("tags", [])[:5]
+        if tags:
+            reason_parts.append(f"标签含{tags}")
+
+        return "；".join(reason_parts) if reason_parts else "综合分析得分最高"
+
+    def classify_many(self, uploaders, workers=1, engine="python"):
+        """批量分类，按输入顺序返回 [(分类, 理由), ...]
+
+        workers > 1 时分块交给进程池计算；engine="numpy" 时整批矩阵计分（需要 numpy）。
+        两种方式的结果都与逐个 classify 完全一致。
+        """
+        uploaders = list(uploaders)
+        if engine == "numpy":
+            from numpy_engine import NumpyScorer
+            return NumpyScorer(self).classify_many(uploaders)
+        if workers > 1 and len(uploaders) > 1:
+            return classify_in_pool(self.rules, uploaders, workers)
+        return [self.classify(up) for up in uploaders]
+
+
+# ========== 多进程批量分类 ==========
+_worker_classifier = None
 
-    combined_text = " ".join(texts).lower()
 
-    # 视频分区
-    video_zones = up_info.get("video_zones", [])
-    zones_text = " ".join(video_zones).lower()
+def _init_worker(rules):
+    """每个工作进程只编译一次规则"""
+    global _worker_classifier
+    _worker_classifier = Classifier(rules)
+
+
+def _classify_chunk(chunk):
+    return [_worker_classifier.classify(up) for up in chunk]
+
+
+def classify_in_pool(rules, uploaders, workers):
+    """按顺序切块并行分类，再按原顺序拼接结果"""
+    # 每个进程分到约4块，兼顾负载均衡和进程间传输开销
+    chunk_size = max(1, -(-len(uploaders) // (workers * 4)))
+    chunks = [uploaders[i:i + chunk_size] for i in range(0, len(uploaders), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rules,)) as pool:
+        for part in pool.map(_classify_chunk, chunks):
+            results.extend(part)
+    return results
 
-    # 根据分区加分
-    for category, zone_keywords in ZONE_MAPPING.items():
-        if category in scores:
-            for kw in zone_keywords:
-                if kw in zones_text:
-                    scores[category] += 50
 
-    # 名称特征识别
-    name = up_info.get("name", "").lower()
+# ========== 兼容旧接口：首次调用时才加载默认规则 ==========
+_default_classifier = None
 
-    if any(kw in name for kw in ["机器人", "robomaster", "战队"]):
-        if "电气/电子/自动化" in scores:
-            scores["电气/电子/自动化"] += 80
 
-    if "半导体" in name:
-        if "电气/电子/自动化" in scores:
-            scores["电气/电子/自动化"] += 80
+def get_default_classifier():
+    global _default_classifier
+    if _default_classifier is None:
+        _default_classifier = Classifier.from_file()
+    return _default_classifier
 
-    # 大学官方号
-    official = up_info.get("official_verify", "") or ""
-    if "大学" in official and "官方" in official:
-        if "校园生活/校园日常" in scores:
-            scores["校园生活/校园日常"] += 100
 
-    # 招聘号
-    if "招聘" in name:
-        if DEFAULT_CATEGORY in scores:
-            scores[DEFAULT_CATEGORY] += 80
-
-    # 关键词评分
-    for category, keywords in KEYWORD_RULES.items():
-        if category in scores:
-            for keyword, weight in keywords:
-                count = len(re.findall(re.escape(keyword.lower()), combined_text))
-                if count > 0:
-                    scores[category] += weight * min(count, 5)
-
-    return scores
+def calculate_category_scores(up_info):
+    """计算每个分类的得分（使用 data/classify_rules.json）"""
+    return get_default_classifier().calculate_category_scores(up_info)
 
 
 def classify_up(up_info):
-    """分类单个UP主"""
-    name = up_info.get("name", "")
-
-    # 1. 手动指定优先
-    if name in MANUAL:
-        return MANUAL[name], "手动指定"
-
-    # 2. 计算分数
-    scores = calculate_category_scores(up_info)
-
-    # 3. 找最高分
-    max_score = max(scores.values())
-    if max_score == 0:
-        return DEFAULT_CATEGORY, "无明确特征，默认归类"
-
-    best_category = max(scores, key=scores.get)
-
-    # 4. 生成理由
-    reason_parts = []
-    sign = up_info.get("sign", "") or ""
-    if sign:
-        reason_parts.append(f"签名含'{sign[:30]}..'" if len(sign) > 30 else f"签名'{sign}'")
-
-    channels = up_info.get("channels", [])
-    if channels:
-        reason_parts.append(f"合集有{channels[:3]}")
-
-    tags = up_info.get("tags", [])[:5]
-    if tags:
-        reason_parts.append(f"标签含{tags}")
-
-    reason = "；".join(reason_parts) if reason_parts else "综合分析得分最高"
-
-    return best_category, reason
+    """分类单个UP主（使用 data/classify_rules.json）"""
+    return get_default_classifier().classify(up_info)
 
 
 # ========== 执行分类 ==========
-if __name__ == "__main__":
-    results = {cat: [] for cat in CATEGORIES}
-
-    for up in uploaders:
-        category, reason = classify_up(up)
+def get_option(args, name, default):
+    """读取形如 --name N 的整数参数"""
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args) and args[i + 1].isdigit():
+            return int(args[i + 1])
+    return default
+
+
+def load_uploaders():
+    store = open_store()
+    try:
+        return store.load_models()
+    finally:
+        store.close()
+
+
+def impact(args):
+    """只重算受规则改动影响的UP主，列出分类变化"""
+    from rule_index import RuleIndex
+
+    classifier = Classifier.from_file(rules_path)
+    index = RuleIndex(data_path / "规则索引.db")
+    try:
+        with stage("更新索引"):
+            result = index.update(classifier, load_uploaders, data_file())
+
+        total = index.conn.execute("SELECT COUNT(*) FROM uploaders").fetchone()[0]
+        print(f"{total} 个UP主，重新计分 {result.rescored} 个"
+              + ("（首次建立索引或分类列表变化，全部重算）" if result.rebuilt else ""))
+        if result.added or result.removed:
+            print(f"数据变化: 新增 {len(result.added)}，移除 {len(result.removed)}")
+
+        if result.moves:
+            limit = len(result.moves) if "--all" in args else 50
+            print(f"\n分类变化 ({len(result.moves)}):")
+            for mid, name, old, new, why in result.moves[:limit]:
+                print(f"  {name} ({mid}): {old} → {new}")
+                for line in why:
+                    print(f"      {line}")
+            if len(result.moves) > limit:
+                print(f"  ……另有 {len(result.moves) - limit} 个，加 --all 查看全部")
+        elif not result.rebuilt:
+            print("没有UP主的分类发生变化")
+        for mid, name, category in result.removed:
+            print(f"  已移除: {name} ({mid}) {category or ''}")
+
+        if result.changed:
+            with stage("写入结果"):
+                save_results(classifier, index.entries())
+    finally:
+        index.close()
+
+
+def main():
+    args = sys.argv[1:]
+    workers = get_option(args, "--workers", 1)
+    engine = "python"
+    if "--engine" in args:
+        i = args.index("--engine")
+        engine = args[i + 1] if i + 1 < len(args) else ""
+    if engine not in ("python", "numpy"):
+        print(f"错误: 未知的计分引擎 {engine}，可选 python / numpy")
+        exit(1)
+    if engine == "numpy":
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            print("错误: --engine numpy 需要先安装 numpy（pip install numpy）")
+            exit(1)
+
+    if not rules_path.exists():
+        print(f"错误: 未找到分类规则文件 {rules_path}")
+        print(f"请先复制 classify_rules.example.json 到 data/classify_rules.json，然后按需修改。")
+        exit(1)
+
+    if args and args[0] == "impact":
+        impact(args)
+        return
+
+    with stage("读取规则"):
+        classifier = Classifier.from_file(rules_path)
+    print(f"已加载规则: {len(classifier.categories)}个分类, {len(classifier.manual)}个手动指定")
+
+    with stage("读取数据"):
+        uploaders = load_uploaders()
+
+    print(f"加载 {len(uploaders)} 个UP主数据")
+    if engine == "numpy":
+        print("使用 numpy 整批计分")
+    elif workers > 1:
+        print(f"使用 {workers} 个进程并行分类")
+
+    with stage("计分"):
+        if "--no-cache" in args:
+            classified = classifier.classify_many(uploaders, workers=workers, engine=engine)
+        else:
+            cache = ResultCache(data_path / "分类缓存.db")
+            classified = cache.classify_many(classifier, uploaders, workers=workers, engine=engine)
+            cache.close()
+            print(f"分类缓存: 命中 {cache.hits}，重新计分 {cache.misses}")
+    save_results(classifier, (
+        (up["name"], up["mid"], category, reason) for up, (category, reason) in zip(uploaders, classified)
+    ))
+
+
+def save_results(classifier, entries):
+    """按分类汇总 [(名称, mid, 分类, 理由), ...]，写出 分类结果.json 和 分类结果.md"""
+    results = {cat: [] for cat in classifier.categories}
+    for name, mid, category, reason in entries:
         results[category].append({
-            "name": up["name"],
-            "mid": up["mid"],
+            "name": name,
+            "mid": mid,
             "reason": reason
         })
 
     # 统计
     print("\n分类统计:")
-    for cat in CATEGORIES:
+    for cat in classifier.categories:
         count = len(results[cat])
         if count > 0:
             print(f"  {cat}: {count}")
@@ -164,12 +427,12 @@ if __name__ == "__main__":
 
     # 保存JSON
     output = {"categories": sorted_results}
-    with open(data_path / "分类结果.json", "w", encoding="utf-8") as f:
+    with stage("写入JSON"), open(data_path / "分类结果.json", "w", encoding="utf-8") as f:
         json.dump(output, f, ensure_ascii=False, indent=2)
 
     # 保存Markdown
     total = sum(len(ups) for ups in sorted_results.values())
-    with open(data_path / "分类结果.md", "w", encoding="utf-8") as f:
+    with stage("写入Markdown"), open(data_path / "分类结果.md", "w", encoding="utf-8") as f:
         f.write("# B站关注UP主分类结果\n\n")
         f.write(f"总计: {total} 个UP主，{len(sorted_results)} 个分类\n\n")
         f.write("---\n\n")
@@ -183,3 +446,7 @@ if __name__ == "__main__":
 
     print(f"\n完成！共 {total} 个UP主，{len(sorted_results)} 个分类")
     print(f"结果保存到: data/分类结果.json, data/分类结果.md")
+
+
+if __name__ == "__main__":
+    run_profiled("classify", main)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+守护进程：定时检查关注列表，新关注的UP主自动采集、分类，可选同步到关注分组
+用法: python daemon.py [--interval 300] [--batch 20] [--concurrency 2] [--sync] [--once]
+                       [--retry-failed] [--base-url URL] [--profile]
+
+与 add_new.py --new 的区别：分类规则、分类结果和已有UP主的 mid 只在启动时读取一次并常驻内存；
+新关注先写入任务队列（data/任务队列.db，见 job_queue.py），再按批采集、分类，
+每批只写一次 分类结果.json / 分类结果.md；UP主数据按 mid 增量写入，因此需要 SQLite 存储
+（python store.py import，并在 data/config.json 中设置 "storage": "sqlite"），JSON 存储每次都要重写整个文件。
+up主信息汇总.txt 不在这里重写；每个新UP主的信息和算法分类追加到 data/自动分类记录.txt 供人工审核。
+
+--interval: 两次检查之间的秒数（默认 300）
+--batch: 每批采集的UP主数（默认 20）
+--concurrency: 同时采集的UP主数（默认 2）
+--sync: 分类后把新UP主移入对应的关注分组（缺少的分组自动新建）
+--once: 只检查、处理一轮后退出（可配合 cron 使用）
+--retry-failed: 启动时把多次失败的任务重新排队
+--base-url: 请求改发到指定地址（见 mock_api.py），不使用接口缓存
+--profile: 性能分析（见 profiling.py），Ctrl+C 停止后输出
+
+运行中修改 classify_rules.json 或 分类结果.json 会被检测到并重新读取（新规则只用于之后的UP主）。
+"""
+
+import asyncio
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import add_new
+import classify
+import fetch
+import generate_info
+import http_client
+from fetch import (api_cache, fetch_following, get_credential, get_option, get_recent_followings,
+                   get_text_option, load_config)
+from job_queue import CLASSIFIED, DONE, PENDING, JobQueue
+from metrics import save_run_report
+from profiling import run_profiled
+from ratelimit import limiter
+from store import get_backend, open_store
+
+BASE_PATH = Path(__file__).parent
+DATA_PATH = BASE_PATH / "data"
+
+BAN_PAUSE = 1800.0          # 凭证被风控封禁或失效后暂停的秒数
+SYNC_BATCH = 100            # 每次同步分组处理的任务数
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def mtime(path):
+    return path.stat().st_mtime if path.exists() else None
+
+
+class Daemon:
+    def __init__(self, credential, uid, sync=False, batch=20, concurrency=2):
+        self.credential = credential
+        self.uid = uid
+        self.sync = sync
+        self.batch = batch
+        self.concurrency = concurrency
+        self.queue = JobQueue(DATA_PATH / "任务队列.db")
+        self.store = open_store()
+        # 已采集或已在队列中的UP主，检查关注列表时遇到它们就停止翻页
+        self.known = self.store.mids() | self.queue.mids()
+        self.classifier = None
+        self.result = None
+        self._rules_mtime = None
+        self._result_mtime = None
+
+    def close(self):
+        self.queue.close()
+        self.store.close()
+
+    # ---------- 常驻内存的规则和分类结果 ----------
+
+    def load_rules(self):
+        """规则文件有变化时重新读取"""
+        current = mtime(classify.rules_path)
+        if self.classifier is None or current != self._rules_mtime:
+            self.classifier = classify.Classifier.from_file(classify.rules_path)
+            if self._rules_mtime is not None:
+                print(f"[{now()}] 分类规则已更新，之后的UP主按新规则分类")
+            self._rules_mtime = current
+
+    def result_path(self):
+        return add_new.DATA_PATH / "分类结果.json"
+
+    def load_result(self):
+        """分类结果；文件在上次写入后被手动修改过时重新读取"""
+        current = mtime(self.result_path())
+        if self.result is None or current != self._result_mtime:
+            self.result = add_new.load_classify_result()
+            self._result_mtime = current
+        return self.result
+
+    def record(self, infos, results):
+        """把一批新UP主写入分类结果（每批只写一次文件），信息和理由追加到审核记录"""
+        result = self.load_result()
+        mids = {info["mid"] for info in infos}
+        # 重新处理（如中断后重跑）的UP主先从原分类中去掉
+        for cat, ups in result["categories"].items():
+            if any(up["mid"] in mids for up in ups):
+                result["categories"][cat] = [up for up in ups if up["mid"] not in mids]
+        for info, (category, reason) in zip(infos, results):
+            result["categories"].setdefault(category, []).append(
+                {"name": info["name"], "mid": info["mid"], "reason": reason}
+            )
+        add_new.save_classify_result(result)
+        add_new.save_md(result)
+        self._result_mtime = mtime(self.result_path())
+
+        lines = []
+        for info, (category, reason) in zip(infos, results):
+            lines.append(f"[{now()}] {info['name']} → {category}")
+            lines.append(f"  依据: {reason}")
+            lines.extend(generate_info.format_uploader_details(info))
+        with open(DATA_PATH / "自动分类记录.txt", "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    # ---------- 各步骤 ----------
+
+    async def poll(self):
+        """检查关注列表，新关注加入队列，返回加入的个数"""
+        new_follows = await get_recent_followings(self.credential, self.uid, self.known)
+        # 关注列表从新到旧，先关注的先处理
+        added = self.queue.add(reversed(new_follows))
+        self.known.update(up["mid"] for up in new_follows)
+        if added:
+            print(f"[{now()}] 发现 {added} 个新关注")
+        return added
+
+    async def collect(self, entries):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def one(entry):
+            async with semaphore:
+                return await fetch_following(self.credential, entry)
+
+        return await asyncio.gather(*(one(entry) for entry in entries))
+
+    async def process_pending(self):
+        """采集、分类一批待处理的任务，没有可处理的任务时返回 False"""
+        jobs = self.queue.take(PENDING, self.batch)
+        if not jobs:
+            return False
+        mids = [mid for mid, _, _ in jobs]
+        print(f"[{now()}] 采集 {len(jobs)} 个UP主... {limiter.status()}")
+        infos = await self.collect([entry for _, entry, _ in jobs])
+        if limiter.banned:
+            # 结果可能不完整，整批留待之后重试
+            self.queue.fail(mids, "凭证被风控或已失效")
+            return False
+
+        self.store.upsert_many(infos)
+        results = self.classifier.classify_many(infos)
+        self.record(infos, results)
+        categories = {info["mid"]: category for info, (category, _) in zip(infos, results)}
+        self.queue.advance(mids, CLASSIFIED if self.sync else DONE, categories)
+        for info, (category, _) in zip(infos, results):
+            print(f"  {info['name']} → {category}")
+        return True
+
+    async def sync_classified(self):
+        """把已分类的UP主移入对应分组，没有可处理的任务时返回 False"""
+        from sync_groups import assign_groups
+
+        jobs = self.queue.take(CLASSIFIED, SYNC_BATCH)
+        if not jobs:
+            return False
+        mids = [mid for mid, _, _ in jobs]
+        categories = {}
+        for mid, _, category in jobs:
+            categories.setdefault(category, []).append(mid)
+        try:
+            failed = set(await assign_groups(self.credential, categories))
+        except Exception as e:
+            print(f"[{now()}] 同步分组失败: {e}")
+            failed = set(mids)
+        synced = [mid for mid in mids if mid not in failed]
+        self.queue.advance(synced, DONE)
+        if failed:
+            self.queue.fail(sorted(failed), "同步分组失败")
+        print(f"[{now()}] 已移入分组 {len(synced)} 人" + (f"，失败 {len(failed)} 人" if failed else ""))
+        return bool(synced)
+
+    async def cycle(self):
+        """检查一次关注列表，并处理完队列中到期的任务"""
+        # 标签只在一轮内去重（响应仍在接口缓存中），长期运行时不累积
+        fetch.tag_collector.clear()
+        self.load_rules()
+        await self.poll()
+        worked = False
+        while await self.process_pending():
+            worked = True
+        if self.sync:
+            while await self.sync_classified():
+                worked = True
+        if worked:
+            counts = self.queue.counts()
+            print(f"[{now()}] 队列: " + "，".join(f"{status} {n}" for status, n in sorted(counts.items())))
+
+
+async def run(interval=300, batch=20, concurrency=2, sync=False, once=False, retry_failed=False):
+    if get_backend() != "sqlite":
+        print("守护进程需要 SQLite 存储（按 mid 增量写入，不重写整个数据文件）：")
+        print('  python store.py import，然后在 data/config.json 中加入 "storage": "sqlite"')
+        return
+    config = load_config()
+    daemon = Daemon(get_credential(config), config["bilibili"]["dedeuserid"],
+                    sync=sync, batch=batch, concurrency=concurrency)
+    try:
+        if not daemon.store.mids():
+            print("还没有UP主数据，请先运行 python fetch.py all")
+            return
+        try:
+            daemon.load_rules()
+        except FileNotFoundError as e:
+            print(f"错误: 未找到分类规则文件 {e.filename}")
+            return
+        if retry_failed:
+            print(f"重新排队 {daemon.queue.retry_failed()} 个失败的任务")
+        print(f"[{now()}] 守护进程已启动：已知 {len(daemon.known)} 个UP主，每 {interval} 秒检查一次"
+              f"{'，自动同步分组' if sync else ''}")
+
+        while True:
+            try:
+                await daemon.cycle()
+            except Exception as e:
+                # 单轮出错（网络、接口异常等）不退出，未完成的任务留在队列中下轮继续
+                print(f"[{now()}] 本轮出错: {e.__class__.__name__}: {e}")
+            if once:
+                break
+            if limiter.banned:
+                print(f"[{now()}] 凭证被风控或已失效，暂停 {BAN_PAUSE / 60:.0f} 分钟（Cookie 过期时请更新 config.json 后重启）")
+                await asyncio.sleep(BAN_PAUSE)
+                limiter.unban()
+            else:
+                await asyncio.sleep(interval)
+    finally:
+        daemon.close()
+
+
+def main():
+    args = sys.argv[1:]
+    base_url = get_text_option(args, "--base-url")
+    http_client.configure(base_url=base_url)
+    if base_url:
+        # 发往模拟接口等非B站服务时，不能读写真实的接口缓存
+        api_cache.set_mode("off")
+    started = time.time()
+    try:
+        http_client.run(run(
+            interval=get_option(args, "--interval", 300),
+            batch=max(1, get_option(args, "--batch", 20)),
+            concurrency=max(1, get_option(args, "--concurrency", 2)),
+            sync="--sync" in args,
+            once="--once" in args,
+            retry_failed="--retry-failed" in args,
+        ))
+    except KeyboardInterrupt:
+        print(f"\n已停止（运行 {(time.time() - started) / 3600:.1f} 小时），未完成的任务保留在 data/任务队列.db")
+    save_run_report("daemon", " ".join(args), extra={"limiter": limiter.snapshot()})
+
+
+if __name__ == "__main__":
+    run_profiled("daemon", main)
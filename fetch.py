@@ -6,11 +6,29 @@ B站UP主信息采集模块
 
 import json
 import asyncio
+from collections import OrderedDict, deque
 from pathlib import Path
 from bilibili_api import user, video, Credential
 
+import http_client
+from api_cache import ApiCache
+from journal import Journal
+from metrics import metrics, save_run_report
+from profiling import run_profiled, stage
+from ratelimit import current_limiter, limiter
+from store import open_store
+
 BASE_PATH = Path(__file__).parent
 DATA_PATH = BASE_PATH / "data"
+FETCH_JOURNAL_PATH = DATA_PATH / "采集日志.jsonl"
+REFRESH_JOURNAL_PATH = DATA_PATH / "刷新日志.jsonl"
+ZONES_JOURNAL_PATH = DATA_PATH / "分区补充日志.jsonl"
+
+# 保存的最近视频标题数（全量采集取最近一页投稿，增量刷新合并后也截到这个数）
+VIDEO_TITLE_LIMIT = 30
+
+# 接口响应缓存，命令行 --no-cache / --cache-only 可切换模式
+api_cache = ApiCache(DATA_PATH / "api_cache.db")
 
 # B站分区ID到名称的映射
 ZONE_MAP = {
@@ -50,8 +68,7 @@ def load_config():
         return json.load(f)
 
 
-def get_credential(config):
-    bili = config["bilibili"]
+def make_credential(bili):
     return Credential(
         sessdata=bili["sessdata"],
         bili_jct=bili["bili_jct"],
@@ -60,49 +77,216 @@ def get_credential(config):
     )
 
 
+def get_credential(config):
+    return make_credential(config["bilibili"])
+
+
+def get_credentials(config):
+    """全量采集可用的全部凭证：主账号在前，之后是 fetch_accounts 中的账号（重复的 sessdata 只取一次）"""
+    accounts, seen = [], set()
+    for bili in [config["bilibili"]] + config.get("fetch_accounts", []):
+        if bili["sessdata"] not in seen:
+            seen.add(bili["sessdata"])
+            accounts.append(make_credential(bili))
+    return accounts
+
+
 def load_data():
     """加载现有UP主数据"""
-    data_path = DATA_PATH / "up主详细数据.json"
-    if data_path.exists():
-        with open(data_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return []
+    store = open_store()
+    try:
+        return store.load_all()
+    finally:
+        store.close()
+
+
+async def call_api(endpoint, params, factory, fresh=False):
+    """B站接口调用的统一入口：先查缓存，未命中时经限速器发请求"""
+    requested = False
+
+    def request():
+        nonlocal requested
+        requested = True
+        return (current_limiter.get() or limiter).call(endpoint, factory)
+
+    result = await api_cache.fetch(endpoint, params, request, fresh=fresh)
+    if not requested:
+        metrics.cache_hit(endpoint)
+    return result
 
 
 def save_data(uploaders):
-    """保存UP主数据"""
-    data_path = DATA_PATH / "up主详细数据.json"
-    with open(data_path, "w", encoding="utf-8") as f:
-        json.dump(uploaders, f, ensure_ascii=False, indent=2)
+    """保存UP主数据（整体替换）"""
+    store = open_store()
+    try:
+        store.save_all(uploaders)
+    finally:
+        store.close()
+
+
+def save_records(records):
+    """按 mid 更新或追加部分UP主数据"""
+    if not records:
+        return
+    store = open_store()
+    try:
+        store.upsert_many(records)
+    finally:
+        store.close()
+
+
+# 最近用过的 User 对象，同一凭证下同一个 mid 的各项请求共用一个
+USER_CACHE_SIZE = 1024
+_users = OrderedDict()
+
+
+def get_user(credential, mid):
+    """UP主的 User 对象（按 凭证 + mid 复用）"""
+    key = (credential, mid)
+    u = _users.get(key)
+    if u is None:
+        u = _users[key] = user.User(uid=mid, credential=credential)
+        if len(_users) > USER_CACHE_SIZE:
+            _users.popitem(last=False)
+    else:
+        _users.move_to_end(key)
+    return u
+
+
+class FollowingsError(Exception):
+    """关注列表没有完整获取"""
+
+
+async def get_all_followings(credential, uid, fresh=False, page_size=50):
+    """获取所有关注的UP主
+
+    先取第一页得到关注总数，其余各页在限速器控制下并发请求；
+    任何一页重试后仍失败都抛出 FollowingsError，不返回残缺的列表。
+    fresh=True 时不读缓存（同步分组需要当前真实的分组归属）
+    """
+    u = get_user(credential, int(uid))
+
+    async def get_page(pn):
+        result = await call_api(
+            "followings", {"uid": int(uid), "pn": pn, "ps": page_size},
+            lambda: u.get_followings(pn=pn, ps=page_size),
+            fresh=fresh,
+        )
+        return result.get("list", []) or [], result.get("total", 0)
+
+    try:
+        first, total = await get_page(1)
+    except Exception as e:
+        raise FollowingsError(f"获取第 1 页时出错: {e}") from e
 
+    page_count = -(-total // page_size)
+    results = await asyncio.gather(*(get_page(pn) for pn in range(2, page_count + 1)), return_exceptions=True)
+    failed = [pn for pn, r in enumerate(results, 2) if isinstance(r, Exception)]
+    if failed:
+        raise FollowingsError(f"第 {failed} 页获取失败: {results[failed[0] - 2]}")
 
-async def get_all_followings(credential, uid):
-    """获取所有关注的UP主"""
-    u = user.User(uid=int(uid), credential=credential)
+    # 翻页期间关注列表可能变化，按 mid 去重
     all_followings = []
-    page = 1
+    seen = set()
+    for page in [first] + [r[0] for r in results]:
+        for up in page:
+            if up["mid"] not in seen:
+                seen.add(up["mid"])
+                all_followings.append(up)
+    print(f"  已获取 {len(all_followings)} 个UP主（共 {page_count} 页）")
+    if len(all_followings) != total:
+        print(f"  注意: 接口报告关注总数 {total}，实际获取 {len(all_followings)}")
+    return all_followings
+
+
+async def get_recent_followings(credential, uid, known, page_size=50):
+    """最近的新关注（不在 known 中的条目），按关注时间从新到旧
+
+    关注列表按关注时间倒序排列，逐页读取直到遇到已知的UP主为止，
+    通常只需一两个请求（守护进程轮询用）。不读缓存。
+    """
+    u = get_user(credential, int(uid))
+    new_follows = []
+    pn = 1
     while True:
+        result = await call_api(
+            "followings", {"uid": int(uid), "pn": pn, "ps": page_size},
+            lambda pn=pn: u.get_followings(pn=pn, ps=page_size),
+            fresh=True,
+        )
+        page = result.get("list", []) or []
+        unseen = [up for up in page if up["mid"] not in known]
+        new_follows.extend(unseen)
+        if len(unseen) < len(page) or len(page) < page_size or pn * page_size >= result.get("total", 0):
+            return new_follows
+        pn += 1
+
+
+async def get_followings_delta(credential, uid):
+    """对比实时关注列表和已有数据，返回 (新关注的条目列表, 已取关的mid列表)"""
+    followings = await get_all_followings(credential, uid, fresh=True)
+    store = open_store()
+    stored = store.mids()
+    store.close()
+    live = {up["mid"] for up in followings}
+    new_follows = [up for up in followings if up["mid"] not in stored]
+    unfollowed = sorted(stored - live)
+    return new_follows, unfollowed
+
+
+class UploaderContext:
+    """单个UP主的采集上下文
+
+    同一个UP主的各项采集共用一个 User 对象（见 get_user）；最近投稿列表只请求一次，
+    视频标题、投稿分区和待取标签的视频都从这一次响应中得到。
+    fresh=True 时投稿列表、合集和专栏不读缓存，用于增量刷新。
+    """
+
+    def __init__(self, credential, mid, fresh=False):
+        self.credential = credential
+        self.mid = mid
+        self.user = get_user(credential, mid)
+        self.fresh = fresh
+        self._videos_task = None
+        self.videos_error = None        # 投稿列表请求失败时的异常
+
+    async def _request_videos(self):
         try:
-            result = await u.get_followings(pn=page)
-            followings = result.get("list", [])
-            if not followings:
-                break
-            all_followings.extend(followings)
-            print(f"  已获取 {len(all_followings)} 个UP主...")
-            page += 1
-            await asyncio.sleep(0.5)
+            return await call_api(
+                "space_videos", {"mid": self.mid, "pn": 1, "ps": 30},
+                lambda: self.user.get_videos(pn=1, ps=30),
+                fresh=self.fresh,
+            )
         except Exception as e:
-            print(f"获取第 {page} 页时出错: {e}")
-            break
-    return all_followings
+            metrics.failure("space_videos", e)
+            self.videos_error = e
+            return {}
+
+    async def get_videos_data(self):
+        """最近30个投稿的原始响应，失败时返回空字典（并记下 videos_error）"""
+        if self._videos_task is None:
+            self._videos_task = asyncio.ensure_future(self._request_videos())
+        return await self._videos_task
 
+    async def get_vlist(self):
+        videos_data = await self.get_videos_data()
+        return videos_data.get("list", {}).get("vlist", [])
 
-async def get_channels_and_series(credential, mid):
+
+def latest_video(video_list):
+    """最新一个投稿的 (bvid, 发布时间戳)，没有投稿时返回 ("", 0)"""
+    if not video_list:
+        return "", 0
+    latest = max(video_list, key=lambda v: v.get("created", 0))
+    return latest.get("bvid", ""), latest.get("created", 0)
+
+
+async def get_channels_and_series(credential, mid, ctx=None):
     """获取UP主的合集和系列名称"""
     channel_names, series_names = [], []
     try:
-        u = user.User(uid=mid, credential=credential)
-        data = await u.get_channel_list()
+        ctx = ctx or UploaderContext(credential, mid)
+        data = await call_api("channel_list", {"mid": mid}, ctx.user.get_channel_list, fresh=ctx.fresh)
         if data and "items_lists" in data:
             items = data["items_lists"]
             for s in items.get("seasons_list", []):
@@ -115,160 +299,352 @@ async def get_channels_and_series(credential, mid):
                 name = meta.get("name", "") or s.get("name", "")
                 if name:
                     series_names.append(name)
-    except:
-        pass
+    except Exception as e:
+        metrics.failure("channel_list", e)
     return channel_names, series_names
 
 
-async def get_videos(credential, mid, limit=30):
+async def get_videos(credential, mid, limit=VIDEO_TITLE_LIMIT, ctx=None):
     """获取UP主最近视频标题"""
-    try:
-        u = user.User(uid=mid, credential=credential)
-        videos_data = await u.get_videos(pn=1, ps=min(limit, 30))
-        video_list = videos_data.get("list", {}).get("vlist", [])
-        return [v.get("title", "") for v in video_list]
-    except:
-        return []
+    ctx = ctx or UploaderContext(credential, mid)
+    video_list = await ctx.get_vlist()
+    return [v.get("title", "") for v in video_list[:limit]]
+
+
+def zone_counts(video_list):
+    """投稿分区 -> 视频数，按首次出现的顺序（投稿列表中每个视频都带 typeid）"""
+    counts = {}
+    for v in video_list:
+        zone_name = ZONE_MAP.get(v.get("typeid", 0), "")
+        if zone_name:
+            counts[zone_name] = counts.get(zone_name, 0) + 1
+    return counts
 
 
-async def get_video_zones(credential, mid):
+async def get_video_zone_counts(credential, mid, ctx=None):
+    """获取UP主最近30个视频的投稿分区及各分区视频数"""
+    ctx = ctx or UploaderContext(credential, mid)
+    return zone_counts(await ctx.get_vlist())
+
+
+async def get_video_zones(credential, mid, ctx=None):
     """获取UP主最近30个视频的投稿分区"""
-    try:
-        u = user.User(uid=mid, credential=credential)
-        videos_data = await u.get_videos(pn=1, ps=30)
-        video_list = videos_data.get("list", {}).get("vlist", [])
-        zones = []
-        for v in video_list:
-            typeid = v.get("typeid", 0)
-            zone_name = ZONE_MAP.get(typeid, "")
-            if zone_name and zone_name not in zones:
-                zones.append(zone_name)
-        return zones
-    except:
-        return []
+    return list(await get_video_zone_counts(credential, mid, ctx=ctx))
 
 
 async def get_video_tags(credential, bvid):
     """获取单个视频的标签"""
-    try:
-        vid = video.Video(bvid=bvid, credential=credential)
-        tags = await vid.get_tags()
-        return [t.get("tag_name", "") for t in tags]
-    except:
-        return []
+    return await tag_collector.get(credential, bvid)
 
 
-async def get_user_video_tags(credential, mid, limit=5):
-    """获取UP主最近几个视频的标签"""
-    try:
-        u = user.User(uid=mid, credential=credential)
-        videos_data = await u.get_videos(pn=1, ps=limit)
-        video_list = videos_data.get("list", {}).get("vlist", [])
-        all_tags = []
-        for v in video_list[:limit]:
-            bvid = v.get("bvid")
-            if bvid:
-                tags = await get_video_tags(credential, bvid)
-                all_tags.extend(tags)
-                await asyncio.sleep(0.2)
-        return list(set(all_tags))
-    except:
-        return []
+class TagCollector:
+    """视频标签采集器
+
+    同一个 bvid 只请求一次：并发采集的多个UP主共享进行中的请求和已取得的结果。
+    响应经 call_api 永久缓存（标签发布后几乎不变），以后的运行只请求没见过的视频。
+    """
+
+    def __init__(self, videos=5):
+        self.videos = videos    # 每个UP主取最近几个视频的标签
+        self.known = {}
+        self._pending = {}
+
+    async def _request(self, credential, bvid):
+        """请求失败时返回 None"""
+        try:
+            vid = video.Video(bvid=bvid, credential=credential)
+            tags = await call_api("video_tags", {"bvid": bvid}, vid.get_tags)
+            return [t.get("tag_name", "") for t in tags]
+        except Exception as e:
+            metrics.failure("video_tags", e)
+            return None
+
+    def clear(self):
+        """清空已取得的标签（长期运行的进程每轮调用；响应仍在接口缓存中）"""
+        self.known.clear()
+
+    async def get(self, credential, bvid):
+        """单个视频的标签，请求失败时返回空列表（不记住失败，下次还会重试）"""
+        if bvid in self.known:
+            return self.known[bvid]
+        task = self._pending.get(bvid)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = self._pending[bvid] = asyncio.ensure_future(self._request(credential, bvid))
+        try:
+            tags = await task
+        finally:
+            if self._pending.get(bvid) is task and task.done():
+                del self._pending[bvid]
+        if tags is None:
+            return []
+        self.known[bvid] = tags
+        return tags
+
+    async def collect(self, credential, video_list, limit=None):
+        """并发获取投稿列表前 limit 个视频的标签，去重后保持首次出现的顺序"""
+        limit = self.videos if limit is None else limit
+        bvids = [v["bvid"] for v in video_list[:limit] if v.get("bvid")]
+        results = await asyncio.gather(*(self.get(credential, bvid) for bvid in bvids))
+        return list(dict.fromkeys(tag for tags in results for tag in tags))
+
 
+# 进程内共享，全量采集时所有UP主的标签请求一起去重
+tag_collector = TagCollector()
 
-async def get_articles(credential, mid, limit=30):
+
+async def get_user_video_tags(credential, mid, limit=None, ctx=None):
+    """获取UP主最近几个视频的标签（默认取 tag_collector.videos 个）"""
+    ctx = ctx or UploaderContext(credential, mid)
+    return await tag_collector.collect(credential, await ctx.get_vlist(), limit)
+
+
+async def get_articles(credential, mid, limit=30, ctx=None):
     """获取UP主的专栏文章标题"""
     try:
-        u = user.User(uid=mid, credential=credential)
-        articles_data = await u.get_articles(pn=1, ps=min(limit, 30))
+        ctx = ctx or UploaderContext(credential, mid)
+        ps = min(limit, 30)
+        articles_data = await call_api(
+            "articles", {"mid": mid, "pn": 1, "ps": ps},
+            lambda: ctx.user.get_articles(pn=1, ps=ps),
+            fresh=ctx.fresh,
+        )
         articles = articles_data.get("articles", [])
         return [a.get("title", "") for a in articles if a.get("title")]
-    except:
+    except Exception as e:
+        metrics.failure("articles", e)
         return []
 
 
 async def fetch_one(credential, mid, name=None):
     """采集单个UP主的完整信息"""
     info = {"mid": mid, "name": name or str(mid)}
+    ctx = UploaderContext(credential, mid)
 
     try:
         # 如果没有名字，先获取基本信息
         if not name:
-            u = user.User(uid=mid, credential=credential)
-            user_info = await u.get_user_info()
+            user_info = await call_api("user_info", {"mid": mid}, ctx.user.get_user_info)
             info["name"] = user_info.get("name", str(mid))
             info["sign"] = user_info.get("sign", "")
             official = user_info.get("official", {})
             info["official_verify"] = official.get("title", "")
-            await asyncio.sleep(0.3)
         else:
             info["sign"] = ""
             info["official_verify"] = ""
 
-        # 合集和系列
-        channels, series = await get_channels_and_series(credential, mid)
+        # 合集/系列、视频标题、专栏文章互不依赖，并发请求
+        (channels, series), video_titles, articles = await asyncio.gather(
+            get_channels_and_series(credential, mid, ctx=ctx),
+            get_videos(credential, mid, ctx=ctx),
+            get_articles(credential, mid, ctx=ctx),
+        )
         info["channels"] = channels
         info["series"] = series
-        await asyncio.sleep(0.3)
+        info["video_titles"] = video_titles
 
-        # 视频标题
-        info["video_titles"] = await get_videos(credential, mid)
-        await asyncio.sleep(0.2)
-
-        # 投稿分区
-        info["video_zones"] = await get_video_zones(credential, mid)
-        await asyncio.sleep(0.2)
+        # 投稿分区及各分区视频数（与视频标题共用同一次投稿列表请求）
+        counts = await get_video_zone_counts(credential, mid, ctx=ctx)
+        info["video_zones"] = list(counts)
+        info["video_zone_counts"] = counts
 
         # 视频标签
-        info["tags"] = await get_user_video_tags(credential, mid)
-        await asyncio.sleep(0.2)
+        info["tags"] = await get_user_video_tags(credential, mid, ctx=ctx)
 
         # 专栏文章
-        info["articles"] = await get_articles(credential, mid)
+        info["articles"] = articles
+
+        # 最新投稿标记，供增量刷新判断是否有新视频；投稿列表请求失败时不写，刷新时按标题判断
+        video_list = await ctx.get_vlist()
+        if ctx.videos_error is None:
+            info["latest_bvid"], info["latest_created"] = latest_video(video_list)
 
     except Exception as e:
         print(f"  采集 {info['name']} 时出错: {e}")
         for key in ["channels", "series", "video_titles", "video_zones", "tags", "articles"]:
             info.setdefault(key, [])
+        info.setdefault("video_zone_counts", {})
+
+    return info
 
+
+async def fetch_following(credential, up):
+    """采集关注列表中的一个条目，签名和认证直接取自关注列表"""
+    info = await fetch_one(credential, up["mid"], up["uname"])
+    info["sign"] = up.get("sign", "") or ""
+    info["official_verify"] = up.get("official_verify", {}).get("desc", "")
     return info
 
 
-async def fetch_all():
-    """全量采集：获取所有关注UP主的详细信息"""
+class Shard:
+    """全量采集的一个分片：一个凭证和它自己的限速器，从共享队列中取UP主采集"""
+
+    def __init__(self, index, credential, limiter):
+        self.index = index
+        self.credential = credential
+        self.limiter = limiter
+        self.workers = 0            # 正在运行的工作协程数
+        self.finished = 0
+        self.requeued = 0           # 遇到风控时放回队列重新采集的UP主数
+
+    @property
+    def banned(self):
+        return self.limiter.banned
+
+    def status(self):
+        return f"分片{self.index} 完成 {self.finished}{' 已停用' if self.banned else ''}"
+
+    def snapshot(self):
+        """用于运行报告"""
+        return {"finished": self.finished, "requeued": self.requeued, "limiter": self.limiter.snapshot()}
+
+
+def update_fail_fast(shards):
+    """还有两个以上可用凭证时，风控的请求不在原地暂停重试，UP主放回队列由其他分片采集；
+    只剩一个凭证时照常退避重试"""
+    healthy = [s for s in shards if not s.banned]
+    for shard in healthy:
+        shard.limiter.fail_fast = len(healthy) > 1
+
+
+async def fetch_all(concurrency=1, resume=False):
+    """全量采集：获取所有关注UP主的详细信息，返回各分片（用于运行报告）
+
+    concurrency: 每个凭证同时采集的UP主数量，输出顺序与关注列表一致
+    resume: 从采集日志续采，跳过日志中已完成的UP主
+
+    config.json 的 fetch_accounts 中列出更多账号时，每个账号一个分片（自己的凭证和限速器，
+    风控按会话计算），各分片的工作协程从同一个队列中取UP主，快的分片自然多采。
+    某个凭证遇到风控时，正在采集的UP主放回队列，它在暂停期间不取新的UP主，由其他分片继续；
+    连续风控或失效的凭证停用。只剩一个凭证时按正常的退避重试处理。
+    全部凭证都不可用时保留采集日志，之后用 --resume 续采。
+    关注列表总是重新请求（不用一小时内的缓存），刚关注的UP主也会被采集；--cache-only 时仍只读缓存。
+    """
+    journal = Journal(FETCH_JOURNAL_PATH)
+    if journal.exists() and not resume:
+        print(f"发现未完成的采集日志: {journal.path}")
+        print("使用 python fetch.py all --resume 继续采集，或删除该文件后重新开始")
+        return
+
     config = load_config()
     credential = get_credential(config)
     uid = config["bilibili"]["dedeuserid"]
 
     print("正在获取关注列表...")
-    followings = await get_all_followings(credential, uid)
+    try:
+        with stage("关注列表"):
+            followings = await get_all_followings(credential, uid, fresh=True)
+    except FollowingsError as e:
+        print(f"关注列表获取失败: {e}")
+        return
     if not followings:
         print("未获取到关注列表")
         return
 
-    print(f"\n开始采集 {len(followings)} 个UP主的详细信息...\n")
-    uploaders = []
-    for i, up in enumerate(followings):
-        info = await fetch_one(credential, up["mid"], up["uname"])
-        info["sign"] = up.get("sign", "") or ""
-        info["official_verify"] = up.get("official_verify", {}).get("desc", "")
-        uploaders.append(info)
-
-        if (i + 1) % 10 == 0:
-            print(f"  已处理 {i + 1}/{len(followings)}")
-        if (i + 1) % 20 == 0:
-            await asyncio.sleep(2)
+    done = journal.load() if resume else {}
+    queue = deque(up for up in followings if up["mid"] not in done)
+    total = len(queue)
+    if done:
+        print(f"从采集日志恢复 {len(done)} 个UP主，剩余 {total} 个")
+
+    credentials = get_credentials(config)
+    shards = [Shard(i, c, limiter if i == 0 else limiter.fresh()) for i, c in enumerate(credentials)]
+    update_fail_fast(shards)
+
+    concurrency = max(1, concurrency)
+    sharding = f"，{len(shards)} 个凭证" if len(shards) > 1 else ""
+    print(f"\n开始采集 {total} 个UP主的详细信息（并发 {concurrency}{sharding}）...\n")
+    finished = 0
+
+    def status():
+        if len(shards) == 1:
+            return limiter.status()
+        return "；".join(s.status() for s in shards)
+
+    tasks = set()
+
+    def start(shard):
+        """补足分片的工作协程（放回队列的UP主可能在它原有的协程结束后才到）"""
+        while not shard.banned and shard.workers < min(concurrency, len(queue)):
+            shard.workers += 1
+            tasks.add(asyncio.ensure_future(worker(shard)))
+
+    async def worker(shard):
+        nonlocal finished
+        # 本任务内改用分片的限速器，其中发起的请求（包括标签采集）都计入本分片
+        current_limiter.set(shard.limiter)
+        try:
+            while queue and not shard.banned:
+                rest = shard.limiter.resting()
+                if rest > 0:
+                    # 风控暂停中不取新的UP主，队列由其他分片继续
+                    await asyncio.sleep(min(rest, 1.0))
+                    continue
+                up = queue.popleft()
+                fail_fast, risk_events = shard.limiter.fail_fast, shard.limiter.risk_events
+                info = await fetch_following(shard.credential, up)
+                if shard.banned or (fail_fast and shard.limiter.risk_events > risk_events):
+                    # 采集期间遇到风控（请求没有重试），这条结果可能不完整，放回队列重新采集
+                    queue.appendleft(up)
+                    shard.requeued += 1
+                    for other in shards:
+                        start(other)
+                    continue
+                journal.append(info)
+                done[info["mid"]] = info
+                shard.finished += 1
+
+                finished += 1
+                if finished % 10 == 0:
+                    print(f"  已处理 {finished}/{total} {status()}")
+        finally:
+            shard.workers -= 1
+        if shard.banned and shard.workers == 0:
+            print(f"  ! 分片{shard.index} 的凭证被风控或已失效，已停用，由其他分片继续")
+            update_fail_fast(shards)
+            for other in shards:
+                start(other)
 
-    save_data(uploaders)
+    try:
+        with stage("采集详情"), journal.open():
+            for shard in shards:
+                start(shard)
+            while tasks:
+                finished_tasks, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                tasks -= finished_tasks
+                for task in finished_tasks:
+                    task.result()
+    finally:
+        for shard in shards:
+            shard.limiter.fail_fast = False
+
+    if queue:
+        print(f"\n所有凭证都被风控或已失效，还有 {len(queue)} 个UP主未采集")
+        print(f"已完成的部分保存在采集日志 {journal.path}，稍后用 python fetch.py all --resume 续采")
+        return shards
+
+    # 按关注列表顺序合并日志（与分片无关），写入正式数据文件后删除日志
+    uploaders = [done[up["mid"]] for up in followings]
+    with stage("保存"):
+        save_data(uploaders)
+    journal.remove()
+    if api_cache.mode == "on":
+        api_cache.purge_expired()
     print(f"\n完成！共采集 {len(uploaders)} 个UP主")
+    print(f"缓存命中 {api_cache.hits} 次，请求 {api_cache.misses} 次")
+    return shards
+
 
+async def fetch_new(mids, followings=None):
+    """增量采集：获取指定mid的UP主信息，添加到现有数据
 
-async def fetch_new(mids):
-    """增量采集：获取指定mid的UP主信息，添加到现有数据"""
+    followings: 可选的 {mid: 关注列表条目}，有条目时省去查询用户信息的请求
+    """
+    followings = followings or {}
     config = load_config()
     credential = get_credential(config)
-    uploaders = load_data()
-    existing_mids = {up["mid"] for up in uploaders}
+    store = open_store()
+    existing_mids = store.mids()
+    store.close()
 
     added = []
     for mid in mids:
@@ -277,73 +653,292 @@ async def fetch_new(mids):
             continue
 
         print(f"  正在采集 mid={mid}...")
-        info = await fetch_one(credential, mid)
-        uploaders.append(info)
+        with stage("采集详情"):
+            if mid in followings:
+                info = await fetch_following(credential, followings[mid])
+            else:
+                info = await fetch_one(credential, mid)
         added.append(info)
         print(f"  -> {info['name']}")
-        await asyncio.sleep(1)
 
     if added:
-        save_data(uploaders)
+        with stage("保存"):
+            save_records(added)
         print(f"\n新增 {len(added)} 个UP主")
     return added
 
 
 async def fetch_missing_zones():
-    """补充缺失的投稿分区"""
+    """补充缺失的投稿分区，以及旧数据缺少的各分区视频数
+
+    每补充一个就写入分区补充日志，中断后再次运行会先应用日志中的结果。
+    """
     config = load_config()
     credential = get_credential(config)
     uploaders = load_data()
 
-    missing = [up for up in uploaders if not up.get("video_zones", [])]
-    print(f"缺失投稿分区: {len(missing)} 个")
+    journal = Journal(ZONES_JOURNAL_PATH)
+    patches = journal.load()
+    changed = [up for up in uploaders if up["mid"] in patches]
+    if patches:
+        print(f"从补充日志恢复 {len(patches)} 个UP主的投稿分区")
+        for up in changed:
+            up["video_zones"] = patches[up["mid"]]["video_zones"]
+            if "video_zone_counts" in patches[up["mid"]]:
+                up["video_zone_counts"] = patches[up["mid"]]["video_zone_counts"]
+
+    missing = [up for up in uploaders if not up.get("video_zones", []) or "video_zone_counts" not in up]
+    print(f"缺失投稿分区或分区视频数: {len(missing)} 个")
 
     success = 0
     fail_count = 0
-    for i, up in enumerate(missing):
-        try:
-            zones = await get_video_zones(credential, up["mid"])
-            if zones is not None:
-                up["video_zones"] = zones
-                zone_str = ", ".join(zones[:3]) if zones else "无视频"
-                print(f"  [{i+1}/{len(missing)}] {up['name']} - {zone_str}")
-                success += 1
-                fail_count = 0
-            else:
+    with journal.open():
+        for i, up in enumerate(missing):
+            try:
+                # 投稿列表请求失败时 counts 为空，不能当作没有投稿而覆盖已有的分区
+                ctx = UploaderContext(credential, up["mid"])
+                counts = await get_video_zone_counts(credential, up["mid"], ctx=ctx)
+                if ctx.videos_error is None:
+                    zones = list(counts)
+                    up["video_zones"] = zones
+                    up["video_zone_counts"] = counts
+                    journal.append({"mid": up["mid"], "video_zones": zones, "video_zone_counts": counts})
+                    changed.append(up)
+                    zone_str = ", ".join(zones[:3]) if zones else "无视频"
+                    print(f"  [{i+1}/{len(missing)}] {up['name']} - {zone_str}")
+                    success += 1
+                    fail_count = 0
+                else:
+                    fail_count += 1
+                    print(f"  [{i+1}/{len(missing)}] {up['name']} - 失败: {ctx.videos_error}")
+            except Exception as e:
                 fail_count += 1
-                print(f"  [{i+1}/{len(missing)}] {up['name']} - 失败")
-        except Exception as e:
-            fail_count += 1
-            print(f"  [{i+1}/{len(missing)}] {up['name']} - {e}")
+                print(f"  [{i+1}/{len(missing)}] {up['name']} - {e}")
 
-        if fail_count >= 5:
-            print("连续失败过多，停止")
-            break
+            if fail_count >= 5:
+                print("连续失败过多，停止")
+                break
 
-        await asyncio.sleep(0.5)
-        if (i + 1) % 20 == 0:
-            save_data(uploaders)
-            await asyncio.sleep(2)
+            if (i + 1) % 20 == 0:
+                print(f"  {limiter.status()}")
 
-    save_data(uploaders)
+    save_records(changed)
+    journal.remove()
     still_missing = sum(1 for up in uploaders if not up.get("video_zones", []))
     print(f"\n成功: {success}，仍缺失: {still_missing}")
 
 
-if __name__ == "__main__":
+async def refresh_one(credential, up):
+    """检查单个UP主是否有新投稿，有则重新采集合集、标签和专栏
+
+    返回需要更新的字段；没有新投稿且标记已是最新时返回空字典。
+    投稿列表请求失败时返回 None（不能当作没有投稿，否则会清掉最新投稿标记）。
+    """
+    ctx = UploaderContext(credential, up["mid"], fresh=True)
+    video_list = await ctx.get_vlist()
+    if ctx.videos_error is not None:
+        return None
+    latest_bvid, latest_created = latest_video(video_list)
+
+    if "latest_created" in up:
+        new_videos = [v for v in video_list if v.get("created", 0) > up["latest_created"]]
+    else:
+        # 旧数据没有时间戳，按标题判断哪些是新视频
+        known_titles = set(up.get("video_titles", []))
+        new_videos = [v for v in video_list if v.get("title", "") not in known_titles]
+
+    patch = {}
+    if new_videos:
+        (channels, series), articles = await asyncio.gather(
+            get_channels_and_series(credential, up["mid"], ctx=ctx),
+            get_articles(credential, up["mid"], ctx=ctx),
+        )
+        new_titles = [v.get("title", "") for v in new_videos]
+        old_titles = [t for t in up.get("video_titles", []) if t not in new_titles]
+        patch["channels"] = channels
+        patch["series"] = series
+        patch["video_titles"] = (new_titles + old_titles)[:VIDEO_TITLE_LIMIT]
+        counts = await get_video_zone_counts(credential, up["mid"], ctx=ctx)
+        patch["video_zones"] = list(counts)
+        patch["video_zone_counts"] = counts
+        patch["tags"] = await get_user_video_tags(credential, up["mid"], ctx=ctx)
+        patch["articles"] = articles
+
+    if new_videos or up.get("latest_bvid") != latest_bvid or up.get("latest_created") != latest_created:
+        patch["latest_bvid"] = latest_bvid
+        patch["latest_created"] = latest_created
+    return patch
+
+
+async def refresh_all(concurrency=1):
+    """增量刷新：每个UP主只请求一次投稿列表，有新投稿的才重新采集
+
+    新视频标题合并到 video_titles 前部（保留最近 VIDEO_TITLE_LIMIT 个）；中途中断后再次运行会跳过
+    刷新日志中已完成的UP主。投稿列表请求失败的UP主不写日志，保留日志，下次运行时重试。
+    """
+    config = load_config()
+    credential = get_credential(config)
+    with stage("读取数据"):
+        uploaders = load_data()
+    if not uploaders:
+        print("没有已有数据，请先运行 python fetch.py all")
+        return
+
+    journal = Journal(REFRESH_JOURNAL_PATH)
+    done = journal.load()
+    pending = [up for up in uploaders if up["mid"] not in done]
+    if done:
+        print(f"从刷新日志恢复 {len(done)} 个UP主，剩余 {len(pending)} 个")
+
+    concurrency = max(1, concurrency)
+    print(f"检查 {len(pending)} 个UP主的新投稿（并发 {concurrency}）...\n")
+    semaphore = asyncio.Semaphore(concurrency)
+    finished = 0
+    updated = 0
+    failed = 0
+
+    async def worker(up):
+        nonlocal finished, updated, failed
+        async with semaphore:
+            patch = await refresh_one(credential, up)
+            finished += 1
+            if patch is None:
+                failed += 1
+                return
+            # 没有变化也写一条记录，续跑时可以跳过
+            record = {"mid": up["mid"], **patch}
+            journal.append(record)
+            done[up["mid"]] = record
+            if "video_titles" in patch:
+                updated += 1
+                print(f"  {up['name']} - 有新投稿")
+
+            if finished % 50 == 0:
+                print(f"  已检查 {finished}/{len(pending)} {limiter.status()}")
+
+    with stage("检查新投稿"), journal.open():
+        await asyncio.gather(*(worker(up) for up in pending))
+
+    changed = []
+    for up in uploaders:
+        patch = dict(done.get(up["mid"], {}))
+        patch.pop("mid", None)
+        if patch:
+            up.update(patch)
+            changed.append(up)
+    with stage("保存"):
+        save_records(changed)
+    if failed:
+        print(f"\n{failed} 个UP主的投稿列表获取失败，已保留刷新日志 {journal.path}，再次运行 refresh 只重试这些UP主")
+        return
+    journal.remove()
+    print(f"\n完成！检查 {len(pending)} 个UP主，{updated} 个有新投稿")
+
+
+async def show_delta(prune=False):
+    """显示新关注和已取关的UP主；prune=True 时从数据中删除已取关的UP主"""
+    config = load_config()
+    credential = get_credential(config)
+    print("正在获取关注列表...")
+    try:
+        new_follows, unfollowed = await get_followings_delta(credential, config["bilibili"]["dedeuserid"])
+    except FollowingsError as e:
+        print(f"关注列表获取失败: {e}")
+        return
+
+    print(f"\n新关注 {len(new_follows)} 个:")
+    for up in new_follows:
+        print(f"  + {up['uname']} (mid={up['mid']})")
+    print(f"已取关 {len(unfollowed)} 个:")
+    for mid in unfollowed:
+        print(f"  - mid={mid}")
+
+    if new_follows:
+        print("\n采集并分类新关注: python add_new.py --new")
+    if unfollowed:
+        if prune:
+            store = open_store()
+            store.delete(unfollowed)
+            store.close()
+            print(f"\n已从数据中删除 {len(unfollowed)} 个已取关的UP主")
+        else:
+            print("从数据中删除已取关的UP主: python fetch.py prune")
+
+
+def get_option(args, name, default):
+    """读取形如 --name N 的整数参数"""
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args) and args[i + 1].isdigit():
+            return int(args[i + 1])
+    return default
+
+
+def get_text_option(args, name):
+    """读取形如 --name 值 的参数，没有时返回 None"""
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            return args[i + 1]
+    return None
+
+
+def main():
     import sys
-    if len(sys.argv) > 1:
-        cmd = sys.argv[1]
+    args = sys.argv[1:]
+    if "--cache-only" in args:
+        api_cache.set_mode("only")
+    elif "--no-cache" in args:
+        api_cache.set_mode("off")
+    tag_collector.videos = get_option(args, "--tag-videos", tag_collector.videos)
+    base_url = get_text_option(args, "--base-url")
+    # 整个进程共用一个长连接客户端
+    http_client.configure(base_url=base_url)
+    if base_url:
+        # 发往模拟接口等非B站服务时，不能读写真实的接口缓存
+        api_cache.set_mode("off")
+    if args:
+        cmd = args[0]
+        shards = None
         if cmd == "all":
-            asyncio.run(fetch_all())
+            concurrency = get_option(args, "--concurrency", 1)
+            shards = http_client.run(fetch_all(concurrency=concurrency, resume="--resume" in args))
+        elif cmd == "refresh":
+            concurrency = get_option(args, "--concurrency", 1)
+            http_client.run(refresh_all(concurrency=concurrency))
         elif cmd == "zones":
-            asyncio.run(fetch_missing_zones())
+            http_client.run(fetch_missing_zones())
+        elif cmd in ("diff", "prune"):
+            http_client.run(show_delta(prune=cmd == "prune"))
         elif cmd.isdigit():
-            asyncio.run(fetch_new([int(cmd)]))
+            http_client.run(fetch_new([int(cmd)]))
         else:
-            print("用法: python fetch.py [all|zones|<mid>]")
+            print("用法: python fetch.py [all|refresh|zones|diff|prune|<mid>] [--concurrency N] [--resume] [--tag-videos N] [--no-cache|--cache-only] [--base-url URL] [--prom-file PATH] [--profile]")
+        extra = {
+            "limiter": limiter.snapshot(),
+            "cache": {"mode": api_cache.mode, "hits": api_cache.hits, "misses": api_cache.misses},
+        }
+        if shards and len(shards) > 1:
+            extra["shards"] = [s.snapshot() for s in shards]
+        save_run_report("fetch", " ".join(args), extra=extra, prometheus_path=get_text_option(args, "--prom-file"))
     else:
         print("用法:")
         print("  python fetch.py all       # 全量采集所有关注")
-        print("  python fetch.py zones     # 补充缺失投稿分区")
+        print("  python fetch.py all --concurrency 4   # 同时采集4个UP主（每个凭证）")
+        print("  python fetch.py all --resume          # 从采集日志续采")
+        print("  python fetch.py all --cache-only      # 只用本地缓存重建数据，不联网")
+        print("  python fetch.py all --no-cache        # 不读写接口缓存")
+        print("  python fetch.py all --tag-videos 10   # 每个UP主取最近10个视频的标签（默认5）")
+        print("  python fetch.py refresh   # 增量刷新：只重新采集有新投稿的UP主")
+        print("  python fetch.py zones     # 补充缺失的投稿分区和分区视频数（旧数据）")
+        print("  python fetch.py diff      # 对比关注列表，列出新关注和已取关")
+        print("  python fetch.py prune     # 从数据中删除已取关的UP主")
         print("  python fetch.py <mid>     # 采集指定UP主")
+        print("  --base-url http://127.0.0.1:8765      # 请求改发到本地模拟接口（见 mock_api.py），不使用缓存")
+        print("  --prom-file /path/bili.prom           # 另写一份 Prometheus 文本格式的接口统计")
+        print("  --profile / --profile-sampling        # 性能分析，结果写入 data/profiles/")
+        print("每次运行结束后接口统计报告写入 data/reports/")
+
+
+if __name__ == "__main__":
+    run_profiled("fetch", main)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+bilibili_api 的请求客户端设置
+fetch / add_new / sync_groups 启动时调用 configure()，之后本进程的所有接口请求共用一个
+长连接客户端（每个事件循环一个 httpx.AsyncClient，连接保持复用；装了 h2 时走 HTTP/2）。
+入口用 run() 代替 asyncio.run()，结束前关闭客户端。
+
+需要时可以把所有请求改发到别处：
+
+  use_base_url("http://127.0.0.1:8765")   # 发到本地的模拟接口服务（见 mock_api.py）
+  use_transport(lambda: MockTransport())  # 进程内直接交给 httpx transport 处理，不经过网络
+"""
+
+import asyncio
+import importlib.util
+
+import httpx
+from bilibili_api import register_client
+from bilibili_api.clients.HTTPXClient import HTTPXClient
+from bilibili_api.utils import network
+
+from metrics import count_response
+
+CLIENT_NAME = "shared"
+
+# 装了 h2（pip install h2）时启用 HTTP/2，否则为 HTTP/1.1 keep-alive
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+# 连接池上限；采集并发数远小于此，空闲连接保留一分钟
+MAX_CONNECTIONS = 32
+KEEPALIVE_EXPIRY = 60.0
+
+
+def _limits(max_connections, keepalive_expiry):
+    return httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                        keepalive_expiry=keepalive_expiry)
+
+
+async def _count_response(response):
+    """响应钩子：读出响应体（随后本来也要读），大小计入当前接口调用的统计"""
+    await response.aread()
+    count_response(len(response.content))
+
+
+class SharedClient(HTTPXClient):
+    """长连接复用的 httpx 客户端，参数由 bilibili_api 按 request_settings 传入"""
+
+    def __init__(self, proxy="", timeout=0.0, verify_ssl=True, trust_env=True, http2=HTTP2,
+                 max_connections=MAX_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY, transport=None):
+        session = httpx.AsyncClient(
+            timeout=timeout or None,
+            proxy=proxy or None,
+            verify=verify_ssl,
+            trust_env=trust_env,
+            http2=http2,
+            limits=_limits(max_connections, keepalive_expiry),
+            transport=transport() if transport else None,
+            event_hooks={"response": [_count_response]},
+        )
+        super().__init__(proxy=proxy, timeout=timeout, verify_ssl=verify_ssl, trust_env=trust_env,
+                         http2=http2, session=session)
+
+
+class RedirectTransport(httpx.AsyncBaseTransport):
+    """把所有请求的协议、主机和端口改为 base_url，路径和参数不变"""
+
+    def __init__(self, base_url):
+        self.base = httpx.URL(base_url)
+        self._transport = httpx.AsyncHTTPTransport(limits=_limits(MAX_CONNECTIONS, KEEPALIVE_EXPIRY))
+
+    async def handle_async_request(self, request):
+        request.headers["X-Original-Host"] = request.url.host
+        request.url = request.url.copy_with(scheme=self.base.scheme, host=self.base.host, port=self.base.port)
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def configure(base_url=None, transport=None, http2=HTTP2,
+              max_connections=MAX_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY):
+    """注册并选用共享客户端，之后的所有接口请求都经过它
+
+    base_url: 请求改发到这个地址；transport: 返回 httpx transport 的工厂，请求交给它处理。
+    bilibili_api 每个事件循环创建一个客户端，所以 transport 传工厂而不是实例。
+    """
+    if base_url:
+        transport = lambda: RedirectTransport(base_url)
+    register_client(CLIENT_NAME, SharedClient, {
+        "http2": http2,
+        "max_connections": max_connections,
+        "keepalive_expiry": keepalive_expiry,
+        "transport": transport,
+    })
+
+
+def use_transport(transport_factory):
+    """之后的所有接口请求都交给 transport_factory() 创建的 httpx transport"""
+    configure(transport=transport_factory)
+
+
+def use_base_url(base_url):
+    """之后的所有接口请求都发到 base_url"""
+    configure(base_url=base_url)
+
+
+async def close():
+    """关闭当前事件循环的客户端及其连接"""
+    pool = network.session_pool.get(network.selected_client, {})
+    client = pool.pop(asyncio.get_running_loop(), None)
+    network.lazy_settings.get(network.selected_client, {}).pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+def run(coro):
+    """同 asyncio.run，结束前关闭本事件循环的客户端"""
+
+    async def main():
+        try:
+            return await coro
+        finally:
+            await close()
+
+    return asyncio.run(main())
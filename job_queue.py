@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+守护进程的任务队列（SQLite，data/任务队列.db）
+每个新关注的UP主一条任务，按状态推进：
+
+  pending（待采集）→ classified（已采集、分类，待同步分组）→ done
+
+不同步分组时分类后直接 done。失败的任务退避后重试，超过次数记为 failed。
+进程中断后重新启动，未完成的任务从所处的状态继续。
+"""
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+PENDING = "pending"
+CLASSIFIED = "classified"
+DONE = "done"
+FAILED = "failed"
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = 60.0          # 首次重试等待秒数，之后每次翻倍
+
+
+class JobQueue:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " mid INTEGER PRIMARY KEY,"
+            " entry TEXT NOT NULL,"            # 关注列表条目（JSON）
+            " status TEXT NOT NULL,"
+            " category TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_try REAL NOT NULL DEFAULT 0,"
+            " added_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " error TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, next_try, added_at)")
+
+    def add(self, entries):
+        """加入新任务（已在队列中的 mid 忽略），返回新加入的个数；按 entries 的顺序处理"""
+        now = time.time()
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (mid, entry, status, added_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(up["mid"], json.dumps(up, ensure_ascii=False), PENDING, now + i * 1e-6, now)
+                 for i, up in enumerate(entries)],
+            )
+            return self.conn.total_changes - before
+
+    def mids(self):
+        return {mid for (mid,) in self.conn.execute("SELECT mid FROM jobs")}
+
+    def take(self, status, limit):
+        """到了重试时间的某状态任务，先加入的在前，返回 [(mid, 关注列表条目, 分类), ...]"""
+        rows = self.conn.execute(
+            "SELECT mid, entry, category FROM jobs WHERE status = ? AND next_try <= ?"
+            " ORDER BY added_at, mid LIMIT ?",
+            (status, time.time(), limit),
+        )
+        return [(mid, json.loads(entry), category) for mid, entry, category in rows]
+
+    def advance(self, mids, status, categories=None):
+        """任务进入下一状态，categories 为 {mid: 分类}"""
+        now = time.time()
+        categories = categories or {}
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET status = ?, category = coalesce(?, category), attempts = 0, next_try = 0,"
+                " updated_at = ?, error = NULL WHERE mid = ?",
+                [(status, categories.get(mid), now, mid) for mid in mids],
+            )
+
+    def fail(self, mids, error):
+        """记一次失败：退避后重试，次数用完时记为 failed（可用 daemon.py --retry-failed 重新排队）"""
+        now = time.time()
+        with self.conn:
+            for mid in mids:
+                row = self.conn.execute("SELECT attempts FROM jobs WHERE mid = ?", (mid,)).fetchone()
+                if row is None:
+                    continue
+                attempts = row[0] + 1
+                if attempts >= MAX_ATTEMPTS:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, attempts = ?, updated_at = ?, error = ? WHERE mid = ?",
+                        (FAILED, attempts, now, str(error), mid),
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE jobs SET attempts = ?, next_try = ?, updated_at = ?, error = ? WHERE mid = ?",
+                        (attempts, now + RETRY_DELAY * 2 ** (attempts - 1), now, str(error), mid),
+                    )
+
+    def retry_failed(self):
+        """把 failed 的任务重新放回待采集，返回个数"""
+        with self.conn:
+            return self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, next_try = 0, error = NULL WHERE status = ?",
+                (PENDING, FAILED),
+            ).rowcount
+
+    def counts(self):
+        """{状态: 任务数}"""
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+采集断点日志（JSONL，只追加）
+每采集完一个UP主立即写入一行，中断后可据此续采，结束时再合并进 up主详细数据.json
+"""
+
+import json
+import os
+from pathlib import Path
+
+
+class Journal:
+    """按 mid 记录采集结果的追加式日志"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+
+    def exists(self):
+        return self.path.exists()
+
+    def load(self):
+        """读取日志，返回 {mid: 记录}
+
+        同一个 mid 出现多次时按写入顺序合并字段；崩溃时写了一半的末行直接忽略。
+        """
+        records = {}
+        if not self.path.exists():
+            return records
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records.setdefault(record["mid"], {}).update(record)
+        return records
+
+    def open(self, reset=False):
+        """打开日志准备追加；reset=True 时清空旧内容"""
+        if reset or not self.path.exists():
+            self._file = open(self.path, "w", encoding="utf-8")
+            return self
+        # 上次中断可能留下不完整的末行，先补一个换行，避免和新记录粘在一起
+        dangling = False
+        if self.path.stat().st_size > 0:
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                dangling = f.read(1) != b"\n"
+        self._file = open(self.path, "a", encoding="utf-8")
+        if dangling:
+            self._file.write("\n")
+        return self
+
+    def append(self, record):
+        """写入一条记录并立即落盘"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def remove(self):
+        """合并完成后删除日志"""
+        self.close()
+        if self.path.exists():
+            self.path.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+多关键词匹配（Aho-Corasick 自动机）
+把全部关键词编译成一个自动机，一次扫描文本即可得到每个关键词的出现次数。
+"""
+
+from collections import deque
+
+
+class KeywordMatcher:
+    """一次扫描统计多个关键词的出现次数
+
+    计数规则与 len(re.findall(re.escape(keyword), text)) 完全一致：
+    同一关键词按从左到右不重叠计数，不同关键词之间互不影响。
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(dict.fromkeys(keywords))
+        self._empty = "" in self.keywords
+
+        # goto[state] = {字符: 下一状态}；out[state] = [(关键词序号, 长度), ...]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, keyword in enumerate(self.keywords):
+            if not keyword:
+                continue
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((index, len(keyword)))
+
+        # 广度优先构建失败指针（根的子节点指向根），并把失败状态的输出并入当前状态
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def count(self, text):
+        """返回 {关键词: 出现次数}，只包含出现过的关键词"""
+        goto, fail, out = self._goto, self._fail, self._out
+        counts = [0] * len(self.keywords)
+        next_start = [0] * len(self.keywords)
+        root = goto[0]
+        state = 0
+        for i, ch in enumerate(text):
+            if state:
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                state = goto[state].get(ch, 0)
+            else:
+                # 绝大多数字符不在任何关键词里，根状态单独走快速路径
+                state = root.get(ch, 0)
+                if not state:
+                    continue
+            outputs = out[state]
+            if outputs:
+                for index, length in outputs:
+                    # 同一关键词的匹配不能重叠
+                    if i - length + 1 >= next_start[index]:
+                        counts[index] += 1
+                        next_start[index] = i + 1
+
+        result = {self.keywords[i]: c for i, c in enumerate(counts) if c}
+        if self._empty:
+            result[""] = len(text) + 1
+        return result
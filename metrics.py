@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+B站接口调用统计
+每次接口请求（含重试）经 ratelimit.RateLimiter.call 记录：次数、耗时、错误码、重试次数和响应大小；
+call_api 记录缓存命中；各采集函数吞掉的异常记为 failure，不再无声无息。
+耗时只保存分桶计数（LatencyHistogram），分位数按分桶估算，内存不随请求数增长。
+响应大小取自 httpx 收到的响应体：http_client 的响应钩子调用 count_response()，
+累加到 RateLimiter.call 用 start_counting() 为本次调用开始的计数上，不再重新序列化结果。
+
+运行结束时 write_report() 写出 JSON 报告，可选写出 Prometheus 文本格式文件
+（放到 node_exporter 的 textfile 目录即可被采集）。
+"""
+
+import contextvars
+import json
+import math
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+REPORTS_PATH = Path(__file__).parent / "data" / "reports"
+
+# Prometheus 直方图的分桶上限（秒）
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 分位数用的对数分桶：第 i 桶上限为 LATENCY_BASE × LATENCY_GROWTH^i，相对误差不超过 10%
+LATENCY_BASE = 0.001
+LATENCY_GROWTH = 1.1
+
+
+def error_code(e):
+    """异常对应的错误码：接口返回码、HTTP 状态码或异常类名"""
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return str(code)
+    status = getattr(e, "status", None)
+    if isinstance(status, int):
+        return f"HTTP {status}"
+    return e.__class__.__name__
+
+
+# 当前接口调用收到的响应字节数 [字节数]，None 表示不在 RateLimiter.call 中
+_response_bytes = contextvars.ContextVar("response_bytes", default=None)
+
+
+def start_counting():
+    """为本任务接下来的一次接口调用开始统计响应字节数，返回计数 [字节数]"""
+    counter = [0]
+    _response_bytes.set(counter)
+    return counter
+
+
+def count_response(size):
+    """收到一个响应（http_client 的响应钩子调用）"""
+    counter = _response_bytes.get()
+    if counter is not None:
+        counter[0] += size
+
+
+class LatencyHistogram:
+    """耗时分布：只保存分桶计数，内存与请求数无关（守护进程可长期运行）"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = Counter()                # 对数分桶序号 -> 次数
+        self.cumulative = [0] * len(BUCKETS)    # 不超过 BUCKETS 各上限的次数
+
+    def add(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        index = max(0, math.ceil(math.log(max(seconds, LATENCY_BASE) / LATENCY_BASE, LATENCY_GROWTH) - 1e-9))
+        self.buckets[index] += 1
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.cumulative[i] += 1
+
+    def percentile(self, p):
+        """最近秩法求百分位数，取所在分桶的上限（不超过最大值）"""
+        if not self.count:
+            return 0.0
+        rank = max(1, -(-self.count * p // 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.max, LATENCY_BASE * LATENCY_GROWTH ** index)
+        return self.max
+
+
+class EndpointStats:
+    """单个接口的统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.latencies = LatencyHistogram()
+        self.errors = Counter()
+        self.retries = 0
+        self.bytes = 0
+        self.cache_hits = 0
+
+    def summary(self):
+        latencies = self.latencies
+        return {
+            "calls": self.calls,
+            "ok": self.calls - sum(self.errors.values()),
+            "errors": dict(self.errors),
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "bytes": self.bytes,
+            "latency": {
+                "mean": latencies.sum / latencies.count if latencies.count else 0.0,
+                "p50": latencies.percentile(50),
+                "p95": latencies.percentile(95),
+                "p99": latencies.percentile(99),
+                "max": latencies.max,
+            },
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}
+        self.failures = Counter()       # {采集函数: 吞掉的异常次数}
+
+    def endpoint(self, name):
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats()
+        return self.endpoints[name]
+
+    def record(self, endpoint, seconds, size=0, error=None):
+        """记录一次实际发出的请求，size 为收到的响应字节数"""
+        stats = self.endpoint(endpoint)
+        stats.calls += 1
+        stats.latencies.add(seconds)
+        if error is not None:
+            stats.errors[error_code(error)] += 1
+        else:
+            stats.bytes += size
+
+    def retry(self, endpoint):
+        self.endpoint(endpoint).retries += 1
+
+    def cache_hit(self, endpoint):
+        self.endpoint(endpoint).cache_hits += 1
+
+    def failure(self, where, e):
+        """采集函数处理掉的异常（返回了空结果）"""
+        self.failures[f"{where}: {error_code(e)}"] += 1
+
+    def report(self, command="", extra=None):
+        finished = time.time()
+        report = {
+            "command": command,
+            "started": datetime.fromtimestamp(self.started).isoformat(timespec="seconds"),
+            "finished": datetime.fromtimestamp(finished).isoformat(timespec="seconds"),
+            "duration": finished - self.started,
+            "endpoints": {name: stats.summary() for name, stats in sorted(self.endpoints.items())},
+            "failures": dict(self.failures),
+        }
+        report.update(extra or {})
+        return report
+
+    def prometheus(self):
+        """Prometheus 文本格式"""
+        lines = [
+            "# HELP bili_api_requests_total 接口请求次数（含重试）",
+            "# TYPE bili_api_requests_total counter",
+        ]
+        for name, stats in sorted(self.endpoints.items()):
+            lines.append(f'bili_api_requests_total{{endpoint="{name}"}} {stats.calls}')
+        lines += ["# HELP bili_api_errors_total 接口错误次数", "# TYPE bili_api_errors_total counter"]
+        for name, stats in sorted(self.endpoints.items()):
+            for code, count in sorted(stats.errors.items()):
+                lines.append(f'bili_api_errors_total{{endpoint="{name}",code="{code}"}} {count}')
+        for metric, attr, help_text in (
+            ("bili_api_retries_total", "retries", "重试次数"),
+            ("bili_api_cache_hits_total", "cache_hits", "缓存命中次数"),
+            ("bili_api_response_bytes_total", "bytes", "响应字节数"),
+        ):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for name, stats in sorted(self.endpoints.items()):
+                lines.append(f'{metric}{{endpoint="{name}"}} {getattr(stats, attr)}')
+
+        lines += ["# HELP bili_api_latency_seconds 接口请求耗时", "# TYPE bili_api_latency_seconds histogram"]
+        for name, stats in sorted(self.endpoints.items()):
+            latencies = stats.latencies
+            for bound, count in zip(BUCKETS, latencies.cumulative):
+                lines.append(f'bili_api_latency_seconds_bucket{{endpoint="{name}",le="{bound}"}} {count}')
+            lines.append(f'bili_api_latency_seconds_bucket{{endpoint="{name}",le="+Inf"}} {latencies.count}')
+            lines.append(f'bili_api_latency_seconds_sum{{endpoint="{name}"}} {latencies.sum}')
+            lines.append(f'bili_api_latency_seconds_count{{endpoint="{name}"}} {latencies.count}')
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path, command="", extra=None, prometheus_path=None):
+        """写出 JSON 报告，给出 prometheus_path 时同时写 Prometheus 文本文件"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(command, extra), f, ensure_ascii=False, indent=2)
+        if prometheus_path:
+            # 先写临时文件再改名，避免 node_exporter 读到写了一半的文件
+            prometheus_path = Path(prometheus_path)
+            tmp = prometheus_path.with_name(prometheus_path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus())
+            tmp.replace(prometheus_path)
+
+    def print_summary(self):
+        """按接口打印简要统计"""
+        for name, stats in sorted(self.endpoints.items()):
+            s = stats.summary()
+            errors = sum(stats.errors.values())
+            print(f"  {name:<13} 请求 {s['calls']:>5}  错误 {errors:>3}  重试 {s['retries']:>3}  "
+                  f"缓存 {s['cache_hits']:>5}  p50 {s['latency']['p50'] * 1000:6.0f}ms  "
+                  f"p95 {s['latency']['p95'] * 1000:6.0f}ms  p99 {s['latency']['p99'] * 1000:6.0f}ms")
+        if self.failures:
+            print("  已忽略的失败: " + "，".join(f"{k} ×{v}" for k, v in self.failures.most_common()))
+
+
+# 进程内共享的统计
+metrics = Metrics()
+
+
+def save_run_report(name, command, extra=None, prometheus_path=None):
+    """打印接口统计，并把本次运行的报告写到 data/reports/<name>-<时间>.json
+
+    没有发出过任何请求（例如只打印了用法）时什么也不做。
+    """
+    if not metrics.endpoints and not metrics.failures:
+        return None
+    print("\n接口统计:")
+    metrics.print_summary()
+    path = REPORTS_PATH / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    metrics.write_report(path, command, extra, prometheus_path)
+    print(f"运行报告: {path}" + (f"，Prometheus: {prometheus_path}" if prometheus_path else ""))
+    return path
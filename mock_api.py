@@ -0,0 +1,370 @@
+# -*- coding: utf-8 -*-
+"""
+本地模拟B站接口，用于不联网地测试 fetch.py / sync_groups.py 的并发和吞吐
+提供两个模块用到的全部接口：关注列表、用户信息、合集列表、投稿列表、视频标签、专栏、
+关注分组的查询/新建/删除/改名/移动。数据由 seed 决定，每次启动都一样。
+
+可以模拟延迟、随机错误（HTTP 500）和成段出现的风控（HTTP 412 / -412）；
+风控按请求的 SESSDATA 分会话计数，banned 中的 SESSDATA 每个请求都被风控。
+
+进程内使用（不经过网络）:
+  from http_client import use_transport
+  api = MockBilibili(uploaders=1000, latency=0.05)
+  use_transport(lambda: MockTransport(api))
+
+本地服务:
+  python mock_api.py [--port 8765] [--uploaders 500] [--latency 50] [--error-rate 0.01]
+                     [--risk-every 300] [--risk-burst 20] [--seed 42]
+  python fetch.py all --no-cache --base-url http://127.0.0.1:8765
+  python sync_groups.py --base-url http://127.0.0.1:8765
+
+--latency 单位为毫秒；--risk-every N --risk-burst M 表示每 N 个请求之后连续 M 个请求被风控。
+"""
+
+import asyncio
+import json
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl
+
+import httpx
+from bilibili_api.utils.aid_bvid_transformer import aid2bvid, bvid2aid
+
+from fetch import ZONE_MAP
+
+WORDS = [
+    "编程", "教程", "开箱", "评测", "日常", "vlog", "翻唱", "钢琴", "吉他", "游戏", "实况", "攻略",
+    "电竞", "美食", "探店", "旅行", "健身", "篮球", "足球", "科普", "历史", "数码", "手机", "电脑",
+    "动画", "番剧", "鬼畜", "舞蹈", "摄影", "汽车", "财经", "考研", "英语", "机器人", "单片机", "AI",
+]
+
+# 获取 buvid、wbi 密钥等准备请求，不参与错误和风控模拟
+BOOTSTRAP_PATHS = {
+    "/x/frontend/finger/spi",
+    "/x/internal/gaia-gateway/ExClimbWuzhi",
+    "/x/web-interface/nav",
+}
+
+# 关注分组里两个固定分组
+FIXED_GROUPS = {0: "默认分组", -10: "特别关注"}
+
+
+def _sessdata(request):
+    """请求 Cookie 中的 SESSDATA，没有时为空字符串"""
+    for part in request.headers.get("Cookie", "").split(";"):
+        name, _, value = part.strip().partition("=")
+        if name == "SESSDATA":
+            return value
+    return ""
+
+
+def _json(data, code=0, status=200):
+    return httpx.Response(status, json={"code": code, "message": "0" if code == 0 else "模拟错误", "ttl": 1, "data": data})
+
+
+class MockBilibili:
+    """模拟接口的数据和状态（关注分组的增删改会保存在内存中）"""
+
+    def __init__(self, uploaders=500, latency=0.0, jitter=0.5, error_rate=0.0,
+                 risk_every=0, risk_burst=0, videos=30, seed=42, banned=()):
+        self.latency = latency          # 平均延迟（秒）
+        self.jitter = jitter            # 延迟的随机浮动比例
+        self.error_rate = error_rate
+        self.risk_every = risk_every
+        self.risk_burst = risk_burst
+        self.banned = set(banned)       # 被封禁的 SESSDATA
+        self.videos = videos
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+        self.mids = [100000 + i * 7 for i in range(uploaders)]
+        self.groups = {}                # {tagid: 分组名}（不含固定分组）
+        self.membership = {mid: set() for mid in self.mids}
+        self._next_tagid = 1000
+
+        self.requests = Counter()       # 按路径统计的请求次数
+        self.errors = 0
+        self.risk_events = 0
+        self.connections = 0            # 本地服务接受的 TCP 连接数（客户端复用连接时远小于请求数）
+        self._served = Counter()        # 各会话参与风控计数的请求数
+        self._risk_left = Counter()     # 各会话本段风控剩余的请求数
+        self.sessions = Counter()       # 各会话的请求数
+
+    def follow(self, mids):
+        """新关注这些UP主（排在关注列表最前面，与B站按关注时间倒序一致）"""
+        with self.lock:
+            for mid in mids:
+                if mid not in self.membership:
+                    self.mids.insert(0, mid)
+                    self.membership[mid] = set()
+
+    # ---------- 合成数据 ----------
+    def _rng(self, mid, salt=0):
+        return random.Random(self.seed * 1000003 + mid * 31 + salt)
+
+    def _phrase(self, rng, count=3):
+        return "".join(rng.choice(WORDS) for _ in range(count))
+
+    def _uploader_name(self, mid):
+        return f"UP{mid}_" + self._phrase(self._rng(mid), 1)
+
+    def _sign(self, mid):
+        return self._phrase(self._rng(mid, 1), 4)
+
+    def _vlist(self, mid):
+        rng = self._rng(mid, 2)
+        typeids = list(ZONE_MAP)
+        home = rng.sample(typeids, 3)
+        return [{
+            "aid": mid * 100 + i,
+            "bvid": aid2bvid(mid * 100 + i),
+            "title": self._phrase(rng, rng.randint(2, 5)),
+            "typeid": rng.choice(home) if rng.random() < 0.8 else rng.choice(typeids),
+            "created": 1700000000 - i * 86400 - mid % 86400,
+            "mid": mid,
+        } for i in range(self.videos)]
+
+    # ---------- 故障注入 ----------
+    def delay(self):
+        """本次请求的模拟延迟（秒）"""
+        if self.latency <= 0:
+            return 0.0
+        with self.lock:
+            return max(0.0, self.latency * (1 + self.rng.uniform(-self.jitter, self.jitter)))
+
+    def _fault(self, session):
+        """按会话的风控段和错误率决定是否返回异常响应"""
+        with self.lock:
+            self.sessions[session] += 1
+            if session in self.banned:
+                self.risk_events += 1
+                return _json(None, code=-412, status=412)
+            self._served[session] += 1
+            if self._risk_left[session] == 0 and self.risk_every and self._served[session] % self.risk_every == 0:
+                self._risk_left[session] = self.risk_burst
+            if self._risk_left[session] > 0:
+                self._risk_left[session] -= 1
+                self.risk_events += 1
+                return _json(None, code=-412, status=412)
+            if self.error_rate and self.rng.random() < self.error_rate:
+                self.errors += 1
+                return httpx.Response(500, text="模拟服务器错误")
+        return None
+
+    # ---------- 请求处理 ----------
+    def handle(self, request):
+        """处理一个 httpx.Request，返回 httpx.Response"""
+        path = request.url.path
+        params = dict(request.url.params)
+        if request.method == "POST":
+            params.update(parse_qsl(request.content.decode("utf-8")))
+        with self.lock:
+            self.requests[path] += 1
+
+        if path == "/x/frontend/finger/spi":
+            return _json({"b_3": "MOCK-BUVID3", "b_4": "MOCK-BUVID4"})
+        if path == "/x/internal/gaia-gateway/ExClimbWuzhi":
+            return _json(None)
+        if path == "/x/web-interface/nav":
+            return _json({"isLogin": True, "wbi_img": {
+                "img_url": "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png",
+                "sub_url": "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png",
+            }})
+        if path.endswith("/dynamic"):
+            return httpx.Response(200, text="<html></html>")
+
+        handler = ROUTES.get(path)
+        if handler is None:
+            return _json(None, code=-404, status=404)
+        fault = self._fault(_sessdata(request))
+        if fault is not None:
+            return fault
+        with self.lock:
+            return handler(self, params)
+
+    def followings(self, params):
+        ps, pn = int(params.get("ps", 50)), int(params.get("pn", 1))
+        page = self.mids[(pn - 1) * ps: pn * ps]
+        return _json({"total": len(self.mids), "list": [{
+            "mid": mid,
+            "uname": self._uploader_name(mid),
+            "sign": self._sign(mid),
+            "official_verify": {"type": -1, "desc": ""},
+            "tag": sorted(self.membership[mid]) or None,
+        } for mid in page]})
+
+    def user_info(self, params):
+        mid = int(params["mid"])
+        return _json({"mid": mid, "name": self._uploader_name(mid), "sign": self._sign(mid),
+                      "official": {"role": 0, "title": "", "type": -1}})
+
+    def channel_list(self, params):
+        rng = self._rng(int(params["mid"]), 3)
+        seasons = [{"meta": {"name": "合集·" + self._phrase(rng, 2)}} for _ in range(rng.randint(0, 4))]
+        series = [{"meta": {"name": self._phrase(rng, 2)}} for _ in range(rng.randint(0, 2))]
+        return _json({"items_lists": {"seasons_list": seasons, "series_list": series,
+                                      "page": {"page_num": 1, "page_size": 20, "total": len(seasons) + len(series)}}})
+
+    def space_videos(self, params):
+        mid, ps, pn = int(params["mid"]), int(params.get("ps", 30)), int(params.get("pn", 1))
+        vlist = self._vlist(mid)
+        return _json({"list": {"vlist": vlist[(pn - 1) * ps: pn * ps], "tlist": {}},
+                      "page": {"pn": pn, "ps": ps, "count": len(vlist)}})
+
+    def articles(self, params):
+        rng = self._rng(int(params["mid"]), 4)
+        return _json({"articles": [{"title": self._phrase(rng, 4)} for _ in range(rng.choice([0, 0, 0, 2, 5]))]})
+
+    def view(self, params):
+        aid = bvid2aid(params["bvid"]) if params.get("bvid") else int(params["aid"])
+        return _json({"aid": aid, "bvid": aid2bvid(aid), "cid": aid, "pages": [{"cid": aid, "page": 1}]})
+
+    def video_tags(self, params):
+        aid = bvid2aid(params["bvid"]) if params.get("bvid") else int(params["aid"])
+        rng = self._rng(aid, 5)
+        return _json([{"tag_id": rng.randint(1, 10 ** 6), "tag_name": rng.choice(WORDS)} for _ in range(rng.randint(1, 6))])
+
+    def group_list(self, params):
+        counts = Counter(tagid for tags in self.membership.values() for tagid in tags)
+        fixed = [{"tagid": tagid, "name": name, "count": counts[tagid]} for tagid, name in FIXED_GROUPS.items()]
+        return _json(fixed + [{"tagid": tagid, "name": name, "count": counts[tagid]} for tagid, name in self.groups.items()])
+
+    def group_create(self, params):
+        tagid = self._next_tagid
+        self._next_tagid += 1
+        self.groups[tagid] = params["tag"]
+        return _json({"tagid": tagid})
+
+    def group_delete(self, params):
+        tagid = int(params["tagid"])
+        self.groups.pop(tagid, None)
+        for tags in self.membership.values():
+            tags.discard(tagid)
+        return _json(None)
+
+    def group_rename(self, params):
+        tagid = int(params["tagid"])
+        if tagid not in self.groups:
+            return _json(None, code=22106)
+        self.groups[tagid] = params["name"]
+        return _json(None)
+
+    def group_move(self, params):
+        tagids = {int(t) for t in params["tagids"].split(",") if t} - {0}
+        for fid in params["fids"].split(","):
+            if int(fid) in self.membership:
+                self.membership[int(fid)] = set(tagids)
+        return _json(None)
+
+    def stats(self):
+        return {"requests": sum(self.requests.values()), "by_path": dict(self.requests),
+                "errors": self.errors, "risk_events": self.risk_events, "connections": self.connections,
+                "sessions": dict(self.sessions)}
+
+
+ROUTES = {
+    "/x/relation/followings": MockBilibili.followings,
+    "/x/space/wbi/acc/info": MockBilibili.user_info,
+    "/x/polymer/web-space/seasons_series_list": MockBilibili.channel_list,
+    "/x/space/wbi/arc/search": MockBilibili.space_videos,
+    "/x/space/wbi/article": MockBilibili.articles,
+    "/x/web-interface/view": MockBilibili.view,
+    "/x/web-interface/view/detail/tag": MockBilibili.video_tags,
+    "/x/relation/tags": MockBilibili.group_list,
+    "/x/relation/tag/create": MockBilibili.group_create,
+    "/x/relation/tag/del": MockBilibili.group_delete,
+    "/x/relation/tag/update": MockBilibili.group_rename,
+    "/x/relation/tags/addUsers": MockBilibili.group_move,
+}
+
+
+class MockTransport(httpx.AsyncBaseTransport):
+    """进程内的 httpx transport，请求直接交给 MockBilibili 处理"""
+
+    def __init__(self, api):
+        self.api = api
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        delay = self.api.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        return self.api.handle(request)
+
+
+def make_server(api, host="127.0.0.1", port=8765):
+    """返回提供模拟接口的 HTTP 服务（每个连接一个线程，支持 keep-alive）"""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            super().setup()
+            api.connections += 1
+
+        def _serve(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            host_header = self.headers.get("X-Original-Host") or self.headers.get("Host", host)
+            request = httpx.Request(self.command, f"http://{host_header}{self.path}", content=body)
+            delay = api.delay()
+            if delay:
+                time.sleep(delay)
+            response = api.handle(request)
+            content = response.read()
+            self.send_response(response.status_code)
+            self.send_header("Content-Type", response.headers.get("Content-Type", "application/json"))
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        do_GET = _serve
+        do_POST = _serve
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def get_option(args, name, default):
+    """读取形如 --name N 的参数，按 default 的类型解析"""
+    if name in args:
+        i = args.index(name)
+        if i + 1 < len(args):
+            try:
+                return type(default)(args[i + 1])
+            except ValueError:
+                pass
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    api = MockBilibili(
+        uploaders=get_option(args, "--uploaders", 500),
+        latency=get_option(args, "--latency", 0.0) / 1000,
+        error_rate=get_option(args, "--error-rate", 0.0),
+        risk_every=get_option(args, "--risk-every", 0),
+        risk_burst=get_option(args, "--risk-burst", 0),
+        seed=get_option(args, "--seed", 42),
+    )
+    port = get_option(args, "--port", 8765)
+    server = make_server(api, port=port)
+    print(f"模拟接口已启动: http://127.0.0.1:{port}（{len(api.mids)} 个关注，Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(api.stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
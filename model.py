@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+UP主数据的紧凑内存表示
+关注列表很大时，每个UP主一个 dict、每个字段一个 list 的开销很可观，而且分区名、
+常见标签在成千上万条记录里重复出现。Uploader 用 __slots__ 存字段，分区和标签转成
+词表中的整数 ID（array）；合集、标题等字符串列表拼成一个字符串保存，
+省去每个字符串对象约 50 字节的开销，读取时再拆开。
+词表按每次读取共享（new_vocabularies()），读出的列表释放后词表随之释放，长期运行的进程不会累积旧词表。
+
+各分区视频数（video_zone_counts）与分区 ID 对齐存成一个整数 array。
+
+Uploader 提供与 dict 相同的 get() / [] 读取方式，分类、汇总等代码不必区分两者；
+to_dict() 能还原出与原 JSON 完全相同的记录（字段顺序、未知字段都保留）。
+"""
+
+import json
+from array import array
+
+# 列表字段中按词表转成 ID 的字段，及其它按 tuple 保存的字段
+ID_FIELDS = ("video_zones", "tags")
+TEXT_LIST_FIELDS = ("channels", "series", "video_titles", "articles")
+SCALAR_FIELDS = ("mid", "name", "sign", "official_verify")
+
+# 拼接字符串列表用的分隔符；含有它的列表按 tuple 保存
+SEPARATOR = "\x1f"
+
+
+class Vocabulary:
+    """字符串 <-> 整数 ID"""
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def __len__(self):
+        return len(self.strings)
+
+    def encode(self, values):
+        ids = array("I")
+        for value in values:
+            i = self.ids.get(value)
+            if i is None:
+                i = self.ids[value] = len(self.strings)
+                self.strings.append(value)
+            ids.append(i)
+        return ids
+
+    def decode(self, ids):
+        strings = self.strings
+        return [strings[i] for i in ids]
+
+
+def new_vocabularies():
+    """一组词表 {字段: Vocabulary}，同一次读取的UP主共用"""
+    return {field: Vocabulary() for field in ID_FIELDS}
+
+
+# 字段顺序 tuple 也共享，大多数记录的字段顺序相同
+_key_orders = {}
+
+
+def _is_text_list(value):
+    return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+
+def _pack(values):
+    """字符串列表 -> 拼接后的字符串（空列表和含分隔符的列表为 tuple）"""
+    if not values or any(SEPARATOR in v for v in values):
+        return tuple(values)
+    return SEPARATOR.join(values)
+
+
+def _unpack(packed):
+    if isinstance(packed, str):
+        return packed.split(SEPARATOR)
+    return list(packed)
+
+
+class Uploader:
+    """一个UP主的数据，字段与 up主详细数据.json 中的记录相同"""
+
+    __slots__ = ("mid", "name", "sign", "official_verify",
+                 "channels", "series", "video_titles", "articles",
+                 "video_zones", "tags", "zone_counts", "extra", "keys", "vocabularies")
+
+    def __init__(self, mid, name="", sign="", official_verify="", channels=(), series=(), video_titles=(),
+                 articles=(), video_zones=(), tags=(), extra=None, keys=None, vocabularies=None):
+        self.vocabularies = vocabularies or new_vocabularies()
+        self.mid = mid
+        self.name = name
+        self.sign = sign
+        self.official_verify = official_verify
+        self.channels = _pack(list(channels))
+        self.series = _pack(list(series))
+        self.video_titles = _pack(list(video_titles))
+        self.articles = _pack(list(articles))
+        self.video_zones = self.vocabularies["video_zones"].encode(video_zones)   # 分区 ID
+        self.tags = self.vocabularies["tags"].encode(tags)                        # 标签 ID
+        self.zone_counts = None         # 与 video_zones 对齐的视频数，没有时为 None
+        self.extra = extra              # 其他字段 {名称: 值}，没有时为 None
+        self.keys = keys                # 原记录的字段顺序，None 表示按 __init__ 的参数构造
+
+    @classmethod
+    def from_dict(cls, record, vocabularies=None):
+        """由 JSON 记录构造；不认识或类型不符的字段原样放进 extra
+
+        vocabularies: 与同一批UP主共用的词表（new_vocabularies()），不给时单独新建
+        """
+        up = cls.__new__(cls)
+        up.vocabularies = vocabularies or new_vocabularies()
+        extra = {}
+        for field in SCALAR_FIELDS:
+            setattr(up, field, record.get(field, ""))
+        for field in TEXT_LIST_FIELDS:
+            value = record.get(field)
+            if value is None or not _is_text_list(value):
+                setattr(up, field, ())
+                if field in record:
+                    extra[field] = value
+            else:
+                setattr(up, field, _pack(value))
+        for field in ID_FIELDS:
+            value = record.get(field)
+            if value is None or not _is_text_list(value):
+                setattr(up, field, array("I"))
+                if field in record:
+                    extra[field] = value
+            else:
+                setattr(up, field, up.vocabularies[field].encode(value))
+        up.zone_counts = None
+        counts = record.get("video_zone_counts")
+        if (isinstance(counts, dict) and list(counts) == record.get("video_zones")
+                and all(type(c) is int and 0 <= c < 2 ** 32 for c in counts.values())):
+            up.zone_counts = array("I", counts.values())
+        for key, value in record.items():
+            if key not in cls.__slots__ or key in ("extra", "keys", "zone_counts", "vocabularies"):
+                if key != "video_zone_counts" or up.zone_counts is None:
+                    extra[key] = value
+        up.extra = extra or None
+        keys = tuple(record)
+        up.keys = _key_orders.setdefault(keys, keys)
+        return up
+
+    def get(self, key, default=None):
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        if self.keys is not None and key not in self.keys:
+            return default
+        if key in ID_FIELDS:
+            return self.vocabularies[key].decode(getattr(self, key))
+        if key in TEXT_LIST_FIELDS:
+            return _unpack(getattr(self, key))
+        if key in SCALAR_FIELDS:
+            return getattr(self, key)
+        if key == "video_zone_counts" and self.zone_counts is not None:
+            return dict(zip(self.vocabularies["video_zones"].decode(self.video_zones), self.zone_counts))
+        return default
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def to_dict(self):
+        """还原为 JSON 记录"""
+        keys = self.keys or SCALAR_FIELDS + TEXT_LIST_FIELDS + ID_FIELDS
+        return {key: self[key] for key in keys}
+
+    def __eq__(self, other):
+        if isinstance(other, Uploader):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __repr__(self):
+        return f"Uploader(mid={self.mid!r}, name={self.name!r})"
+
+    def __reduce__(self):
+        # 词表按批共享，跨进程（多进程分类）时按 JSON 记录传递
+        return Uploader.from_dict, (self.to_dict(),)
+
+
+_MISSING = object()
+
+
+def from_dicts(records):
+    vocabularies = new_vocabularies()
+    return [Uploader.from_dict(record, vocabularies) for record in records]
+
+
+def to_dicts(uploaders):
+    return [up.to_dict() if isinstance(up, Uploader) else up for up in uploaders]
+
+
+def iter_json_array(f, object_hook=None, chunk_size=1 << 20):
+    """逐个解析文件中 JSON 数组的元素
+
+    json.load 要先把整个文件读成一个字符串（解码时的峰值约为文件大小的数倍），
+    这里按块读取，缓冲区中只保留尚未解析的部分。
+    """
+    decoder = json.JSONDecoder(object_hook=object_hook)
+    buf, pos, eof = "", 0, False
+    expect = "["
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n":
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("JSON 数组不完整")
+            chunk = f.read(chunk_size)
+            buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+            continue
+
+        char = buf[pos]
+        if expect == "[":
+            if char != "[":
+                raise ValueError("文件内容不是 JSON 数组")
+            pos += 1
+            expect = "value_or_end"
+        elif char == "]" and expect in ("value_or_end", "comma_or_end"):
+            return
+        elif expect == "comma_or_end":
+            if char != ",":
+                raise ValueError(f"JSON 数组格式错误: {buf[pos:pos + 20]!r}")
+            pos += 1
+            expect = "value"
+        else:
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # 元素可能被块边界截断（解析失败，或恰好解析到缓冲区末尾），读入下一块再试
+            if end is None or (end == len(buf) and not eof):
+                chunk = f.read(chunk_size)
+                buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+                continue
+            yield value
+            pos = end
+            expect = "comma_or_end"
+
+
+def load_json(path):
+    """读取 up主详细数据.json 为 Uploader 列表
+
+    数组的每个元素（UP主记录）解析完立即转成 Uploader，不必先构造整个 dict 列表；
+    记录内部的字段值（即使是含 mid、name 的对象）原样保留。
+    """
+    vocabularies = new_vocabularies()
+    with open(path, "r", encoding="utf-8") as f:
+        return [Uploader.from_dict(record, vocabularies) for record in iter_json_array(f)]
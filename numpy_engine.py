@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+整批矩阵计分（需要 numpy）
+classify.py --engine numpy 使用。每个UP主的文本仍由 KeywordMatcher 扫描一遍、分区直方图仍逐个读出，
+之后的计分全部是矩阵运算：
+
+  得分 = 关键词次数(上限5) × 关键词权重
+       + 分区加分：分区视频数 × 分区→分类命中矩阵，按投稿总数折算（旧数据按是否命中加满分）
+       + 特殊规则加分：名称/认证字符串数组上的包含判断（classify.SPECIAL_RULES）
+
+关键词次数和分区视频数按稀疏三元组保存，计分时按 CHUNK_ROWS 行一块展开成稠密矩阵再相乘，
+内存与UP主数成正比而不是 UP主数 × 关键词数；权重全为整数时按 int64 相乘。
+
+结果与 Classifier.classify 完全一致：同分时取 categories 中靠前的分类，最高分为 0 时归入默认分类。
+权重和各分区加分全为整数时按整数精确计算；否则最高分与次高分过于接近的UP主改用逐个计算。
+"""
+
+import numpy as np
+
+from classify import SPECIAL_RULES, ZONE_BONUS, combined_text, zone_histogram
+
+KEYWORD_CAP = 5
+
+# 计分时每块展开的行数
+CHUNK_ROWS = 4096
+
+SPECIAL_FIELDS = tuple(dict.fromkeys(field for field, _, _, _ in SPECIAL_RULES))
+
+
+class Features:
+    """一批UP主的计分特征，与分类规则无关：只改规则时可以直接复用"""
+
+    def __init__(self, n, keyword_entries, zones, zone_entries, weighted, texts):
+        self.n = n
+        # (行, 关键词序号, 次数(上限5)) 三元组，行号递增
+        self.keyword_rows, self.keyword_cols, self.keyword_values = keyword_entries
+        self.zones = zones                          # 分区名（小写），zone_cols 的取值对应这里的下标
+        self.zone_rows, self.zone_cols, self.zone_values = zone_entries
+        self.weighted = weighted                    # 每行是否有各分区视频数（bool）
+        self.texts = texts                          # {特殊规则字段: 小写字符串数组}
+
+    def __len__(self):
+        return self.n
+
+
+def _entries(rows, cols, values, dtype):
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64), np.array(values, dtype=dtype)
+
+
+def _chunk(rows, start, stop):
+    """三元组中 start <= 行 < stop 的切片（行号递增）"""
+    return slice(*np.searchsorted(rows, [start, stop]))
+
+
+class NumpyScorer:
+    """按 Classifier 的规则整批计分"""
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+        self.categories = list(classifier.categories)
+        column = {cat: i for i, cat in enumerate(self.categories)}
+
+        # 关键词（小写去重）及其在各分类的权重之和；不在 categories 中的分类不计分
+        self.keywords = list(classifier.keyword_matcher.keywords)
+        keyword_index = {kw: i for i, kw in enumerate(self.keywords)}
+        weights = [[0] * len(self.categories) for _ in self.keywords]
+        for category, keywords in classifier.keyword_rules.items():
+            if category in column:
+                for keyword, weight in keywords:
+                    weights[keyword_index[keyword.lower()]][column[category]] += weight
+        self.exact = all(float(w).is_integer() for row in weights for w in row)
+        self.keyword_weights = np.array(weights, dtype=np.int64 if self.exact else np.float64).reshape(
+            len(self.keywords), len(self.categories))
+
+        # 分区关键词 -> 分类列（zone_terms 已只含 categories 中的分类）
+        term_categories = np.zeros((len(classifier.zone_terms), len(self.categories)), dtype=np.int64)
+        for i, (category, _) in enumerate(classifier.zone_terms):
+            term_categories[i, column[category]] = 1
+        self.term_categories = term_categories
+
+        self._column = column
+        self._keyword_index = keyword_index
+
+    def extract(self, uploaders):
+        """提取计分特征"""
+        matcher = self.classifier.keyword_matcher
+        keyword_rows, keyword_cols, keyword_values = [], [], []
+        zone_index = {}
+        zone_rows, zone_cols, zone_values = [], [], []
+        weighted = np.zeros(len(uploaders), dtype=bool)
+        texts = {field: [] for field in SPECIAL_FIELDS}
+
+        for i, up in enumerate(uploaders):
+            for keyword, count in matcher.count(combined_text(up)).items():
+                keyword_rows.append(i)
+                keyword_cols.append(self._keyword_index[keyword])
+                keyword_values.append(min(count, KEYWORD_CAP))
+
+            histogram, weighted[i] = zone_histogram(up)
+            for zone, count in histogram.items():
+                zone_rows.append(i)
+                zone_cols.append(zone_index.setdefault(zone, len(zone_index)))
+                zone_values.append(count)
+
+            for field in SPECIAL_FIELDS:
+                texts[field].append((up.get(field, "") or "").lower())
+
+        return Features(
+            len(uploaders),
+            _entries(keyword_rows, keyword_cols, keyword_values, np.uint8),
+            list(zone_index),
+            _entries(zone_rows, zone_cols, zone_values, np.int64),
+            weighted,
+            {field: np.array(values, dtype=str) for field, values in texts.items()},
+        )
+
+    def zone_term_hits(self, zones):
+        """分区 × 分区关键词 的命中矩阵（0/1）"""
+        hits = np.zeros((len(zones), len(self.classifier.zone_terms)), dtype=np.int64)
+        for z, zone in enumerate(zones):
+            hits[z, self.classifier.zone_matches(zone)] = 1
+        return hits
+
+    def special_bonuses(self, features):
+        """上传者 × 分类 的特殊规则加分"""
+        bonuses = np.zeros((len(features), len(self.categories)), dtype=np.int64)
+        for field, groups, category, bonus in SPECIAL_RULES:
+            column = self._column.get(category or self.classifier.default_category)
+            if column is None:
+                continue
+            text = features.texts[field]
+            matched = np.ones(len(features), dtype=bool)
+            for group in groups:
+                matched &= np.logical_or.reduce([np.char.find(text, kw) >= 0 for kw in group])
+            bonuses[:, column] += bonus * matched
+        return bonuses
+
+    def score(self, features):
+        """(得分矩阵（上传者 × 分类，列顺序同 categories）, 是否为精确整数)"""
+        n, categories = len(features), len(self.categories)
+        scores = np.zeros((n, categories), dtype=np.float64)
+        exact = self.exact
+        zone_terms = self.zone_term_hits(features.zones)
+
+        for start in range(0, n, CHUNK_ROWS):
+            stop = min(n, start + CHUNK_ROWS)
+            m = stop - start
+
+            # 关键词：本块展开成稠密矩阵，按权重的类型（整数时 int64）相乘
+            part = _chunk(features.keyword_rows, start, stop)
+            counts = np.zeros((m, len(self.keywords)), dtype=self.keyword_weights.dtype)
+            counts[features.keyword_rows[part] - start, features.keyword_cols[part]] = features.keyword_values[part]
+            scores[start:stop] += counts @ self.keyword_weights
+
+            # 分区：视频数直方图与出现与否
+            part = _chunk(features.zone_rows, start, stop)
+            rows, cols = features.zone_rows[part] - start, features.zone_cols[part]
+            histogram = np.zeros((m, len(features.zones)), dtype=np.int64)
+            histogram[rows, cols] = features.zone_values[part]
+            present = np.zeros((m, len(features.zones)), dtype=np.int64)
+            present[rows, cols] = 1
+
+            total = histogram.sum(axis=1)
+            weighted = features.weighted[start:stop] & (total > 0)
+            # 按占比折算：ZONE_BONUS × 各关键词命中的视频数 / 总数，按分类求和
+            term_hits = histogram[weighted] @ zone_terms
+            divisor = total[weighted][:, None]
+            scores[start:stop][weighted] += ZONE_BONUS * (term_hits @ self.term_categories) / divisor
+            if exact and np.any((ZONE_BONUS * term_hits) % divisor):
+                exact = False
+            # 旧数据（或视频数全为 0）：命中的每个关键词加满分
+            full = ~weighted
+            term_present = (present[full] @ zone_terms) > 0
+            scores[start:stop][full] += ZONE_BONUS * (term_present.astype(np.int64) @ self.term_categories)
+
+        scores += self.special_bonuses(features)
+        if exact:
+            # 整数在 2^53 以内用 float64 相加没有误差
+            return np.rint(scores).astype(np.int64), True
+        return scores, False
+
+    def pick(self, scores, exact):
+        """每行的 (分类序号或 None, 是否需要逐个重算)；None 表示默认分类"""
+        best = scores.argmax(axis=1)
+        top = scores[np.arange(len(best)), best]
+        if exact:
+            return [None if t == 0 else int(b) for b, t in zip(best, top)], np.zeros(len(best), dtype=bool)
+
+        # 有小数：累加顺序不同可能带来极小误差，接近并列或接近 0 的行交给逐个计算
+        second = np.partition(scores, -2, axis=1)[:, -2] if scores.shape[1] > 1 else np.full(len(best), -np.inf)
+        tolerance = 1e-9 * np.maximum(1.0, np.abs(top))
+        unsure = (top - second <= tolerance) | (np.abs(top) <= tolerance)
+        return [None if t == 0 else int(b) for b, t in zip(best, top)], unsure
+
+    def classify_many(self, uploaders):
+        """批量分类，按输入顺序返回 [(分类, 理由), ...]"""
+        classifier = self.classifier
+        uploaders = list(uploaders)
+        if not uploaders:
+            return []
+        picks, unsure = self.pick(*self.score(self.extract(uploaders)))
+
+        results = []
+        for i, up in enumerate(uploaders):
+            name = up.get("name", "")
+            if name in classifier.manual:
+                results.append((classifier.manual[name], "手动指定"))
+            elif unsure[i]:
+                results.append(classifier.classify(up))
+            elif picks[i] is None:
+                results.append((classifier.default_category, "无明确特征，默认归类"))
+            else:
+                results.append((self.categories[picks[i]], classifier.reason(up)))
+        return results
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+性能分析
+各脚本加 --profile 运行时：
+  - 用 cProfile 包住整次运行，结果写到 data/profiles/<脚本>-<时间>.prof
+    （可用 python -m pstats、snakeviz 等查看），并打印累计耗时最多的函数；
+  - 打印各命名阶段（读取规则、读取数据、计分、写 JSON……）的耗时。
+加 --profile-sampling 时改用 pyinstrument 采样分析（需另行安装），结果写成 .html；
+未安装时退回 cProfile。
+
+代码中用 stage() 标记阶段，未开启分析时只多一次计时，开销可以忽略：
+  with stage("读取数据"):
+      uploaders = store.load_all()
+
+多进程分类（classify.py --workers）时 cProfile 只能看到主进程。
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+PROFILES_PATH = Path(__file__).parent / "data" / "profiles"
+
+
+def _pad(text, width):
+    """按显示宽度（中文占两格）左对齐"""
+    shown = sum(2 if unicodedata.east_asian_width(c) in "WF" else 1 for c in text)
+    return text + " " * max(0, width - shown)
+
+
+class StageTimer:
+    """按名称累计各阶段的耗时和次数（同名阶段多次进入时累加）"""
+
+    def __init__(self):
+        self.enabled = False
+        self.totals = {}
+        self.counts = {}
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[name] = self.totals.get(name, 0.0) + time.perf_counter() - start
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def print_summary(self, total):
+        print("\n阶段耗时:")
+        for name, seconds in self.totals.items():
+            count = self.counts[name]
+            times = f" ({count}次)" if count > 1 else ""
+            share = seconds / total * 100 if total else 0
+            print(f"  {_pad(name, 16)} {seconds:8.3f}s  {share:5.1f}%{times}")
+        print(f"  {_pad('总计', 16)} {total:8.3f}s")
+
+
+timer = StageTimer()
+
+
+def stage(name):
+    """标记一个命名阶段，用于 --profile 时的阶段耗时汇总"""
+    return timer.stage(name)
+
+
+def _output_path(name, suffix):
+    PROFILES_PATH.mkdir(parents=True, exist_ok=True)
+    return PROFILES_PATH / f"{name}-{datetime.now():%Y%m%d-%H%M%S}{suffix}"
+
+
+def _run_cprofile(name, func):
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(func)
+    finally:
+        path = _output_path(name, ".prof")
+        profile.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).sort_stats("cumulative").print_stats(15)
+        print("\n累计耗时最多的函数:")
+        print(out.getvalue().split("\n", 4)[-1].rstrip())
+        print(f"\n性能分析结果: {path}")
+
+
+def _run_sampling(name, func):
+    from pyinstrument import Profiler
+
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    try:
+        return func()
+    finally:
+        profiler.stop()
+        path = _output_path(name, ".html")
+        path.write_text(profiler.output_html(), encoding="utf-8")
+        print(profiler.output_text(unicode=True, color=False))
+        print(f"性能分析结果: {path}")
+
+
+def run_profiled(name, func, args=None):
+    """运行 func()；命令行带 --profile / --profile-sampling 时做性能分析"""
+    args = sys.argv[1:] if args is None else args
+    sampling = "--profile-sampling" in args
+    if not sampling and "--profile" not in args:
+        return func()
+
+    timer.enabled = True
+    start = time.perf_counter()
+    try:
+        if sampling:
+            try:
+                import pyinstrument  # noqa: F401
+            except ImportError:
+                print("未安装 pyinstrument（pip install pyinstrument），改用 cProfile")
+                sampling = False
+        return _run_sampling(name, func) if sampling else _run_cprofile(name, func)
+    finally:
+        timer.print_summary(time.perf_counter() - start)
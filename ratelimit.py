@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+自适应限速器
+fetch.py 和 sync_groups.py 的所有B站接口调用都经过这里：
+每个接口一个令牌桶，外加一个整体的桶（风控按会话计算）；
+请求成功时缓慢提速，遇到风控（-412/-352/-799、HTTP 412/429）时减半并暂停一段时间（AIMD）。
+
+重试后仍连续被风控、或凭证已失效（-101）时，限速器标记为 banned，之后经它的请求直接抛出
+CredentialBanned；多凭证分片采集据此停用该凭证（见 fetch.fetch_all）。
+fail_fast 的限速器遇到风控时不在这里暂停重试，直接抛出，暂停期间由其他凭证接手（见 resting()）。
+"""
+
+import asyncio
+import contextvars
+import time
+
+import httpx
+
+from metrics import metrics, start_counting
+
+# 风控相关的接口返回码和 HTTP 状态码
+RISK_CODES = {-412, -352, -799}
+RISK_STATUS = {412, 429}
+
+# 凭证失效（未登录）的返回码
+AUTH_CODES = {-101}
+
+# 各接口的 (初始速率, 最高速率)，单位：次/秒
+BUDGETS = {
+    "followings": (2.0, 5.0),
+    "user_info": (2.0, 5.0),
+    "channel_list": (3.0, 8.0),
+    "space_videos": (2.0, 6.0),
+    "articles": (3.0, 8.0),
+    "video_tags": (4.0, 10.0),
+    "group_list": (2.0, 5.0),
+    "group_write": (1.0, 3.0),
+    "group_move": (1.0, 3.0),
+}
+DEFAULT_BUDGET = (2.0, 5.0)
+GLOBAL_BUDGET = (6.0, 15.0)
+
+MIN_RATE = 0.2            # 降速下限
+INCREASE = 0.05           # 每次成功的加速量
+COOLDOWN = 5.0            # 首次风控暂停秒数，连续风控时翻倍
+MAX_COOLDOWN = 120.0
+BAN_AFTER = 3             # 连续这么多个请求重试后仍被风控，视为凭证已被封
+RETRY_DELAY = 1.0         # 网络错误等临时失败的首次重试间隔，之后每次翻倍
+
+
+class CredentialBanned(Exception):
+    """凭证已被标记为封禁，不再发请求"""
+
+
+def is_risk_control(e):
+    """是否为风控/限流错误"""
+    return getattr(e, "code", None) in RISK_CODES or getattr(e, "status", None) in RISK_STATUS
+
+
+def is_auth_error(e):
+    """凭证是否已失效"""
+    return getattr(e, "code", None) in AUTH_CODES
+
+
+def is_transient(e):
+    """可以直接重试的临时网络错误"""
+    status = getattr(e, "status", None)
+    return isinstance(e, httpx.TransportError) or (isinstance(status, int) and status >= 500)
+
+
+class TokenBucket:
+    """令牌桶（按理论到达时间计算，不需要锁）"""
+
+    def __init__(self, rate, max_rate, burst=2):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self._tat = 0.0              # 下一个令牌的理论时间
+        self.blocked_until = 0.0
+        self.cooldown = COOLDOWN
+
+    def reserve(self):
+        """占用一个令牌，返回需要等待的秒数"""
+        now = time.monotonic()
+        interval = 1.0 / self.rate
+        tat = max(self._tat, now, self.blocked_until)
+        self._tat = tat + interval
+        return max(0.0, tat - now - (self.burst - 1) * interval)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + INCREASE)
+        self.cooldown = COOLDOWN
+
+    def on_risk(self):
+        """减半速率并暂停一段时间，返回暂停秒数"""
+        self.rate = max(MIN_RATE, self.rate / 2)
+        pause = self.cooldown
+        self.blocked_until = time.monotonic() + pause
+        self.cooldown = min(MAX_COOLDOWN, self.cooldown * 2)
+        return pause
+
+
+class RateLimiter:
+    """按接口限速并自动重试风控错误"""
+
+    def __init__(self, budgets=None, global_budget=GLOBAL_BUDGET):
+        self.budgets = dict(BUDGETS, **(budgets or {}))
+        self.global_budget = global_budget
+        self.buckets = {}
+        self.overall = TokenBucket(*global_budget, burst=4)
+        self.risk_events = 0
+        self.retries = 0
+        self.risk_failures = 0      # 连续重试失败的风控次数
+        self.banned = False
+        self.fail_fast = False      # 风控时不重试（还有其他凭证可用时）
+
+    def unban(self):
+        """解除封禁标记（守护进程暂停一段时间后再试）"""
+        self.banned = False
+        self.risk_failures = 0
+
+    def fresh(self):
+        """预算相同、状态独立的新限速器（每个凭证一个）"""
+        return RateLimiter(self.budgets, self.global_budget)
+
+    def resting(self):
+        """风控后整体暂停还剩的秒数"""
+        return max(0.0, self.overall.blocked_until - time.monotonic())
+
+    def bucket(self, endpoint):
+        if endpoint not in self.buckets:
+            self.buckets[endpoint] = TokenBucket(*self.budgets.get(endpoint, DEFAULT_BUDGET))
+        return self.buckets[endpoint]
+
+    async def acquire(self, endpoint):
+        bucket = self.bucket(endpoint)
+        delay = max(bucket.reserve(), self.overall.reserve())
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def call(self, endpoint, factory, retries=3):
+        """限速后执行 factory()，风控和临时网络错误自动退避重试"""
+        bucket = self.bucket(endpoint)
+        for attempt in range(retries + 1):
+            await self.acquire(endpoint)
+            if self.banned:
+                # 风控暂停期间凭证被判定为封禁，剩下的请求直接放弃
+                raise CredentialBanned(endpoint)
+            start = time.perf_counter()
+            received = start_counting()
+            try:
+                result = await factory()
+            except Exception as e:
+                metrics.record(endpoint, time.perf_counter() - start, error=e)
+                if self.fail_fast and is_risk_control(e):
+                    self.risk_events += 1
+                    self.risk_failures += 1
+                    self.overall.on_risk()
+                    bucket.on_risk()
+                    # 每次风控算一次尝试，与照常重试时判定封禁所需的次数相同
+                    if self.risk_failures >= BAN_AFTER * (retries + 1):
+                        self.banned = True
+                    raise
+                if attempt < retries and is_risk_control(e):
+                    self.risk_events += 1
+                    self.retries += 1
+                    metrics.retry(endpoint)
+                    self.overall.on_risk()
+                    pause = bucket.on_risk()
+                    print(f"  ! {endpoint} 触发风控（{e.__class__.__name__}），暂停 {pause:.0f}s 后重试，{self.status()}")
+                    continue
+                if attempt < retries and is_transient(e):
+                    self.retries += 1
+                    metrics.retry(endpoint)
+                    await asyncio.sleep(RETRY_DELAY * 2 ** attempt)
+                    continue
+                if is_risk_control(e):
+                    self.risk_events += 1
+                    self.risk_failures += 1
+                    bucket.on_risk()
+                if is_auth_error(e) or self.risk_failures >= BAN_AFTER:
+                    self.banned = True
+                raise
+            metrics.record(endpoint, time.perf_counter() - start, size=received[0])
+            self.risk_failures = 0
+            bucket.on_success()
+            self.overall.on_success()
+            return result
+
+    def snapshot(self):
+        """当前限速状态，用于运行报告"""
+        return {
+            "risk_events": self.risk_events,
+            "retries": self.retries,
+            "banned": self.banned,
+            "overall_rate": self.overall.rate,
+            "rates": {name: b.rate for name, b in self.buckets.items()},
+        }
+
+    def status(self):
+        """当前限速状态，用于进度输出"""
+        rates = " ".join(f"{name}={b.rate:.1f}" for name, b in self.buckets.items())
+        return f"[限速 总{self.overall.rate:.1f}/s {rates}；风控 {self.risk_events} 次]"
+
+
+# 进程内共享的限速器
+limiter = RateLimiter()
+
+# 当前任务改用的限速器（多凭证采集时每个分片一个），None 表示用 limiter
+current_limiter = contextvars.ContextVar("current_limiter", default=None)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+分类结果缓存（SQLite，data/分类缓存.db，与 分类结果.json 放在一起）
+按 规则哈希 + UP主内容哈希 缓存 (分类, 理由)：规则和UP主数据都没变时直接取缓存，
+只有新增或内容变化的UP主才重新计分。规则一改，哈希随之改变，旧结果不再命中；
+旧规则版本的结果先保留，改回原来的规则时仍能直接命中。
+
+缓存条数超过 MAX_ENTRIES 时，先按最近使用时间（rule_versions.last_used）删除旧规则版本的结果，
+仍超出时再删除当前版本中本次没有用到的结果（UP主已取关或数据已变化）。
+SCORING_VERSION 改变后的旧结果再也不会命中，同样按最久未用最先删除。
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+# 参与计分或理由的字段，任何一个变化都要重新分类
+SCORED_FIELDS = ("name", "sign", "official_verify", "channels", "series",
+                 "video_titles", "tags", "articles", "video_zones", "video_zone_counts")
+
+# 计分逻辑本身（不在规则文件里的部分）变化时加一，使旧结果全部失效
+# 2: 分区加分按投稿占比折算
+SCORING_VERSION = 2
+
+MAX_ENTRIES = 200000
+
+
+def _digest(value):
+    text = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def rules_hash(rules):
+    return _digest([SCORING_VERSION, rules])
+
+
+def uploader_hash(up_info):
+    return _digest([up_info.get(field) for field in SCORED_FIELDS])
+
+
+class ResultCache:
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " rules_hash TEXT NOT NULL,"
+                " up_hash TEXT NOT NULL,"
+                " category TEXT NOT NULL,"
+                " reason TEXT NOT NULL,"
+                " PRIMARY KEY (rules_hash, up_hash)) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS rule_versions ("
+                " rules_hash TEXT PRIMARY KEY,"
+                " last_used REAL NOT NULL)"
+            )
+        return self._conn
+
+    def load(self, version):
+        """某个规则版本的全部缓存结果 {UP主哈希: (分类, 理由)}"""
+        rows = self._db().execute(
+            "SELECT up_hash, category, reason FROM results WHERE rules_hash = ?", (version,)
+        )
+        return {up_hash: (category, reason) for up_hash, category, reason in rows}
+
+    def classify_many(self, classifier, uploaders, **kwargs):
+        """同 Classifier.classify_many，命中缓存的UP主不再计分；kwargs 原样传给 classify_many"""
+        uploaders = list(uploaders)
+        version = rules_hash(classifier.rules)
+        hashes = [uploader_hash(up) for up in uploaders]
+        cached = self.load(version)
+
+        missing = [i for i, h in enumerate(hashes) if h not in cached]
+        fresh = classifier.classify_many([uploaders[i] for i in missing], **kwargs) if missing else []
+        self.hits += len(uploaders) - len(missing)
+        self.misses += len(missing)
+
+        new = {}
+        for i, result in zip(missing, fresh):
+            new[hashes[i]] = result
+        self._save(version, new, set(hashes))
+
+        results = []
+        for h in hashes:
+            results.append(cached[h] if h in cached else new[h])
+        return results
+
+    def _save(self, version, new, used):
+        db = self._db()
+        with db:
+            db.executemany(
+                "INSERT OR REPLACE INTO results (rules_hash, up_hash, category, reason) VALUES (?, ?, ?, ?)",
+                [(version, h, category, reason) for h, (category, reason) in new.items()],
+            )
+            db.execute(
+                "INSERT OR REPLACE INTO rule_versions (rules_hash, last_used) VALUES (?, ?)",
+                (version, time.time()),
+            )
+            self._evict(version, used)
+
+    def _evict(self, version, used):
+        db = self._db()
+        total = db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        if total <= self.max_entries:
+            return
+
+        # 旧规则版本，最久未用的先删
+        old_versions = [v for (v,) in db.execute(
+            "SELECT rules_hash FROM rule_versions WHERE rules_hash != ? ORDER BY last_used", (version,)
+        )]
+        for old in old_versions:
+            total -= db.execute("DELETE FROM results WHERE rules_hash = ?", (old,)).rowcount
+            db.execute("DELETE FROM rule_versions WHERE rules_hash = ?", (old,))
+            if total <= self.max_entries:
+                return
+
+        # 当前版本中本次没用到的结果
+        stale = [(version, h) for h in set(self.load(version)) - used]
+        db.executemany("DELETE FROM results WHERE rules_hash = ? AND up_hash = ?", stale)
+
+    def clear(self):
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM results")
+            db.execute("DELETE FROM rule_versions")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+规则改动影响分析（python classify.py impact）
+data/规则索引.db 保存：
+  - 每个UP主的待匹配文本、各分区视频数、名称认证和上次的分类结果；
+  - 倒排索引：关键词 / 分区关键词 -> 含有它的UP主及出现次数。
+
+修改 classify_rules.json 后，与上次应用的规则逐项比较，只有命中了改动过的关键词、
+分区关键词或手动指定的UP主才重新计分（得分直接由索引算出，不再扫描文本），
+并列出分类发生变化的UP主及原因。UP主数据有变化时先增量更新索引。
+分类列表、默认分类或计分逻辑变化时所有UP主都要重算，仍然只用索引。
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+from classify import Classifier, combined_text, zone_histogram
+from matcher import KeywordMatcher
+from result_cache import SCORING_VERSION, uploader_hash
+
+KEYWORD = "keyword"
+ZONE = "zone"
+
+# 索引表结构或存储格式变化时加一，旧索引清空重建
+# 2: zones 列改存分区视频数 [{分区: 视频数}, 是否有视频数]
+INDEX_VERSION = 2
+
+# 新关键词较多时（如首次建立索引）改为用自动机把全部文本扫描一遍，比逐词在 SQLite 中查找快
+BULK_SCAN_TERMS = 50
+
+
+def keyword_terms(rules):
+    """{关键词(小写): [(分类, 权重), ...]}"""
+    terms = {}
+    for category, keywords in rules.get("keyword_rules", {}).items():
+        for keyword, weight in keywords:
+            terms.setdefault(keyword.lower(), []).append((category, weight))
+    return terms
+
+
+def zone_terms(rules):
+    """{分区关键词: [分类, ...]}"""
+    terms = {}
+    for category, keywords in rules.get("zone_mapping", {}).items():
+        for keyword in keywords:
+            terms.setdefault(keyword, []).append(category)
+    return terms
+
+
+def global_signature(rules):
+    """影响所有UP主得分的部分：分类列表、默认分类、各分类在规则中的顺序、计分逻辑版本"""
+    return [
+        SCORING_VERSION,
+        rules["categories"],
+        rules.get("default_category"),
+        list(rules.get("keyword_rules", {})),
+        list(rules.get("zone_mapping", {})),
+    ]
+
+
+def changed_keys(old, new):
+    return {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+
+
+def data_signature(path):
+    """数据文件（含 SQLite 的 -wal 文件）的修改时间和大小"""
+    path = Path(path)
+    signature = []
+    for p in (path, path.with_name(path.name + "-wal")):
+        if p.exists():
+            stat = p.stat()
+            signature.append([p.name, stat.st_mtime_ns, stat.st_size])
+    return signature
+
+
+def _format_weights(pairs):
+    return "、".join(f"{category}{weight:+g}" for category, weight in pairs) if pairs else "无"
+
+
+class Impact:
+    """一次更新的结果"""
+
+    def __init__(self):
+        self.rebuilt = False        # 首次建立索引或需要全部重算
+        self.added = set()          # 新UP主 mid
+        self.removed = []           # [(mid, 名称, 原分类)]
+        self.rescored = 0
+        self.moves = []             # [(mid, 名称, 原分类, 新分类, [原因, ...])]
+        self.changed = False        # 是否有任何UP主的分类或理由变化
+
+
+class RuleIndex:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploaders ("
+            " mid INTEGER PRIMARY KEY,"
+            " position INTEGER NOT NULL,"
+            " up_hash TEXT NOT NULL,"
+            " name TEXT NOT NULL,"
+            " official TEXT NOT NULL,"
+            " text TEXT NOT NULL,"
+            " zones TEXT NOT NULL,"
+            " detail TEXT NOT NULL,"       # Classifier.reason()，只与内容有关
+            " category TEXT,"
+            " reason TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " kind TEXT NOT NULL,"
+            " term TEXT NOT NULL,"
+            " mid INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (kind, term, mid)) WITHOUT ROWID"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_mid ON postings(mid)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS terms (kind TEXT, term TEXT, PRIMARY KEY (kind, term))")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        if self._meta("index_version") != INDEX_VERSION:
+            with self.conn:
+                for table in ("uploaders", "postings", "terms", "meta"):
+                    self.conn.execute(f"DELETE FROM {table}")
+                self._set_meta("index_version", INDEX_VERSION)
+
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    def _indexed(self, kind):
+        return {term for (term,) in self.conn.execute("SELECT term FROM terms WHERE kind = ?", (kind,))}
+
+    def _mids_for(self, kind, terms):
+        mids = set()
+        for term in terms:
+            mids.update(mid for (mid,) in self.conn.execute(
+                "SELECT mid FROM postings WHERE kind = ? AND term = ?", (kind, term)
+            ))
+        return mids
+
+    # ---------- 数据同步 ----------
+
+    def sync_data(self, uploaders, keywords=(), zones=()):
+        """按内容哈希增量更新UP主文本和倒排索引，返回 (新增或变化的 mid, 删除的 [(mid, 名称, 原分类)])
+
+        变化的UP主按已索引的关键词和 keywords / zones 建立倒排，后两者随后记为已索引。
+        """
+        stored = dict(self.conn.execute("SELECT mid, up_hash FROM uploaders"))
+        keywords = sorted(self._indexed(KEYWORD) | {kw for kw in keywords if kw})
+        zones = sorted(self._indexed(ZONE) | {kw for kw in zones if kw})
+        matcher = KeywordMatcher(keywords)
+
+        changed = set()
+        rows, postings = [], []
+        positions = []
+        for position, up in enumerate(uploaders):
+            mid = up["mid"]
+            up_hash = uploader_hash(up)
+            positions.append((position, mid))
+            if stored.get(mid) == up_hash:
+                continue
+            changed.add(mid)
+            text = combined_text(up)
+            histogram, weighted = zone_histogram(up)
+            rows.append((mid, position, up_hash, up.get("name", ""), up.get("official_verify", "") or "",
+                         text, json.dumps([histogram, weighted], ensure_ascii=False), Classifier.reason(up)))
+            for keyword, count in matcher.count(text).items():
+                postings.append((KEYWORD, keyword, mid, count))
+            for zone in zones:
+                if any(zone in name for name in histogram):
+                    postings.append((ZONE, zone, mid, 1))
+
+        current = {mid for _, mid in positions}
+        removed = [row for row in self.conn.execute("SELECT mid, name, category FROM uploaders")
+                   if row[0] not in current]
+
+        with self.conn:
+            gone = [(mid,) for mid, _, _ in removed] + [(mid,) for mid in changed]
+            self.conn.executemany("DELETE FROM postings WHERE mid = ?", gone)
+            self.conn.executemany("DELETE FROM uploaders WHERE mid = ?", [(mid,) for mid, _, _ in removed])
+            # 内容变化的UP主保留原分类，便于对比
+            self.conn.executemany(
+                "INSERT INTO uploaders (mid, position, up_hash, name, official, text, zones, detail)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(mid) DO UPDATE SET position = excluded.position, up_hash = excluded.up_hash,"
+                " name = excluded.name, official = excluded.official, text = excluded.text,"
+                " zones = excluded.zones, detail = excluded.detail",
+                rows,
+            )
+            self.conn.executemany("INSERT INTO postings (kind, term, mid, count) VALUES (?, ?, ?, ?)", postings)
+            self.conn.executemany("UPDATE uploaders SET position = ? WHERE mid = ?", positions)
+            self.conn.executemany("INSERT OR IGNORE INTO terms (kind, term) VALUES (?, ?)",
+                                  [(KEYWORD, kw) for kw in keywords] + [(ZONE, kw) for kw in zones])
+        return changed, removed
+
+    def index_terms(self, kind, terms):
+        """给尚未索引的关键词建立倒排（扫描已存的文本）"""
+        indexed = self._indexed(kind)
+        new = [term for term in terms if term and term not in indexed]
+        if not new:
+            return
+        with self.conn:
+            if kind == KEYWORD and len(new) > BULK_SCAN_TERMS:
+                matcher = KeywordMatcher(new)
+                for mid, text in self.conn.execute("SELECT mid, text FROM uploaders").fetchall():
+                    self.conn.executemany(
+                        "INSERT OR REPLACE INTO postings (kind, term, mid, count) VALUES (?, ?, ?, ?)",
+                        [(kind, term, mid, count) for term, count in matcher.count(text).items()],
+                    )
+                self.conn.executemany("INSERT OR IGNORE INTO terms (kind, term) VALUES (?, ?)",
+                                      [(kind, term) for term in new])
+                return
+            for term in new:
+                if kind == KEYWORD:
+                    # 不重叠计数，与 re.findall / KeywordMatcher.count 一致
+                    rows = self.conn.execute(
+                        "SELECT mid, (length(text) - length(replace(text, ?1, ''))) / length(?1)"
+                        " FROM uploaders WHERE instr(text, ?1) > 0", (term,)
+                    ).fetchall()
+                else:
+                    # 先在 JSON 文本中粗筛，再逐个分区名确认
+                    rows = [(mid, 1) for mid, zones in self.conn.execute(
+                        "SELECT mid, zones FROM uploaders WHERE instr(zones, ?) > 0", (term,)
+                    ) if any(term in name for name in json.loads(zones)[0])]
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO postings (kind, term, mid, count) VALUES (?, ?, ?, ?)",
+                    [(kind, term, mid, count) for mid, count in rows],
+                )
+                self.conn.execute("INSERT OR IGNORE INTO terms (kind, term) VALUES (?, ?)", (kind, term))
+
+    def drop_terms(self, kind, keep):
+        """删除规则中已不存在的关键词的倒排"""
+        stale = [(kind, term) for term in self._indexed(kind) - set(keep)]
+        with self.conn:
+            self.conn.executemany("DELETE FROM postings WHERE kind = ? AND term = ?", stale)
+            self.conn.executemany("DELETE FROM terms WHERE kind = ? AND term = ?", stale)
+
+    # ---------- 计分 ----------
+
+    def rescore(self, classifier, mids):
+        """只凭索引重算这些UP主，返回 {mid: (名称, 原分类, 原理由, 新分类, 新理由)}"""
+        keywords = set(keyword_terms(classifier.rules))
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS wanted (mid INTEGER PRIMARY KEY)")
+        self.conn.execute("DELETE FROM wanted")
+        self.conn.executemany("INSERT INTO wanted (mid) VALUES (?)", [(mid,) for mid in mids])
+
+        counts = {}
+        for mid, term, count in self.conn.execute(
+            "SELECT p.mid, p.term, p.count FROM postings p JOIN wanted w ON p.mid = w.mid WHERE p.kind = ?",
+            (KEYWORD,),
+        ):
+            if term in keywords:
+                counts.setdefault(mid, {})[term] = count
+
+        results = {}
+        for mid, name, official, zones, detail, category, reason in self.conn.execute(
+            "SELECT u.mid, name, official, zones, detail, category, reason FROM uploaders u JOIN wanted w ON u.mid = w.mid"
+        ):
+            if name in classifier.manual:
+                new = classifier.manual[name], "手动指定"
+            else:
+                histogram, weighted = json.loads(zones)
+                scores = classifier.score_counts(counts.get(mid, {}), histogram, weighted,
+                                                 {"name": name, "official_verify": official})
+                best = classifier.best_category(scores)
+                new = (classifier.default_category, "无明确特征，默认归类") if best is None else (best, detail)
+            results[mid] = (name, category, reason, *new)
+        return results
+
+    def update(self, classifier, load_uploaders, data_path):
+        """按当前规则和数据更新索引与分类，返回 Impact
+
+        load_uploaders() 只在数据文件变化（或首次运行）时调用。
+        """
+        impact = Impact()
+        rules = classifier.rules
+        old_rules = self._meta("rules")
+
+        new_keywords, new_zones = keyword_terms(rules), zone_terms(rules)
+        changed_mids = set()
+        signature = data_signature(data_path)
+        if signature != self._meta("data_signature"):
+            known = {mid for (mid,) in self.conn.execute("SELECT mid FROM uploaders")}
+            if known:
+                changed_mids, impact.removed = self.sync_data(load_uploaders())
+            else:
+                # 首次建立：扫描文本时顺带索引当前规则的全部关键词
+                changed_mids, impact.removed = self.sync_data(load_uploaders(), new_keywords, new_zones)
+            impact.added = changed_mids - known
+
+        self.index_terms(KEYWORD, new_keywords)
+        self.index_terms(ZONE, new_zones)
+
+        # 受影响的UP主及原因
+        why = {}
+        if old_rules is None or global_signature(old_rules) != global_signature(rules):
+            impact.rebuilt = True
+            affected = {mid for (mid,) in self.conn.execute("SELECT mid FROM uploaders")}
+            for mid in affected:
+                why[mid] = ["分类列表或默认分类变化"]
+        else:
+            old_keywords, old_zones = keyword_terms(old_rules), zone_terms(old_rules)
+            affected = set()
+            for term in changed_keys(old_keywords, new_keywords):
+                for mid, count in self.conn.execute(
+                    "SELECT mid, count FROM postings WHERE kind = ? AND term = ?", (KEYWORD, term)
+                ):
+                    affected.add(mid)
+                    why.setdefault(mid, []).append(
+                        f"'{term}'×{count}: {_format_weights(old_keywords.get(term))}"
+                        f" → {_format_weights(new_keywords.get(term))}"
+                    )
+            for term in changed_keys(old_zones, new_zones):
+                for mid in self._mids_for(ZONE, [term]):
+                    affected.add(mid)
+                    why.setdefault(mid, []).append(
+                        f"分区'{term}': {'、'.join(old_zones.get(term, [])) or '无'}"
+                        f" → {'、'.join(new_zones.get(term, [])) or '无'}"
+                    )
+            old_manual, new_manual = old_rules.get("manual", {}), rules.get("manual", {})
+            names = changed_keys(old_manual, new_manual)
+            if names:
+                for (mid, name) in self.conn.execute("SELECT mid, name FROM uploaders"):
+                    if name in names:
+                        affected.add(mid)
+                        why.setdefault(mid, []).append(
+                            f"手动指定: {old_manual.get(name, '无')} → {new_manual.get(name, '无')}"
+                        )
+        for mid in changed_mids:
+            why.setdefault(mid, []).append("新UP主" if mid in impact.added else "UP主数据变化")
+        affected |= changed_mids
+
+        results = self.rescore(classifier, affected)
+        impact.rescored = len(results)
+        with self.conn:
+            updates = []
+            for mid, (name, old_category, old_reason, category, reason) in results.items():
+                if (old_category, old_reason) != (category, reason):
+                    impact.changed = True
+                    updates.append((category, reason, mid))
+                if old_category is not None and old_category != category:
+                    impact.moves.append((mid, name, old_category, category, why.get(mid, [])))
+            self.conn.executemany("UPDATE uploaders SET category = ?, reason = ? WHERE mid = ?", updates)
+            self._set_meta("rules", rules)
+            self._set_meta("data_signature", signature)
+        impact.changed = impact.changed or bool(impact.removed)
+
+        self.drop_terms(KEYWORD, new_keywords)
+        self.drop_terms(ZONE, new_zones)
+        return impact
+
+    def entries(self):
+        """按原数据顺序的 [(名称, mid, 分类, 理由), ...]"""
+        return self.conn.execute("SELECT name, mid, category, reason FROM uploaders ORDER BY position").fetchall()
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+UP主数据存储
+fetch / classify / generate_info / add_new 统一通过 open_store() 读写UP主数据。
+只读取不修改的场合（分类、生成汇总）用 load_models() 得到紧凑的 model.Uploader 列表。
+
+两种后端，由 data/config.json 的 "storage" 字段选择：
+  json   （默认）整个 up主详细数据.json 一次读写，与旧版完全兼容
+  sqlite 按 mid 存在 data/uploaders.db，单条增改不再重写整个文件
+
+用法:
+  python store.py import   # up主详细数据.json -> uploaders.db
+  python store.py export   # uploaders.db -> up主详细数据.json
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+import model
+
+BASE_PATH = Path(__file__).parent
+DATA_PATH = BASE_PATH / "data"
+JSON_PATH = DATA_PATH / "up主详细数据.json"
+DB_PATH = DATA_PATH / "uploaders.db"
+
+# 列表字段 -> 子表
+LIST_TABLES = {
+    "channels": "uploader_channels",
+    "series": "uploader_series",
+    "video_titles": "uploader_titles",
+    "video_zones": "uploader_zones",
+    "tags": "uploader_tags",
+    "articles": "uploader_articles",
+}
+SCALAR_FIELDS = ("name", "sign", "official_verify")
+
+# 按值查询常用的子表建索引（某标签/某分区有哪些UP主）
+VALUE_INDEXED = ("uploader_zones", "uploader_tags")
+
+
+class JsonStore:
+    """up主详细数据.json，每次写入都重写整个文件
+
+    先写同目录的临时文件再改名替换，写入中途中断时原文件保持完整。
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or JSON_PATH)
+
+    def load_all(self):
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return []
+
+    def load_models(self):
+        """读取为 model.Uploader 列表（边解析边转换，内存占用更小）"""
+        if self.path.exists():
+            return model.load_json(self.path)
+        return []
+
+    def save_all(self, uploaders):
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(model.to_dicts(uploaders), f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        tmp.replace(self.path)
+
+    def mids(self):
+        return {up["mid"] for up in self.load_all()}
+
+    def get(self, mid):
+        for up in self.load_all():
+            if up["mid"] == mid:
+                return up
+        return None
+
+    def upsert_many(self, records):
+        """按 mid 更新或追加（新UP主排在末尾）"""
+        uploaders = self.load_all()
+        index = {up["mid"]: i for i, up in enumerate(uploaders)}
+        for record in records:
+            if record["mid"] in index:
+                uploaders[index[record["mid"]]] = record
+            else:
+                index[record["mid"]] = len(uploaders)
+                uploaders.append(record)
+        self.save_all(uploaders)
+
+    def delete(self, mids):
+        mids = set(mids)
+        self.save_all([up for up in self.load_all() if up["mid"] not in mids])
+
+    def close(self):
+        pass
+
+
+class SqliteStore:
+    """uploaders.db：主表按 mid 存基本信息，列表字段各存一张子表
+
+    主表的 fields 列记录原始字段顺序，其他未知字段存 extra（JSON），
+    保证与 up主详细数据.json 互相转换不丢信息。
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or DB_PATH)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS uploaders ("
+            " mid INTEGER PRIMARY KEY,"
+            " seq INTEGER NOT NULL,"
+            " name TEXT,"
+            " sign TEXT,"
+            " official_verify TEXT,"
+            " fields TEXT NOT NULL,"
+            " extra TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_uploaders_seq ON uploaders(seq)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_uploaders_name ON uploaders(name)")
+        for table in LIST_TABLES.values():
+            self.conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " mid INTEGER NOT NULL,"
+                " pos INTEGER NOT NULL,"
+                " value TEXT NOT NULL,"
+                " PRIMARY KEY (mid, pos)) WITHOUT ROWID"
+            )
+        for table in VALUE_INDEXED:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_value ON {table}(value)")
+        self.conn.commit()
+
+    @staticmethod
+    def _is_text(value):
+        return value is None or isinstance(value, str)
+
+    @staticmethod
+    def _is_text_list(value):
+        return isinstance(value, list) and all(isinstance(v, str) for v in value)
+
+    def _write(self, record, seq):
+        mid = record["mid"]
+        extra = {}
+        for key, value in record.items():
+            if key == "mid" or (key in SCALAR_FIELDS and self._is_text(value)):
+                continue
+            if key in LIST_TABLES and self._is_text_list(value):
+                continue
+            extra[key] = value
+
+        self.conn.execute(
+            "INSERT INTO uploaders (mid, seq, name, sign, official_verify, fields, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(mid) DO UPDATE SET name=excluded.name, sign=excluded.sign,"
+            " official_verify=excluded.official_verify, fields=excluded.fields, extra=excluded.extra",
+            (
+                mid, seq,
+                *(record.get(key) if self._is_text(record.get(key)) else None for key in SCALAR_FIELDS),
+                json.dumps(list(record.keys()), ensure_ascii=False),
+                json.dumps(extra, ensure_ascii=False),
+            ),
+        )
+        for key, table in LIST_TABLES.items():
+            self.conn.execute(f"DELETE FROM {table} WHERE mid = ?", (mid,))
+            value = record.get(key)
+            if key in record and self._is_text_list(value):
+                self.conn.executemany(
+                    f"INSERT INTO {table} (mid, pos, value) VALUES (?, ?, ?)",
+                    [(mid, pos, v) for pos, v in enumerate(value)],
+                )
+
+    def _build(self, row, lists):
+        mid, name, sign, official_verify, fields, extra = row
+        scalars = {"name": name, "sign": sign, "official_verify": official_verify}
+        extra = json.loads(extra)
+        record = {}
+        for key in json.loads(fields):
+            if key == "mid":
+                record[key] = mid
+            elif key in extra:
+                record[key] = extra[key]
+            elif key in SCALAR_FIELDS:
+                record[key] = scalars[key]
+            elif key in LIST_TABLES:
+                record[key] = lists[key].get(mid, [])
+        return record
+
+    def _load_lists(self, where="", params=()):
+        lists = {}
+        for key, table in LIST_TABLES.items():
+            values = {}
+            for mid, value in self.conn.execute(
+                f"SELECT mid, value FROM {table} {where} ORDER BY mid, pos", params
+            ):
+                values.setdefault(mid, []).append(value)
+            lists[key] = values
+        return lists
+
+    def load_all(self):
+        lists = self._load_lists()
+        rows = self.conn.execute(
+            "SELECT mid, name, sign, official_verify, fields, extra FROM uploaders ORDER BY seq"
+        )
+        return [self._build(row, lists) for row in rows]
+
+    def load_models(self):
+        """读取为 model.Uploader 列表
+
+        主表和各子表都按 mid 顺序读取、逐条归并，不必先把全部列表值读进内存。
+        """
+        cursors = {
+            key: self.conn.execute(f"SELECT mid, value FROM {table} ORDER BY mid, pos")
+            for key, table in LIST_TABLES.items()
+        }
+        pending = {key: next(cursor, None) for key, cursor in cursors.items()}
+        vocabularies = model.new_vocabularies()
+        uploaders = []
+        for seq, *row in self.conn.execute(
+            "SELECT seq, mid, name, sign, official_verify, fields, extra FROM uploaders ORDER BY mid"
+        ):
+            mid = row[0]
+            lists = {}
+            for key, cursor in cursors.items():
+                values = []
+                item = pending[key]
+                while item is not None and item[0] <= mid:
+                    if item[0] == mid:
+                        values.append(item[1])
+                    item = next(cursor, None)
+                pending[key] = item
+                lists[key] = {mid: values}
+            uploaders.append((seq, model.Uploader.from_dict(self._build(row, lists), vocabularies)))
+        uploaders.sort(key=lambda item: item[0])
+        return [up for _, up in uploaders]
+
+    def save_all(self, uploaders):
+        """整体替换为给定列表，顺序即列表顺序"""
+        with self.conn:
+            self.conn.execute("DELETE FROM uploaders")
+            for table in LIST_TABLES.values():
+                self.conn.execute(f"DELETE FROM {table}")
+            for seq, record in enumerate(model.to_dicts(uploaders)):
+                self._write(record, seq)
+
+    def mids(self):
+        return {mid for (mid,) in self.conn.execute("SELECT mid FROM uploaders")}
+
+    def get(self, mid):
+        row = self.conn.execute(
+            "SELECT mid, name, sign, official_verify, fields, extra FROM uploaders WHERE mid = ?", (mid,)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._build(row, self._load_lists("WHERE mid = ?", (mid,)))
+
+    def upsert_many(self, records):
+        """按 mid 更新或追加，只写入涉及的记录（新UP主排在末尾）"""
+        with self.conn:
+            (next_seq,) = self.conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM uploaders").fetchone()
+            for record in model.to_dicts(records):
+                row = self.conn.execute("SELECT seq FROM uploaders WHERE mid = ?", (record["mid"],)).fetchone()
+                if row is None:
+                    self._write(record, next_seq)
+                    next_seq += 1
+                else:
+                    self._write(record, row[0])
+
+    def delete(self, mids):
+        with self.conn:
+            for mid in mids:
+                self.conn.execute("DELETE FROM uploaders WHERE mid = ?", (mid,))
+                for table in LIST_TABLES.values():
+                    self.conn.execute(f"DELETE FROM {table} WHERE mid = ?", (mid,))
+
+    def close(self):
+        self.conn.close()
+
+
+def get_backend():
+    """读取 config.json 中的 storage 设置，默认 json"""
+    config_path = DATA_PATH / "config.json"
+    if config_path.exists():
+        with open(config_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("storage", "json")
+    return "json"
+
+
+def data_file(backend=None):
+    """当前后端的数据文件路径"""
+    return DB_PATH if (backend or get_backend()) == "sqlite" else JSON_PATH
+
+
+def open_store(backend=None):
+    """按配置打开UP主数据存储"""
+    backend = backend or get_backend()
+    if backend == "sqlite":
+        return SqliteStore()
+    if backend == "json":
+        return JsonStore()
+    raise ValueError(f"未知的存储后端: {backend}")
+
+
+def main():
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "import":
+        uploaders = JsonStore().load_all()
+        store = SqliteStore()
+        store.save_all(uploaders)
+        store.close()
+        print(f"已导入 {len(uploaders)} 个UP主到 {DB_PATH}")
+        print('在 data/config.json 中设置 "storage": "sqlite" 即可启用')
+    elif cmd == "export":
+        store = SqliteStore()
+        uploaders = store.load_all()
+        store.close()
+        JsonStore().save_all(uploaders)
+        print(f"已导出 {len(uploaders)} 个UP主到 {JSON_PATH}")
+    else:
+        print("用法:")
+        print("  python store.py import   # up主详细数据.json -> uploaders.db")
+        print("  python store.py export   # uploaders.db -> up主详细数据.json")
+
+
+if __name__ == "__main__":
+    main()
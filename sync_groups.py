@@ -1,14 +1,19 @@
 # -*- coding: utf-8 -*-
 """
 将分类结果同步到B站关注分组
-用法: python sync_groups.py [--dry-run] [--category 分类名]
+用法: python sync_groups.py [--dry-run] [--category 分类名] [--base-url URL] [--prom-file PATH]
 
---dry-run: 只显示将要执行的操作，不实际执行
+只做必要的变更：缺少的分组新建（或把成员相近的旧分组改名复用），
+只移动所在分组与分类结果不一致的UP主，最后删除不再使用的旧分组。
+
+--dry-run: 只显示变更计划，不实际执行
 --category: 只同步指定分类（可多次使用）
+--base-url: 请求改发到指定地址，例如本地模拟接口 http://127.0.0.1:8765（见 mock_api.py）
+--prom-file: 另写一份 Prometheus 文本格式的接口统计（JSON 报告总是写入 data/reports/）
+--profile: 性能分析，结果写入 data/profiles/（见 profiling.py）
 """
 
 import json
-import asyncio
 import sys
 from pathlib import Path
 
@@ -16,6 +21,12 @@ from bilibili_api import user, Credential
 from bilibili_api.utils.utils import get_api
 from bilibili_api.utils.network import Api
 
+import http_client
+from fetch import FollowingsError, api_cache, get_all_followings
+from metrics import save_run_report
+from profiling import run_profiled, stage
+from ratelimit import limiter
+
 BASE_PATH = Path(__file__).parent
 DATA_PATH = BASE_PATH / "data"
 
@@ -44,7 +55,7 @@ async def get_existing_groups(credential):
     """获取B站已有的关注分组列表"""
     USER_API = get_api("user")
     api = USER_API["info"]["self_subscribe_group"]
-    result = await Api(**api, credential=credential).result
+    result = await limiter.call("group_list", lambda: Api(**api, credential=credential).result)
     groups = {}
     for g in result:
         groups[g["name"]] = g["tagid"]
@@ -53,7 +64,7 @@ async def get_existing_groups(credential):
 
 async def delete_group(credential, tagid):
     """删除一个关注分组"""
-    return await user.delete_subscribe_group(tagid, credential)
+    return await limiter.call("group_write", lambda: user.delete_subscribe_group(tagid, credential))
 
 
 def sanitize_group_name(name):
@@ -64,16 +75,136 @@ def sanitize_group_name(name):
 async def create_group(credential, name):
     """创建一个新的关注分组，返回 tagid"""
     safe_name = sanitize_group_name(name)
-    result = await user.create_subscribe_group(safe_name, credential)
+    result = await limiter.call("group_write", lambda: user.create_subscribe_group(safe_name, credential))
     tagid = result.get("tagid")
     if tagid is None:
         raise Exception(f"创建分组 '{name}' 失败: {result}")
     return tagid
 
 
+async def rename_group(credential, tagid, name):
+    """重命名关注分组"""
+    safe_name = sanitize_group_name(name)
+    return await limiter.call("group_write", lambda: user.rename_subscribe_group(tagid, safe_name, credential))
+
+
 async def move_users_to_group(credential, uids, group_id):
     """将用户移入指定分组（批量）"""
-    return await user.set_subscribe_group(uids, [group_id], credential)
+    return await limiter.call("group_move", lambda: user.set_subscribe_group(uids, [group_id], credential))
+
+
+# 特别关注、默认分组，不参与同步
+KEEP_TAGIDS = {-10, 0}
+
+# 每次移动的人数
+MOVE_BATCH = 20
+
+
+async def assign_groups(credential, categories):
+    """只把这些UP主移入各自分类的分组（缺少的分组新建），不动其他UP主和分组
+
+    categories: {分类名: [mid, ...]}。守护进程处理新关注时使用，不需要读取整个关注列表。
+    返回移动失败的 mid 列表。
+    """
+    groups = await get_existing_groups(credential)
+    failed = []
+    for cat, mids in categories.items():
+        tagid = groups.get(sanitize_group_name(cat))
+        if tagid is None:
+            try:
+                tagid = groups[sanitize_group_name(cat)] = await create_group(credential, cat)
+            except Exception as e:
+                print(f"  ✗ 创建分组失败: {cat} - {e}")
+                failed.extend(mids)
+                continue
+        for i in range(0, len(mids), MOVE_BATCH):
+            batch = mids[i:i + MOVE_BATCH]
+            try:
+                await move_users_to_group(credential, batch, tagid)
+            except Exception as e:
+                print(f"  ✗ 移入分组 {cat} 失败: {e}")
+                failed.extend(batch)
+    return failed
+
+
+def plan_sync(categories, all_categories, existing_groups, current_tags, delete_obsolete=True):
+    """对比现有分组与分类结果，生成最小变更计划
+
+    categories:      本次要同步的 {分类名: [UP主, ...]}
+    all_categories:  分类结果中的全部分类名（判断哪些旧分组已不再使用）
+    existing_groups: B站现有 {分组名: tagid}
+    current_tags:    已关注UP主当前所在分组 {mid: {tagid, ...}}
+
+    返回 {"create": [分类], "rename": [(tagid, 旧名, 分类)], "delete": [(分组名, tagid)],
+          "move": {分类: [UP主]}, "unfollowed": [UP主], "groups": {分类: 已有分组的tagid}}
+    """
+    custom = {name: tagid for name, tagid in existing_groups.items() if tagid not in KEEP_TAGIDS}
+    wanted = {sanitize_group_name(cat) for cat in all_categories}
+    obsolete = {name: tagid for name, tagid in custom.items() if name not in wanted}
+
+    group_map = {}  # {分类名: tagid}，新建的分组执行时才有 tagid
+    plan = {"create": [], "rename": [], "delete": [], "move": {}, "unfollowed": [], "groups": group_map}
+    missing = []
+    for cat in categories:
+        safe_name = sanitize_group_name(cat)
+        if safe_name in custom:
+            group_map[cat] = custom[safe_name]
+        else:
+            missing.append(cat)
+
+    # 没有同名分组的分类，优先把成员重合最多的废弃分组改名复用，省去逐个移动：
+    # 列出全部 (重合人数, 分类, 废弃分组)，按重合人数从多到少配对，每个分类、分组只用一次
+    pairs = []
+    for i, cat in enumerate(missing):
+        members = {up["mid"] for up in categories[cat]}
+        for j, (name, tagid) in enumerate(obsolete.items()):
+            overlap = sum(1 for mid in members if tagid in current_tags.get(mid, ()))
+            if overlap:
+                pairs.append((-overlap, i, j, cat, name))
+    renamed = {}
+    for _, _, _, cat, name in sorted(pairs):
+        if cat not in renamed and name in obsolete:
+            renamed[cat] = (obsolete.pop(name), name)
+    for cat in missing:
+        if cat in renamed:
+            tagid, name = renamed[cat]
+            plan["rename"].append((tagid, name, cat))
+            group_map[cat] = tagid
+        else:
+            plan["create"].append(cat)
+
+    for cat, ups in categories.items():
+        tagid = group_map.get(cat)
+        for up in ups:
+            if up["mid"] not in current_tags:
+                plan["unfollowed"].append(up)
+                continue
+            current = set(current_tags[up["mid"]]) - KEEP_TAGIDS
+            if tagid is None or current != {tagid}:
+                plan["move"].setdefault(cat, []).append(up)
+
+    if delete_obsolete:
+        plan["delete"] = list(obsolete.items())
+    return plan
+
+
+def print_plan(plan, existing_groups, current_tags):
+    names = {tagid: name for name, tagid in existing_groups.items()}
+    for cat in plan["create"]:
+        print(f"  + 新建分组: {cat}")
+    for tagid, old_name, cat in plan["rename"]:
+        print(f"  ~ 重命名分组: {old_name} → {sanitize_group_name(cat)} (tagid={tagid})")
+    for cat, ups in plan["move"].items():
+        print(f"  → {cat}: 移入 {len(ups)} 人")
+        for up in ups[:10]:
+            old = [names.get(t, str(t)) for t in current_tags.get(up["mid"], ()) if t not in KEEP_TAGIDS]
+            print(f"      {up['name']} ({', '.join(old) or '默认分组'} → {cat})")
+        if len(ups) > 10:
+            print(f"      ...等{len(ups)}人")
+    for name, tagid in plan["delete"]:
+        print(f"  - 删除不再使用的分组: {name} (tagid={tagid})")
+    if plan["unfollowed"]:
+        print(f"  ! {len(plan['unfollowed'])} 人已不在关注列表中，跳过")
 
 
 async def sync(dry_run=False, only_categories=None):
@@ -81,6 +212,7 @@ async def sync(dry_run=False, only_categories=None):
     credential = get_credential(config)
     classify_data = load_classify_result()
     categories = classify_data["categories"]
+    all_categories = list(categories)
 
     # 筛选要同步的分类
     if only_categories:
@@ -96,86 +228,84 @@ async def sync(dry_run=False, only_categories=None):
         print("【试运行模式】不会实际执行任何操作")
     print()
 
-    # 1. 获取已有分组
-    print("第1步：获取已有分组...")
-    existing_groups = await get_existing_groups(credential)
+    # 1. 获取已有分组和当前分组归属
+    print("第1步：获取已有分组和关注列表...")
+    with stage("读取分组"):
+        existing_groups = await get_existing_groups(credential)
     print(f"已有 {len(existing_groups)} 个分组:")
     for name, tagid in existing_groups.items():
         print(f"  [{tagid}] {name}")
+    try:
+        with stage("关注列表"):
+            followings = await get_all_followings(credential, config["bilibili"]["dedeuserid"], fresh=True)
+    except FollowingsError as e:
+        print(f"关注列表获取失败，无法确定当前分组: {e}")
+        return
+    current_tags = {f["mid"]: set(f.get("tag") or []) for f in followings}
     print()
 
-    # 2. 删除旧分组（保留"特别关注"和"默认分组"）
-    KEEP_TAGIDS = {-10, 0}  # 特别关注、默认分组
-    to_delete = {name: tagid for name, tagid in existing_groups.items()
-                 if tagid not in KEEP_TAGIDS}
-
-    if to_delete:
-        print(f"第2步：删除 {len(to_delete)} 个旧分组...")
-        if not dry_run:
-            for name, tagid in to_delete.items():
-                try:
-                    await delete_group(credential, tagid)
-                    print(f"  ✓ 删除: {name} (tagid={tagid})")
-                    await asyncio.sleep(0.3)
-                except Exception as e:
-                    print(f"  ✗ 删除失败: {name} - {e}")
-        else:
-            for name, tagid in to_delete.items():
-                print(f"  [试运行] 将删除: {name} (tagid={tagid})")
-    else:
-        print("第2步：没有需要删除的旧分组")
+    # 2. 计算差异（只同步部分分类时不删除旧分组）
+    with stage("计算差异"):
+        plan = plan_sync(categories, all_categories, existing_groups, current_tags,
+                         delete_obsolete=not only_categories)
+    move_count = sum(len(ups) for ups in plan["move"].values())
+    print(f"第2步：变更计划 —— 新建 {len(plan['create'])} 个、重命名 {len(plan['rename'])} 个、"
+          f"删除 {len(plan['delete'])} 个分组，移动 {move_count} 人")
+    print_plan(plan, existing_groups, current_tags)
     print()
 
-    # 3. 创建新分组
-    print(f"第3步：创建 {len(categories)} 个新分组...")
-    group_map = {}  # {分类名: tagid}
-    if not dry_run:
-        for name in categories:
-            try:
-                tagid = await create_group(credential, name)
-                group_map[name] = tagid
-                print(f"  ✓ 创建: {name} (tagid={tagid})")
-                await asyncio.sleep(0.3)
-            except Exception as e:
-                print(f"  ✗ 创建失败: {name} - {e}")
-                return
-    else:
-        for name in categories:
-            print(f"  [试运行] 将创建: {name}")
-            group_map[name] = -1
+    if dry_run:
+        print("=== 试运行完毕，未执行任何实际操作 ===")
+        return
+    if not any([plan["create"], plan["rename"], plan["delete"], plan["move"]]):
+        print("=== 分组已是最新，无需同步 ===")
+        return
+
+    # 3. 新建、重命名分组
+    print("第3步：调整分组...")
+    group_map = plan["groups"]
+    for tagid, old_name, cat in plan["rename"]:
+        try:
+            with stage("调整分组"):
+                await rename_group(credential, tagid, cat)
+            print(f"  ✓ 重命名: {old_name} → {sanitize_group_name(cat)}")
+        except Exception as e:
+            print(f"  ✗ 重命名失败: {old_name} - {e}")
+            return
+    for cat in plan["create"]:
+        try:
+            with stage("调整分组"):
+                tagid = await create_group(credential, cat)
+            group_map[cat] = tagid
+            print(f"  ✓ 创建: {cat} (tagid={tagid})")
+        except Exception as e:
+            print(f"  ✗ 创建失败: {cat} - {e}")
+            return
     print()
 
-    # 4. 将UP主移入对应分组
-    print("第4步：分配UP主到分组...\n")
+    # 4. 只移动分组不对的UP主
+    print("第4步：移动UP主...\n")
     success_count = 0
     fail_count = 0
-    batch_size = 20
-
-    for cat_name, ups in categories.items():
-        tagid = group_map.get(cat_name)
-        if tagid is None:
-            print(f"跳过 {cat_name}: 分组不存在")
-            continue
+    batch_size = MOVE_BATCH
 
+    for cat_name, ups in plan["move"].items():
+        tagid = group_map[cat_name]
         uids = [up["mid"] for up in ups]
         print(f"[{cat_name}] {len(uids)} 人 → tagid={tagid}")
 
-        if dry_run:
-            print(f"  [试运行] {len(uids)} 人将被移入此分组")
-            continue
-
         # 分批处理
         for i in range(0, len(uids), batch_size):
             batch = uids[i:i + batch_size]
             batch_names = [up["name"] for up in ups[i:i + batch_size]]
             try:
-                await move_users_to_group(credential, batch, tagid)
+                with stage("移动UP主"):
+                    await move_users_to_group(credential, batch, tagid)
                 success_count += len(batch)
                 names_str = ', '.join(batch_names[:5])
                 if len(batch_names) > 5:
                     names_str += f"...等{len(batch_names)}人"
-                print(f"  ✓ 批{i // batch_size + 1} ({len(batch)}人): {names_str}")
-                await asyncio.sleep(1)
+                print(f"  ✓ 批{i // batch_size + 1} ({len(batch)}人): {names_str} {limiter.status()}")
             except Exception as e:
                 fail_count += len(batch)
                 print(f"  ✗ 批{i // batch_size + 1}失败: {e}")
@@ -185,19 +315,25 @@ async def sync(dry_run=False, only_categories=None):
                         await move_users_to_group(credential, [uid], tagid)
                         success_count += 1
                         fail_count -= 1
-                        await asyncio.sleep(0.5)
                     except Exception as e2:
                         print(f"    ✗ {batch_names[j]}: {e2}")
-                        await asyncio.sleep(1)
 
-    # 5. 总结
+    # 5. 最后删除不再使用的分组，同步过程中账号始终保留原有分组
+    if plan["delete"]:
+        print(f"\n第5步：删除 {len(plan['delete'])} 个不再使用的分组...")
+        for name, tagid in plan["delete"]:
+            try:
+                with stage("删除分组"):
+                    await delete_group(credential, tagid)
+                print(f"  ✓ 删除: {name} (tagid={tagid})")
+            except Exception as e:
+                print(f"  ✗ 删除失败: {name} - {e}")
+
+    # 6. 总结
     print(f"\n=== 同步完成 ===")
-    if not dry_run:
-        print(f"成功: {success_count} 人")
-        if fail_count > 0:
-            print(f"失败: {fail_count} 人")
-    else:
-        print("试运行完毕，未执行任何实际操作")
+    print(f"移动成功: {success_count} 人")
+    if fail_count > 0:
+        print(f"失败: {fail_count} 人")
 
 
 def main():
@@ -205,15 +341,29 @@ def main():
     only_categories = []
     args = sys.argv[1:]
     i = 0
+    base_url = None
+    prom_file = None
     while i < len(args):
         if args[i] == "--category" and i + 1 < len(args):
             only_categories.append(args[i + 1])
             i += 2
+        elif args[i] == "--base-url" and i + 1 < len(args):
+            base_url = args[i + 1]
+            i += 2
+        elif args[i] == "--prom-file" and i + 1 < len(args):
+            prom_file = args[i + 1]
+            i += 2
         else:
             i += 1
 
-    asyncio.run(sync(dry_run=dry_run, only_categories=only_categories or None))
+    http_client.configure(base_url=base_url)
+    if base_url:
+        # 发往模拟接口等非B站服务时，不能写入真实的接口缓存
+        api_cache.set_mode("off")
+
+    http_client.run(sync(dry_run=dry_run, only_categories=only_categories or None))
+    save_run_report("sync", " ".join(args), extra={"limiter": limiter.snapshot()}, prometheus_path=prom_file)
 
 
 if __name__ == "__main__":
-    main()
+    run_profiled("sync_groups", main)
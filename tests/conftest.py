@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+测试公用的夹具：进程内模拟接口（mock_api.MockBilibili）和临时数据目录
+运行: pip install -r requirements-dev.txt && python -m pytest -q
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import fetch
+import http_client
+import ratelimit
+import sync_groups
+from helpers import data_dir, make_limiter
+from mock_api import MockBilibili, MockTransport
+
+
+@pytest.fixture
+def data(tmp_path):
+    """各模块的数据路径指向 tmp_path（JSON 存储）"""
+    with data_dir(tmp_path):
+        yield tmp_path
+
+
+@pytest.fixture
+def mock_api(data, monkeypatch):
+    """在 data 的基础上，接口请求交给模拟接口，不使用接口缓存"""
+    api = MockBilibili(uploaders=30)
+    # 风控暂停和重试间隔缩短到毫秒级，测试不必等待
+    monkeypatch.setattr(ratelimit, "COOLDOWN", 0.01)
+    monkeypatch.setattr(ratelimit, "MAX_COOLDOWN", 0.05)
+    monkeypatch.setattr(ratelimit, "RETRY_DELAY", 0.001)
+    limiter = make_limiter()
+    monkeypatch.setattr(fetch, "limiter", limiter)
+    monkeypatch.setattr(sync_groups, "limiter", limiter)
+    monkeypatch.setattr(fetch, "tag_collector", fetch.TagCollector())
+    monkeypatch.setattr(fetch.api_cache, "mode", "off")
+    monkeypatch.setattr(fetch, "DATA_PATH", data)
+    monkeypatch.setattr(fetch, "FETCH_JOURNAL_PATH", data / "采集日志.jsonl")
+    monkeypatch.setattr(fetch, "REFRESH_JOURNAL_PATH", data / "刷新日志.jsonl")
+    monkeypatch.setattr(fetch, "ZONES_JOURNAL_PATH", data / "分区补充日志.jsonl")
+    monkeypatch.setattr(sync_groups, "DATA_PATH", data)
+    http_client.use_transport(lambda: MockTransport(api))
+    yield api
+    http_client.configure()
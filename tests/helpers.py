@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""测试用的辅助函数：临时数据目录、模拟账号、放宽的限速器"""
+
+import contextlib
+import json
+from pathlib import Path
+
+import add_new
+import classify
+import generate_info
+import ratelimit
+import store
+
+
+@contextlib.contextmanager
+def data_dir(path, backend="json"):
+    """把各模块读写的数据路径临时指向 path"""
+    path = Path(path)
+    targets = [
+        (store, "DATA_PATH", path),
+        (store, "JSON_PATH", path / "up主详细数据.json"),
+        (store, "DB_PATH", path / "uploaders.db"),
+        (classify, "data_path", path),
+        (classify, "rules_path", path / "classify_rules.json"),
+        (add_new, "DATA_PATH", path),
+        (generate_info, "OUTPUT_PATH", path / "up主信息汇总.txt"),
+    ]
+    saved = [(module, name, getattr(module, name)) for module, name, _ in targets]
+    for module, name, value in targets:
+        setattr(module, name, value)
+    try:
+        write_config(path, backend=backend)
+        yield path
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+
+
+def account(i):
+    """模拟接口的第 i 个账号（SESSDATA 为 mock{i}）"""
+    return {"sessdata": f"mock{i}", "bili_jct": "mock", "buvid3": "mock", "dedeuserid": "1"}
+
+
+def write_config(path, fetch_accounts=0, backend="json"):
+    """主账号 mock0，另有 fetch_accounts 个采集账号 mock1、mock2…"""
+    config = {"storage": backend, "bilibili": account(0),
+              "fetch_accounts": [account(i) for i in range(1, fetch_accounts + 1)]}
+    with open(Path(path) / "config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+
+
+def make_limiter(scale=100):
+    """各接口的速率放大 scale 倍的限速器，测试不受真实限速拖慢"""
+    rate, max_rate = ratelimit.GLOBAL_BUDGET
+    return ratelimit.RateLimiter({
+        name: (r * scale, m * scale) for name, (r, m) in ratelimit.BUDGETS.items()
+    }, (rate * scale, max_rate * scale))
+
+
+# ---------- 合成的分类规则和UP主数据 ----------
+
+CATEGORIES = ["电气/电子/自动化", "校园生活/校园日常", "游戏", "音乐", "知识", "生活"]
+WORDS = ["单片机", "电路", "机器人", "考研", "学长", "宿舍", "原神", "攻略", "实况", "翻唱", "钢琴",
+         "吉他", "科普", "历史", "数学", "vlog", "探店", "日常", "开箱", "C++", "ABC", "abc"]
+ZONES = ["科技", "数码", "单机游戏", "手机游戏", "翻唱", "演奏", "科学科普", "校园学习", "日常", "美食"]
+
+
+def make_rules(rng, fractional=False):
+    """每个分类几个关键词（可能重复出现在多个分类），fractional=True 时混入小数权重"""
+    weight = (lambda: rng.choice([0.5, 1.25, 2, 3.5])) if fractional else (lambda: rng.randint(1, 10))
+    return {
+        "categories": list(CATEGORIES),
+        "default_category": "生活",
+        "manual": {"手动指定的UP": "音乐"},
+        "keyword_rules": {cat: [[kw, weight()] for kw in rng.sample(WORDS, 5)] for cat in CATEGORIES},
+        "zone_mapping": {cat: rng.sample(ZONES, 2) for cat in CATEGORIES},
+    }
+
+
+def make_uploaders(rng, count):
+    """各种字段组合的UP主记录：有无分区视频数、特殊规则命中、手动指定、缺字段"""
+    names = ["普通UP", "机器人战队", "某某大学", "招聘小助手", "手动指定的UP", "半导体科普"]
+    uploaders = []
+    for i in range(count):
+        up = {"mid": 1000 + i, "name": f"{rng.choice(names)}{i}" if i % 7 else "手动指定的UP"}
+        if rng.random() < 0.8:
+            up["sign"] = " ".join(rng.sample(WORDS, 3))
+        up["official_verify"] = rng.choice(["", "", "某某大学官方账号", "知名UP主"])
+        up["channels"] = [rng.choice(WORDS) + "合集" for _ in range(rng.randint(0, 2))]
+        up["video_titles"] = ["".join(rng.sample(WORDS, 3)) for _ in range(rng.randint(0, 8))]
+        up["tags"] = rng.sample(WORDS, rng.randint(0, 4))
+        zones = rng.sample(ZONES, rng.randint(0, 3))
+        up["video_zones"] = zones
+        if zones and rng.random() < 0.7:
+            up["video_zone_counts"] = {zone: rng.randint(0, 9) for zone in zones}
+        uploaders.append(up)
+    return uploaders
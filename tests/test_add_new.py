@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import random
+
+import add_new
+import generate_info
+import http_client
+from helpers import make_uploaders
+from store import JsonStore
+
+
+def test_summary_is_the_same_from_add_new_and_generate_info(data, capsys):
+    uploaders = make_uploaders(random.Random(21), 40)
+    uploaders[0]["articles"] = [f"专栏{i}" for i in range(35)]
+    uploaders[1]["note"] = "备注"
+    JsonStore().save_all(uploaders)
+
+    generate_info.main()
+    full = generate_info.OUTPUT_PATH.read_text(encoding="utf-8")
+    generate_info.OUTPUT_PATH.unlink()
+    add_new.generate_info()
+    assert generate_info.OUTPUT_PATH.read_text(encoding="utf-8") == full
+    assert "    ...还有5篇" in full and "【备注】: 备注" in full
+
+
+def test_new_flag_is_recognized_anywhere(data, monkeypatch, capsys):
+    calls = []
+
+    async def no_new_follows():
+        calls.append(1)
+        return {}
+
+    monkeypatch.setattr(add_new, "find_new_follows", no_new_follows)
+    for argv in (["add_new.py", "--new"], ["add_new.py", "--profile", "--new"]):
+        monkeypatch.setattr("sys.argv", argv)
+        http_client.run(add_new.main())
+    assert len(calls) == 2
+    assert capsys.readouterr().out.count("没有新关注的UP主") == 2
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+import api_cache
+import fetch
+import http_client
+from api_cache import ApiCache, CacheMiss
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(api_cache.time, "time", clock)
+    return clock
+
+
+def fetch_with(cache, endpoint, params, value, fresh=False):
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        return value
+
+    result = asyncio.run(cache.fetch(endpoint, params, factory, fresh=fresh))
+    return result, len(calls)
+
+
+def test_entries_expire_after_their_endpoint_ttl(tmp_path, clock):
+    cache = ApiCache(tmp_path / "cache.db")
+    assert fetch_with(cache, "followings", {"pn": 1}, "旧") == ("旧", 1)
+    clock.now += api_cache.TTLS["followings"] - 1
+    assert fetch_with(cache, "followings", {"pn": 1}, "新") == ("旧", 0)
+    clock.now += 2
+    assert fetch_with(cache, "followings", {"pn": 1}, "新") == ("新", 1)
+    # 参数不同是不同的条目；永久有效的接口不过期
+    assert fetch_with(cache, "followings", {"pn": 2}, "第二页") == ("第二页", 1)
+    fetch_with(cache, "video_tags", {"bvid": "BV1"}, ["标签"])
+    clock.now += 10 ** 9
+    assert fetch_with(cache, "video_tags", {"bvid": "BV1"}, None) == (["标签"], 0)
+    assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_fresh_skips_the_read_but_updates_the_entry(tmp_path, clock):
+    cache = ApiCache(tmp_path / "cache.db")
+    fetch_with(cache, "user_info", {"mid": 1}, "旧")
+    assert fetch_with(cache, "user_info", {"mid": 1}, "新", fresh=True) == ("新", 1)
+    assert fetch_with(cache, "user_info", {"mid": 1}, "更新") == ("新", 0)
+
+
+def test_only_mode_ignores_ttl_and_never_requests(tmp_path, clock):
+    cache = ApiCache(tmp_path / "cache.db")
+    fetch_with(cache, "followings", {"pn": 1}, "缓存")
+    clock.now += 10 ** 9
+    cache.set_mode("only")
+    assert fetch_with(cache, "followings", {"pn": 1}, "网络", fresh=True) == ("缓存", 0)
+    with pytest.raises(CacheMiss):
+        fetch_with(cache, "followings", {"pn": 2}, "网络")
+
+
+def test_off_mode_neither_reads_nor_writes(tmp_path, clock):
+    cache = ApiCache(tmp_path / "cache.db", mode="off")
+    assert fetch_with(cache, "followings", {"pn": 1}, "一") == ("一", 1)
+    assert fetch_with(cache, "followings", {"pn": 1}, "二") == ("二", 1)
+    cache.set_mode("on")
+    assert cache.get("followings", {"pn": 1}) is None
+    with pytest.raises(ValueError):
+        cache.set_mode("sometimes")
+
+
+def test_purge_expired_keeps_permanent_and_live_entries(tmp_path, clock):
+    cache = ApiCache(tmp_path / "cache.db")
+    cache.put("followings", {"pn": 1}, 1)
+    cache.put("video_tags", {"bvid": "BV1"}, 2)
+    clock.now += api_cache.TTLS["followings"] + 1
+    cache.put("user_info", {"mid": 1}, 3)
+    assert cache.purge_expired() == 1
+    assert cache.get("video_tags", {"bvid": "BV1"}) == 2
+    assert cache.get("user_info", {"mid": 1}) == 3
+
+
+def test_fetch_all_requests_a_fresh_followings_list(mock_api, data, monkeypatch):
+    monkeypatch.setattr(fetch, "api_cache", ApiCache(data / "api_cache.db"))
+    http_client.run(fetch.get_all_followings(fetch.get_credential(fetch.load_config()), 1))
+    # 关注列表已在缓存中（一小时内有效），之后新关注的UP主也要被采集
+    mock_api.follow([900000001])
+    http_client.run(fetch.fetch_all(concurrency=4))
+    assert 900000001 in {up["mid"] for up in fetch.load_data()}
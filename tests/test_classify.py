@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+import classify
+from helpers import make_rules, make_uploaders
+from store import JsonStore
+
+
+@pytest.fixture
+def classifier():
+    return classify.Classifier(make_rules(random.Random(11)))
+
+
+def test_workers_give_the_same_results_as_classify(classifier):
+    uploaders = make_uploaders(random.Random(12), 300)
+    expected = [classifier.classify(up) for up in uploaders]
+    assert classifier.classify_many(uploaders) == expected
+    assert classifier.classify_many(uploaders, workers=3) == expected
+
+
+def test_workers_accept_compact_models(classifier, tmp_path):
+    # 多进程时 model.Uploader 按 JSON 记录传给工作进程
+    uploaders = make_uploaders(random.Random(13), 100)
+    JsonStore(tmp_path / "data.json").save_all(uploaders)
+    models = JsonStore(tmp_path / "data.json").load_models()
+    assert classifier.classify_many(models, workers=2) == [classifier.classify(up) for up in uploaders]
+
+
+def test_manual_special_and_default_rules(classifier):
+    assert classifier.classify({"name": "手动指定的UP"}) == ("音乐", "手动指定")
+    assert classifier.classify({"name": "无特征"}) == ("生活", "无明确特征，默认归类")
+    assert classifier.classify({"name": "某机器人战队"})[0] == "电气/电子/自动化"
+    assert classifier.classify({"name": "x", "official_verify": "某某大学官方账号"})[0] == "校园生活/校园日常"
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import fetch
+import http_client
+from helpers import write_config
+
+
+def test_fetch_all_bounds_concurrency_and_keeps_following_order(mock_api, monkeypatch):
+    running, peak = 0, 0
+    original = fetch.fetch_following
+
+    async def counted(credential, up):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        try:
+            await asyncio.sleep(0.001)
+            return await original(credential, up)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(fetch, "fetch_following", counted)
+    http_client.run(fetch.fetch_all(concurrency=4))
+    assert peak == 4
+    # 输出顺序与关注列表一致（关注列表从新到旧，即模拟接口 mids 的顺序）
+    assert [up["mid"] for up in fetch.load_data()] == mock_api.mids
+    assert not fetch.FETCH_JOURNAL_PATH.exists()
+
+
+def test_banned_credential_hands_its_uploaders_over(mock_api, data):
+    write_config(data, fetch_accounts=2)
+    mock_api.banned.add("mock1")
+    shards = http_client.run(fetch.fetch_all(concurrency=2))
+    assert sorted(up["mid"] for up in fetch.load_data()) == sorted(mock_api.mids)
+    assert [shard.limiter.banned for shard in shards] == [False, True, False]
+    assert not fetch.FETCH_JOURNAL_PATH.exists()
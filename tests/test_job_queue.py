@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+import job_queue
+from job_queue import CLASSIFIED, DONE, FAILED, PENDING, JobQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(job_queue.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = JobQueue(tmp_path / "任务队列.db")
+    yield queue
+    queue.close()
+
+
+def entries(*mids):
+    return [{"mid": mid, "uname": f"UP{mid}"} for mid in mids]
+
+
+def test_jobs_advance_in_insertion_order(queue, clock):
+    assert queue.add(entries(3, 1, 2)) == 3
+    clock.now += 1
+    assert queue.add(entries(2, 4)) == 1
+    assert queue.mids() == {1, 2, 3, 4}
+    assert [mid for mid, _, _ in queue.take(PENDING, 10)] == [3, 1, 2, 4]
+    assert queue.take(PENDING, 2) == [(3, {"mid": 3, "uname": "UP3"}, None), (1, {"mid": 1, "uname": "UP1"}, None)]
+
+    queue.advance([3, 1], CLASSIFIED, {3: "游戏", 1: "音乐"})
+    assert queue.take(CLASSIFIED, 10) == [(3, entries(3)[0], "游戏"), (1, entries(1)[0], "音乐")]
+    queue.advance([3], DONE)
+    assert queue.counts() == {PENDING: 2, CLASSIFIED: 1, DONE: 1}
+    # 分类不因推进状态而丢失
+    assert queue.conn.execute("SELECT category FROM jobs WHERE mid = 3").fetchone() == ("游戏",)
+
+
+def test_failures_back_off_then_give_up(queue, clock):
+    queue.add(entries(1, 2))
+    delays = []
+    for attempt in range(job_queue.MAX_ATTEMPTS - 1):
+        queue.fail([1], "超时")
+        assert [mid for mid, _, _ in queue.take(PENDING, 10)] == [2]
+        next_try = queue.conn.execute("SELECT next_try FROM jobs WHERE mid = 1").fetchone()[0]
+        delays.append(next_try - clock.now)
+        clock.now = next_try
+        assert [mid for mid, _, _ in queue.take(PENDING, 10)] == [1, 2]
+    assert delays == [job_queue.RETRY_DELAY * 2 ** i for i in range(job_queue.MAX_ATTEMPTS - 1)]
+
+    queue.fail([1, 99], "超时")
+    assert queue.counts() == {PENDING: 1, FAILED: 1}
+    assert queue.retry_failed() == 1
+    assert [mid for mid, _, _ in queue.take(PENDING, 10)] == [1, 2]
+    assert queue.conn.execute("SELECT attempts, error FROM jobs WHERE mid = 1").fetchone() == (0, None)
+
+
+def test_queue_survives_a_restart(tmp_path, clock):
+    queue = JobQueue(tmp_path / "任务队列.db")
+    queue.add(entries(1, 2, 3))
+    queue.advance([1], CLASSIFIED, {1: "知识"})
+    queue.advance([2], DONE, {2: "生活"})
+    queue.close()
+
+    reopened = JobQueue(tmp_path / "任务队列.db")
+    assert reopened.counts() == {PENDING: 1, CLASSIFIED: 1, DONE: 1}
+    assert reopened.take(CLASSIFIED, 10) == [(1, entries(1)[0], "知识")]
+    assert reopened.add(entries(1, 2, 3)) == 0
+    reopened.close()
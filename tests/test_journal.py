@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import json
+
+import fetch
+import http_client
+from journal import Journal
+from store import JsonStore
+
+
+def test_torn_last_line_is_ignored_and_not_glued_to_new_records(tmp_path):
+    path = tmp_path / "采集日志.jsonl"
+    with Journal(path).open(reset=True) as journal:
+        journal.append({"mid": 1, "name": "一"})
+        journal.append({"mid": 2, "name": "二"})
+    # 模拟写到一半时崩溃：末行不完整，也没有换行
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"mid": 3, "na')
+
+    journal = Journal(path)
+    assert set(journal.load()) == {1, 2}
+
+    with journal.open():
+        journal.append({"mid": 3, "name": "三"})
+    records = Journal(path).load()
+    assert set(records) == {1, 2, 3}
+    assert records[3]["name"] == "三"
+
+
+def test_later_lines_update_earlier_ones(tmp_path):
+    with Journal(tmp_path / "j.jsonl").open(reset=True) as journal:
+        journal.append({"mid": 1, "name": "旧", "tags": ["a"]})
+        journal.append({"mid": 1, "name": "新"})
+    assert Journal(tmp_path / "j.jsonl").load() == {1: {"mid": 1, "name": "新", "tags": ["a"]}}
+
+
+def test_resume_skips_uploaders_already_in_the_journal(mock_api):
+    done = mock_api.mids[:10]
+    with Journal(fetch.FETCH_JOURNAL_PATH).open(reset=True) as journal:
+        for mid in done:
+            journal.append({"mid": mid, "name": f"日志中的{mid}"})
+
+    # 有未完成的日志时，不加 --resume 不会开始
+    http_client.run(fetch.fetch_all())
+    assert not fetch.load_data()
+
+    before = mock_api.requests["/x/space/wbi/arc/search"]
+    http_client.run(fetch.fetch_all(concurrency=4, resume=True))
+    assert mock_api.requests["/x/space/wbi/arc/search"] - before == len(mock_api.mids) - len(done)
+    uploaders = fetch.load_data()
+    assert [up["mid"] for up in uploaders] == mock_api.mids
+    assert uploaders[0]["name"] == f"日志中的{done[0]}"
+    assert not fetch.FETCH_JOURNAL_PATH.exists()
+
+
+def test_json_store_save_is_atomic(tmp_path, monkeypatch):
+    path = tmp_path / "up主详细数据.json"
+    store = JsonStore(path)
+    store.save_all([{"mid": 1, "name": "一"}])
+
+    # 写入中途出错时原文件保持完整
+    def broken_dump(*args, **kwargs):
+        raise OSError("磁盘已满")
+
+    monkeypatch.setattr(json, "dump", broken_dump)
+    try:
+        store.save_all([{"mid": 2, "name": "二"}])
+    except OSError:
+        pass
+    monkeypatch.undo()
+    assert store.load_all() == [{"mid": 1, "name": "一"}]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+import random
+import re
+
+from matcher import KeywordMatcher
+
+
+def findall_counts(keywords, text):
+    counts = {}
+    for keyword in dict.fromkeys(keywords):
+        n = len(re.findall(re.escape(keyword), text))
+        if n:
+            counts[keyword] = n
+    return counts
+
+
+def test_count_matches_findall_on_overlapping_keywords():
+    # 小字母表上的随机文本，关键词互为前后缀、彼此重叠
+    rng = random.Random(7)
+    keywords = ["a", "aa", "aba", "bab", "abab", "b", "ba", "c", "aac", "机器", "机器人", "器人"]
+    matcher = KeywordMatcher(keywords)
+    for _ in range(500):
+        text = "".join(rng.choice("abc机器人") for _ in range(rng.randint(0, 40)))
+        assert matcher.count(text) == findall_counts(keywords, text), text
+
+
+def test_count_handles_regex_metacharacters_and_duplicates():
+    keywords = ["c++", "c++", ".net", "a.b", "(ai)"]
+    text = "c++ c+++ .net a.b axb (ai)(ai)"
+    assert KeywordMatcher(keywords).count(text) == findall_counts(keywords, text)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import fetch
+import http_client
+import metrics
+import ratelimit
+from helpers import account
+from metrics import LatencyHistogram, Metrics
+
+
+def test_response_bytes_come_from_the_http_responses(mock_api, monkeypatch):
+    stats = Metrics()
+    monkeypatch.setattr(ratelimit, "metrics", stats)
+    received = []
+    handle = mock_api.handle
+
+    def recording(request):
+        response = handle(request)
+        received.append((request.url.path, len(response.content)))
+        return response
+
+    monkeypatch.setattr(mock_api, "handle", recording)
+    credential = fetch.make_credential(account(0))
+    http_client.run(fetch.get_all_followings(credential, 1, fresh=True))
+    stats = stats.endpoint("followings")
+    # 这次调用中的全部响应（包括 bilibili_api 顺带发出的准备请求）都计入该接口
+    assert stats.calls == 1
+    assert "/x/relation/followings" in dict(received)
+    assert stats.bytes == sum(size for _, size in received)
+
+
+def test_bytes_are_counted_only_inside_a_call():
+    metrics.count_response(100)           # 不在接口调用中：忽略
+    counter = metrics.start_counting()
+    metrics.count_response(10)
+    metrics.count_response(5)
+    assert counter == [15]
+
+
+def test_latency_histogram_is_bounded_and_estimates_percentiles():
+    histogram = LatencyHistogram()
+    for i in range(1, 10001):
+        histogram.add(i / 10000)          # 0.0001 ~ 1 秒均匀分布
+    assert histogram.count == 10000 and histogram.max == 1.0
+    assert len(histogram.buckets) < 100
+    assert abs(histogram.percentile(50) - 0.5) < 0.05
+    assert abs(histogram.percentile(99) - 0.99) < 0.1
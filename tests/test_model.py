@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+import pickle
+import random
+
+import pytest
+
+import model
+import store
+from helpers import make_uploaders
+from model import Uploader
+
+
+def records():
+    return make_uploaders(random.Random(71), 40) + [
+        {"mid": 1, "name": "嵌套", "owner": {"mid": 2, "name": "对象字段"}, "tags": ["a", "b"]},
+        {"name": "顺序", "mid": 3, "video_titles": ["含\x1f分隔符", ""], "channels": []},
+        {"mid": 4, "video_zones": ["科技"], "video_zone_counts": {"科技": -1}, "sign": None},
+    ]
+
+
+def test_uploader_reads_like_the_record():
+    record = {"mid": 5, "name": "五", "tags": ["x"], "video_zones": ["科技", "数码"],
+              "video_zone_counts": {"科技": 2, "数码": 0}, "unknown": [1, 2]}
+    up = Uploader.from_dict(record)
+    assert up["tags"] == ["x"] and up.get("video_zone_counts") == {"科技": 2, "数码": 0}
+    assert up["unknown"] == [1, 2]
+    assert "sign" not in up and up.get("sign", "无") == "无"
+    with pytest.raises(KeyError):
+        up["sign"]
+    assert up.to_dict() == record and list(up.to_dict()) == list(record)
+
+
+def test_load_json_round_trips_and_keeps_nested_objects(tmp_path):
+    path = tmp_path / "up主详细数据.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records(), f, ensure_ascii=False, indent=2)
+    loaded = model.load_json(path)
+    assert all(isinstance(up, Uploader) for up in loaded)
+    assert model.to_dicts(loaded) == records()
+    nested = next(up for up in loaded if up.mid == 1)
+    assert nested["owner"] == {"mid": 2, "name": "对象字段"}
+
+
+def test_iter_json_array_across_chunk_boundaries():
+    text = json.dumps(records(), ensure_ascii=False, indent=2)
+    for chunk_size in (1, 7, 4096):
+        assert list(model.iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == records()
+
+
+def test_iter_json_array_rejects_malformed_input():
+    assert list(model.iter_json_array(io.StringIO(" [ ] "))) == []
+    for text in ('{"mid": 1}', "[1, 2", "[1 2]"):
+        with pytest.raises(ValueError):
+            list(model.iter_json_array(io.StringIO(text), chunk_size=2))
+
+
+def test_vocabularies_are_shared_per_load_only(tmp_path):
+    path = tmp_path / "up主详细数据.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records(), f, ensure_ascii=False)
+    first, second = model.load_json(path), model.load_json(path)
+    assert len({id(up.vocabularies) for up in first}) == 1
+    assert first[0].vocabularies is not second[0].vocabularies
+    batch = model.from_dicts(records())
+    assert len({id(up.vocabularies) for up in batch}) == 1
+    assert batch == records()
+
+
+def test_pickle_round_trip():
+    uploaders = model.from_dicts(records())
+    restored = pickle.loads(pickle.dumps(uploaders))
+    assert restored == uploaders
+    assert model.to_dicts(restored) == records()
+
+
+def test_sqlite_load_models_matches_load_all(tmp_path):
+    s = store.SqliteStore(tmp_path / "uploaders.db")
+    try:
+        s.save_all(records())
+        loaded = s.load_models()
+        assert model.to_dicts(loaded) == s.load_all() == records()
+        assert len({id(up.vocabularies) for up in loaded}) == 1
+    finally:
+        s.close()
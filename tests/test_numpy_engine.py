@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+import classify
+from helpers import make_rules, make_uploaders
+
+numpy_engine = pytest.importorskip("numpy_engine")
+
+
+@pytest.mark.parametrize("fractional", [False, True])
+def test_numpy_engine_matches_classify(fractional, monkeypatch):
+    # 小块计分，覆盖跨块的稀疏三元组切片
+    monkeypatch.setattr(numpy_engine, "CHUNK_ROWS", 64)
+    classifier = classify.Classifier(make_rules(random.Random(31), fractional=fractional))
+    uploaders = make_uploaders(random.Random(32), 500)
+    expected = [classifier.classify(up) for up in uploaders]
+    assert classifier.classify_many(uploaders, engine="numpy") == expected
+
+
+def test_integer_weights_are_scored_exactly():
+    classifier = classify.Classifier(make_rules(random.Random(33)))
+    scorer = numpy_engine.NumpyScorer(classifier)
+    uploaders = [up for up in make_uploaders(random.Random(34), 200) if not up.get("video_zone_counts")]
+    scores, exact = scorer.score(scorer.extract(uploaders))
+    assert exact and scores.dtype.kind == "i"
+    for up, row in zip(uploaders, scores):
+        expected = classifier.calculate_category_scores(up)
+        assert dict(zip(scorer.categories, row.tolist())) == expected
+
+
+def test_empty_batch():
+    classifier = classify.Classifier(make_rules(random.Random(35)))
+    assert classifier.classify_many([], engine="numpy") == []
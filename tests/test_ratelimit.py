@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+import pytest
+
+import ratelimit
+from ratelimit import CredentialBanned, RateLimiter, TokenBucket
+
+
+class ApiError(Exception):
+    def __init__(self, code=None, status=None):
+        super().__init__(f"code={code} status={status}")
+        self.code = code
+        self.status = status
+
+
+RISK = ApiError(code=-412)
+
+
+@pytest.fixture(autouse=True)
+def short_pauses(monkeypatch):
+    monkeypatch.setattr(ratelimit, "COOLDOWN", 0.01)
+    monkeypatch.setattr(ratelimit, "MAX_COOLDOWN", 0.04)
+    monkeypatch.setattr(ratelimit, "RETRY_DELAY", 0.001)
+
+
+def fast_limiter():
+    return RateLimiter({"test": (1000.0, 2000.0)}, (1000.0, 2000.0))
+
+
+def run(limiter, outcomes, retries=3):
+    """依次按 outcomes 返回结果或抛出异常，返回 (结果或异常, 调用次数)"""
+    outcomes = list(outcomes)
+    calls = []
+
+    async def factory():
+        calls.append(1)
+        outcome = outcomes.pop(0) if outcomes else "ok"
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    try:
+        result = asyncio.run(limiter.call("test", factory, retries=retries))
+    except Exception as e:
+        result = e
+    return result, len(calls)
+
+
+def test_bucket_is_additive_increase_multiplicative_decrease():
+    bucket = TokenBucket(2.0, 2.1)
+    bucket.on_success()
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.rate == 2.1
+    assert bucket.on_risk() == 0.01
+    assert bucket.rate == 1.05
+    assert [bucket.on_risk() for _ in range(3)] == [0.02, 0.04, 0.04]
+    for _ in range(10):
+        bucket.on_risk()
+    assert bucket.rate == ratelimit.MIN_RATE
+    bucket.on_success()
+    assert bucket.cooldown == 0.01
+
+
+def test_bucket_spaces_reservations_by_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(10.0, 10.0, burst=2)
+    # 突发 2 个不等待，之后每个间隔 0.1 秒
+    assert [round(bucket.reserve(), 6) for _ in range(4)] == [0.0, 0.0, 0.1, 0.2]
+    now[0] += 1.0
+    assert bucket.reserve() == 0.0
+    # 风控后暂停期间的请求排到暂停结束之后
+    now[0] += 1.0
+    bucket.on_risk()
+    assert bucket.blocked_until == pytest.approx(now[0] + 0.01)
+    bucket.burst = 1
+    assert bucket.reserve() == pytest.approx(0.01)
+
+
+def test_risk_control_is_retried_and_slows_the_endpoint():
+    limiter = fast_limiter()
+    result, calls = run(limiter, [RISK, RISK, "ok"])
+    assert (result, calls) == ("ok", 3)
+    assert limiter.risk_events == 2 and limiter.retries == 2
+    assert limiter.bucket("test").rate < 1000.0
+    assert not limiter.banned and limiter.risk_failures == 0
+
+
+def test_transient_errors_are_retried_other_errors_are_not():
+    limiter = fast_limiter()
+    assert run(limiter, [ApiError(status=502), "ok"]) == ("ok", 2)
+    result, calls = run(limiter, [ApiError(code=-404)])
+    assert isinstance(result, ApiError) and calls == 1
+    assert limiter.risk_events == 0 and not limiter.banned
+
+
+def test_repeated_risk_control_bans_the_credential():
+    limiter = fast_limiter()
+    for _ in range(ratelimit.BAN_AFTER):
+        result, calls = run(limiter, [RISK] * 10, retries=1)
+        assert result is RISK and calls == 2
+    assert limiter.banned
+    result, calls = run(limiter, ["ok"])
+    assert isinstance(result, CredentialBanned) and calls == 0
+    limiter.unban()
+    assert run(limiter, ["ok"]) == ("ok", 1)
+
+
+def test_auth_error_bans_immediately():
+    limiter = fast_limiter()
+    result, calls = run(limiter, [ApiError(code=-101)])
+    assert calls == 1 and limiter.banned
+
+
+def test_fail_fast_raises_risk_control_without_retrying():
+    limiter = fast_limiter()
+    limiter.fail_fast = True
+    result, calls = run(limiter, [RISK, "ok"])
+    assert result is RISK and calls == 1
+    assert limiter.resting() > 0
+    # 每次风控算一次尝试：与照常重试时判定封禁所需的次数相同
+    for _ in range(ratelimit.BAN_AFTER * 4 - 2):
+        run(limiter, [RISK])
+    assert not limiter.banned
+    run(limiter, [RISK])
+    assert limiter.banned
+
+
+def test_fresh_limiter_shares_budgets_not_state():
+    limiter = fast_limiter()
+    run(limiter, [RISK, "ok"])
+    other = limiter.fresh()
+    assert other.budgets == limiter.budgets
+    assert other.risk_events == 0 and other.bucket("test").rate == 1000.0
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+import fetch
+import http_client
+from helpers import account
+
+
+def test_refresh_one_returns_none_when_video_list_fails(mock_api):
+    credential = fetch.make_credential(account(0))
+    up = {"mid": mock_api.mids[0], "latest_bvid": "BV1xx", "latest_created": 1}
+    mock_api.error_rate = 1.0
+    assert http_client.run(fetch.refresh_one(credential, up)) is None
+
+
+def test_refresh_one_changes_nothing_for_an_up_to_date_uploader(mock_api):
+    http_client.run(fetch.fetch_all(concurrency=4))
+    credential = fetch.make_credential(account(0))
+    up = fetch.load_data()[0]
+    assert http_client.run(fetch.refresh_one(credential, up)) == {}
+
+
+def test_refresh_one_refetches_when_there_are_new_uploads(mock_api):
+    http_client.run(fetch.fetch_all(concurrency=4))
+    credential = fetch.make_credential(account(0))
+    up = fetch.load_data()[0]
+    # 去掉最新的两个视频，当作上次采集之后才投稿
+    stale = dict(up, video_titles=up["video_titles"][2:], latest_created=up["latest_created"] - 2 * 86400)
+    patch = http_client.run(fetch.refresh_one(credential, stale))
+    assert patch["video_titles"] == up["video_titles"]
+    assert len(patch["video_titles"]) <= fetch.VIDEO_TITLE_LIMIT
+    assert (patch["latest_bvid"], patch["latest_created"]) == (up["latest_bvid"], up["latest_created"])
+
+
+def test_failed_refresh_keeps_markers_and_journal(mock_api):
+    http_client.run(fetch.fetch_all(concurrency=4))
+    before = {up["mid"]: (up["latest_bvid"], up["latest_created"]) for up in fetch.load_data()}
+    assert len(before) == len(mock_api.mids)
+
+    mock_api.error_rate = 1.0
+    http_client.run(fetch.refresh_all(concurrency=4))
+    after = {up["mid"]: (up["latest_bvid"], up["latest_created"]) for up in fetch.load_data()}
+    assert after == before
+    assert fetch.REFRESH_JOURNAL_PATH.exists()
+
+    mock_api.error_rate = 0.0
+    http_client.run(fetch.refresh_all(concurrency=4))
+    assert not fetch.REFRESH_JOURNAL_PATH.exists()
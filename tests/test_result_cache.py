@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+import classify
+import result_cache
+from helpers import make_rules, make_uploaders
+from result_cache import ResultCache
+
+
+class CountingClassifier(classify.Classifier):
+    """记录实际计分的UP主数"""
+
+    def __init__(self, rules):
+        super().__init__(rules)
+        self.scored = 0
+
+    def classify_many(self, uploaders, **kwargs):
+        self.scored += len(uploaders)
+        return super().classify_many(uploaders, **kwargs)
+
+
+@pytest.fixture
+def uploaders():
+    return make_uploaders(random.Random(41), 60)
+
+
+def versions(cache):
+    return {v for (v,) in cache._db().execute("SELECT DISTINCT rules_hash FROM results")}
+
+
+def test_unchanged_uploaders_are_not_rescored(tmp_path, uploaders):
+    classifier = CountingClassifier(make_rules(random.Random(42)))
+    cache = ResultCache(tmp_path / "cache.db")
+    expected = [classifier.classify(up) for up in uploaders]
+    assert cache.classify_many(classifier, uploaders) == expected
+    assert classifier.scored == 60
+
+    changed = [dict(up) for up in uploaders]
+    changed[0]["sign"] = "单片机 电路 机器人"
+    changed[1]["video_zone_counts"] = {"翻唱": 9}
+    assert cache.classify_many(classifier, changed) == [classifier.classify(up) for up in changed]
+    assert classifier.scored == 62
+    assert (cache.hits, cache.misses) == (58, 62)
+    cache.close()
+
+    # 重新打开后仍然命中
+    reopened = ResultCache(tmp_path / "cache.db")
+    assert reopened.classify_many(classifier, changed) == [classifier.classify(up) for up in changed]
+    assert classifier.scored == 62
+
+
+def test_reverting_rules_hits_the_old_results(tmp_path, uploaders):
+    first = CountingClassifier(make_rules(random.Random(43)))
+    second = CountingClassifier(make_rules(random.Random(44)))
+    cache = ResultCache(tmp_path / "cache.db")
+    cache.classify_many(first, uploaders)
+    cache.classify_many(second, uploaders)
+    cache.classify_many(first, uploaders)
+    assert (first.scored, second.scored) == (60, 60)
+    assert len(versions(cache)) == 2
+
+
+def test_scoring_version_is_part_of_the_rules_hash(monkeypatch):
+    rules = make_rules(random.Random(45))
+    before = result_cache.rules_hash(rules)
+    monkeypatch.setattr(result_cache, "SCORING_VERSION", result_cache.SCORING_VERSION + 1)
+    assert result_cache.rules_hash(rules) != before
+
+
+def test_eviction_drops_least_recently_used_versions_first(tmp_path, uploaders, monkeypatch):
+    clock = iter(range(1000))
+    monkeypatch.setattr(result_cache.time, "time", lambda: next(clock))
+    classifiers = [CountingClassifier(make_rules(random.Random(50 + i))) for i in range(3)]
+    a, b, c = (result_cache.rules_hash(x.rules) for x in classifiers)
+    cache = ResultCache(tmp_path / "cache.db", max_entries=150)
+
+    cache.classify_many(classifiers[0], uploaders)
+    cache.classify_many(classifiers[1], uploaders)
+    assert versions(cache) == {a, b}                     # 120 条，未超上限
+    cache.classify_many(classifiers[0], uploaders[:10])  # a 变为最近使用
+    cache.classify_many(classifiers[2], uploaders)       # 180 条：删掉最久未用的 b
+    assert versions(cache) == {a, c}
+
+
+def test_eviction_drops_unused_current_results_last(tmp_path, uploaders):
+    classifier = CountingClassifier(make_rules(random.Random(46)))
+    cache = ResultCache(tmp_path / "cache.db", max_entries=50)
+    cache.classify_many(classifier, uploaders)
+    # 只剩当前版本仍超出上限时，删除本次没有用到的结果
+    cache.classify_many(classifier, uploaders[:20])
+    assert len(cache.load(result_cache.rules_hash(classifier.rules))) == 20
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import random
+
+import pytest
+
+import classify
+from helpers import make_rules, make_uploaders
+from rule_index import RuleIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RuleIndex(tmp_path / "规则索引.db")
+    yield index
+    index.close()
+
+
+def save(path, uploaders):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(uploaders, f, ensure_ascii=False)
+
+
+def run(index, rules, path):
+    """按规则更新索引，返回 (Impact, 是否读取了数据文件)"""
+    loads = []
+
+    def load():
+        loads.append(1)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    return index.update(classify.Classifier(rules), load, path), bool(loads)
+
+
+def assert_matches_full_classify(index, rules, uploaders):
+    classifier = classify.Classifier(rules)
+    expected = [(up["name"], up["mid"], *classifier.classify(up)) for up in uploaders]
+    assert index.entries() == expected
+
+
+def test_changed_keyword_rescores_only_uploaders_containing_it(index, tmp_path):
+    path = tmp_path / "data.json"
+    uploaders = make_uploaders(random.Random(61), 150)
+    save(path, uploaders)
+    rules = make_rules(random.Random(62))
+
+    impact, loaded = run(index, rules, path)
+    assert impact.rebuilt and loaded and impact.rescored == 150
+    assert_matches_full_classify(index, rules, uploaders)
+
+    changed = copy.deepcopy(rules)
+    keyword = changed["keyword_rules"]["游戏"][0]
+    keyword[1] += 20
+    impact, loaded = run(index, changed, path)
+    assert not impact.rebuilt and not loaded
+    text = keyword[0].lower()
+    containing = {up["mid"] for up in uploaders if text in classify.combined_text(up)}
+    assert impact.rescored == len(containing) < 150
+    assert all(mid in containing for mid, *_ in impact.moves)
+    assert_matches_full_classify(index, changed, uploaders)
+
+    # 改回原规则，分类也恢复
+    run(index, rules, path)
+    assert_matches_full_classify(index, rules, uploaders)
+
+
+def test_new_zone_keyword_and_manual_override(index, tmp_path):
+    path = tmp_path / "data.json"
+    uploaders = make_uploaders(random.Random(63), 120)
+    save(path, uploaders)
+    rules = make_rules(random.Random(64))
+    run(index, rules, path)
+
+    changed = copy.deepcopy(rules)
+    changed["zone_mapping"]["知识"].append("演奏")
+    target = next(up for up in uploaders if up["name"] != "手动指定的UP")
+    changed["manual"][target["name"]] = "游戏"
+    impact, _ = run(index, changed, path)
+    assert not impact.rebuilt
+    assert_matches_full_classify(index, changed, uploaders)
+    assert dict((name, category) for name, _, category, _ in index.entries())[target["name"]] == "游戏"
+
+
+def test_data_changes_are_synced_incrementally(index, tmp_path):
+    path = tmp_path / "data.json"
+    uploaders = make_uploaders(random.Random(65), 100)
+    save(path, uploaders)
+    rules = make_rules(random.Random(66))
+    run(index, rules, path)
+
+    edited = copy.deepcopy(uploaders[10:]) + make_uploaders(random.Random(67), 105)[100:]
+    edited[0]["sign"] = "原神 攻略 实况"
+    save(path, edited)
+    impact, loaded = run(index, rules, path)
+    assert loaded and not impact.rebuilt
+    assert impact.added == {up["mid"] for up in edited[-5:]}
+    assert sorted(mid for mid, _, _ in impact.removed) == [up["mid"] for up in uploaders[:10]]
+    assert impact.rescored == 6
+    assert_matches_full_classify(index, rules, edited)
+
+
+def test_global_rule_change_rescores_everyone(index, tmp_path):
+    path = tmp_path / "data.json"
+    uploaders = make_uploaders(random.Random(68), 80)
+    save(path, uploaders)
+    rules = make_rules(random.Random(69))
+    run(index, rules, path)
+
+    changed = copy.deepcopy(rules)
+    changed["default_category"] = "知识"
+    impact, _ = run(index, changed, path)
+    assert impact.rebuilt and impact.rescored == 80
+    assert_matches_full_classify(index, changed, uploaders)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import json
+import random
+
+import pytest
+
+import model
+import store
+from helpers import make_uploaders
+
+
+def odd_records():
+    """字段顺序、缺字段、None、类型不符和未知字段都要原样保留"""
+    return [
+        {"mid": 1, "name": "一", "sign": None, "tags": ["a", "b"], "video_zones": []},
+        {"name": "二", "mid": 2, "channels": [], "extra_field": {"mid": 9, "name": "嵌套"}},
+        {"mid": 3, "name": "三", "video_titles": ["标题", 7], "official_verify": {"type": 1},
+         "video_zone_counts": {"科技": 3}, "latest_bvid": None},
+        {"mid": 4},
+    ]
+
+
+def open_backend(backend, tmp_path):
+    if backend == "json":
+        return store.JsonStore(tmp_path / "up主详细数据.json")
+    return store.SqliteStore(tmp_path / "uploaders.db")
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend_store(request, tmp_path):
+    s = open_backend(request.param, tmp_path)
+    yield s
+    s.close()
+
+
+def test_save_and_load_round_trip(backend_store):
+    records = odd_records() + make_uploaders(random.Random(3), 50)
+    backend_store.save_all(records)
+    loaded = backend_store.load_all()
+    assert loaded == records
+    # 字段顺序也不变（写回 JSON 时与原文件一致）
+    assert [list(r) for r in loaded] == [list(r) for r in records]
+    assert model.to_dicts(backend_store.load_models()) == records
+
+
+def test_upsert_updates_in_place_and_appends_new(backend_store):
+    backend_store.save_all(odd_records())
+    backend_store.upsert_many([{"mid": 5, "name": "五"}, {"mid": 2, "name": "二改", "tags": ["新"]}])
+    loaded = backend_store.load_all()
+    assert [r["mid"] for r in loaded] == [1, 2, 3, 4, 5]
+    assert loaded[1] == {"mid": 2, "name": "二改", "tags": ["新"]}
+    assert backend_store.get(2) == loaded[1]
+    assert backend_store.get(99) is None
+    assert backend_store.mids() == {1, 2, 3, 4, 5}
+
+
+def test_delete(backend_store):
+    backend_store.save_all(odd_records())
+    backend_store.delete([1, 3, 99])
+    assert [r["mid"] for r in backend_store.load_all()] == [2, 4]
+
+
+def test_import_then_export_reproduces_the_json_file(data, monkeypatch, capsys):
+    records = odd_records() + make_uploaders(random.Random(4), 30)
+    store.JsonStore().save_all(records)
+    original = store.JSON_PATH.read_bytes()
+
+    monkeypatch.setattr("sys.argv", ["store.py", "import"])
+    store.main()
+    store.JSON_PATH.unlink()
+    monkeypatch.setattr("sys.argv", ["store.py", "export"])
+    store.main()
+    assert store.JSON_PATH.read_bytes() == original
+
+
+def test_open_store_follows_config(data):
+    assert isinstance(store.open_store(), store.JsonStore)
+    with open(data / "config.json", "w", encoding="utf-8") as f:
+        json.dump({"storage": "sqlite"}, f)
+    s = store.open_store()
+    assert isinstance(s, store.SqliteStore) and store.data_file() == store.DB_PATH
+    s.close()
+    with pytest.raises(ValueError):
+        store.open_store("csv")
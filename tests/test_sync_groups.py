@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import json
+
+import http_client
+import sync_groups
+from fetch import get_all_followings, make_credential
+from helpers import account
+
+
+def current_state(credential):
+    async def read():
+        groups = await sync_groups.get_existing_groups(credential)
+        followings = await get_all_followings(credential, 1, fresh=True)
+        return groups, {f["mid"]: set(f.get("tag") or []) for f in followings}
+    return http_client.run(read())
+
+
+def write_result(path, categories):
+    with open(path / "分类结果.json", "w", encoding="utf-8") as f:
+        json.dump({"categories": categories}, f, ensure_ascii=False)
+
+
+def categories_for(mids, names):
+    categories = {name: [] for name in names}
+    for i, mid in enumerate(mids):
+        name = names[i % len(names)]
+        categories[name].append({"mid": mid, "name": f"UP{mid}", "reason": ""})
+    return categories
+
+
+def test_second_sync_plans_nothing(mock_api, tmp_path):
+    credential = make_credential(account(0))
+    categories = categories_for(mock_api.mids, ["学习", "游戏", "音乐/舞蹈"])
+    write_result(tmp_path, categories)
+
+    http_client.run(sync_groups.sync())
+    groups, tags = current_state(credential)
+    plan = sync_groups.plan_sync(categories, list(categories), groups, tags)
+    assert not any([plan["create"], plan["rename"], plan["delete"], plan["move"]])
+    # 每个UP主都只在对应的分组里
+    for cat, ups in categories.items():
+        tagid = groups[sync_groups.sanitize_group_name(cat)]
+        assert all(tags[up["mid"]] == {tagid} for up in ups)
+
+
+def test_changed_result_renames_and_moves_only_what_differs(mock_api, tmp_path):
+    credential = make_credential(account(0))
+    categories = categories_for(mock_api.mids, ["学习", "游戏"])
+    write_result(tmp_path, categories)
+    http_client.run(sync_groups.sync())
+    groups, _ = current_state(credential)
+
+    # "游戏" 改名为 "娱乐"，另把一个UP主从 "学习" 移到 "娱乐"
+    moved = categories["学习"].pop()
+    changed = {"学习": categories["学习"], "娱乐": categories["游戏"] + [moved]}
+    write_result(tmp_path, changed)
+    before = dict(mock_api.requests)
+    http_client.run(sync_groups.sync())
+
+    groups_after, tags = current_state(credential)
+    renamed = {name: tagid for name, tagid in groups.items() if name != "游戏"}
+    assert groups_after == {**renamed, "娱乐": groups["游戏"]}
+    plan = sync_groups.plan_sync(changed, list(changed), groups_after, tags)
+    assert not any([plan["create"], plan["rename"], plan["delete"], plan["move"]])
+    # 旧分组改名复用，不新建；只移动了那一个UP主
+    requests = {path: n - before.get(path, 0) for path, n in mock_api.requests.items()}
+    assert requests.get("/x/relation/tag/update") == 1
+    assert not requests.get("/x/relation/tag/create")
+    assert requests.get("/x/relation/tags/addUsers") == 1
+
+
+def ups(mids):
+    return [{"mid": mid, "name": f"UP{mid}"} for mid in mids]
+
+
+def test_renames_go_to_the_category_with_the_largest_overlap():
+    existing = {"默认分组": 0, "游戏": 10}
+    current = {mid: {10} for mid in range(1, 101)}
+    current.update({200: set(), 201: set()})
+    categories = {"娱乐": ups([1, 200, 201]), "电竞": ups(range(2, 101))}
+
+    plan = sync_groups.plan_sync(categories, list(categories), existing, current)
+    assert plan["rename"] == [(10, "游戏", "电竞")]
+    assert plan["create"] == ["娱乐"]
+    assert {cat: [up["mid"] for up in moved] for cat, moved in plan["move"].items()} == {"娱乐": [1, 200, 201]}
+    assert plan["delete"] == []
+
+
+def test_each_obsolete_group_is_renamed_at_most_once():
+    existing = {"旧A": 1, "旧B": 2, "保留": 3}
+    current = {1: {1}, 2: {1}, 3: {2}, 4: {3}, 5: {2}, 6: {1}, 7: {1}, 8: {1}}
+    # 与旧A 重合：新1 1 人、新2 1 人、新3 3 人；与旧B 重合：新2 2 人
+    categories = {"新1": ups([1]), "新2": ups([2, 3, 5]), "新3": ups([6, 7, 8]), "保留": ups([4])}
+
+    plan = sync_groups.plan_sync(categories, list(categories), existing, current)
+    assert plan["rename"] == [(2, "旧B", "新2"), (1, "旧A", "新3")]
+    assert plan["create"] == ["新1"]
+    assert plan["groups"]["保留"] == 3
+    assert plan["delete"] == []
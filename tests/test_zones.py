@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import fetch
+import http_client
+import store
+
+
+def drop_zone_counts(mock_api):
+    """采集后去掉各分区视频数，当作旧数据"""
+    http_client.run(fetch.fetch_all(concurrency=4))
+    complete = fetch.load_data()
+    s = store.open_store()
+    s.save_all([{k: v for k, v in up.items() if k != "video_zone_counts"} for up in complete])
+    s.close()
+    return complete
+
+
+def test_missing_zone_counts_are_filled_in(mock_api):
+    complete = drop_zone_counts(mock_api)
+    http_client.run(fetch.fetch_missing_zones())
+    assert fetch.load_data() == complete
+    assert not fetch.ZONES_JOURNAL_PATH.exists()
+
+
+def test_failed_video_list_keeps_existing_zones(mock_api, capsys):
+    complete = drop_zone_counts(mock_api)
+    before = fetch.load_data()
+    assert any(up["video_zones"] for up in before)
+
+    mock_api.error_rate = 1.0
+    http_client.run(fetch.fetch_missing_zones())
+    assert fetch.load_data() == before
+    out = capsys.readouterr().out
+    assert "连续失败过多" in out and "成功: 0" in out
+
+    mock_api.error_rate = 0.0
+    http_client.run(fetch.fetch_missing_zones())
+    assert fetch.load_data() == complete